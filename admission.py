@@ -0,0 +1,219 @@
+import asyncio
+import json
+import math
+import multiprocessing
+import time
+from collections import OrderedDict
+
+from fastapi.responses import JSONResponse
+
+from server_metrics import ADMISSION_DECISIONS, ADMISSION_WAIT_SECONDS
+
+
+class SessionRateLimiter:
+    """Token bucket per session: ``burst`` questions at once, refilled at
+    ``rate`` questions per second. Buckets of the ``max_sessions`` most
+    recent sessions are kept (LRU); a forgotten session starts full again.
+    """
+
+    def __init__(self, rate=0.5, burst=3, max_sessions=10000):
+        self.rate = rate
+        self.burst = burst
+        self.max_sessions = max_sessions
+        self.buckets = OrderedDict()  # session_id -> (tokens, time of last refill)
+
+    def acquire(self, session_id):
+        """Take a token; returns 0 if one was available, else seconds until the next one."""
+        now = time.monotonic()
+        tokens, updated = self.buckets.pop(session_id, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated) * self.rate)
+        wait = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            wait = (1 - tokens) / self.rate
+        self.buckets[session_id] = (tokens, now)
+        if len(self.buckets) > self.max_sessions:
+            self.buckets.popitem(last=False)
+        return wait
+
+
+class AdmissionState:
+    """Questions being answered and waiting for a slot, shared by all API
+    server processes.
+
+    Created in the main process before ``LitServer.run`` so the API servers
+    inherit it (like DrainState). ``max_in_flight`` of 0 means no cap.
+    """
+
+    def __init__(self, max_in_flight=64, max_queue=128):
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.lock = multiprocessing.Lock()
+        self.in_flight = multiprocessing.RawValue("i", 0)
+        self.waiting = multiprocessing.RawValue("i", 0)
+        # Moving average of how long an admitted question holds its slot
+        self.service_seconds = multiprocessing.RawValue("d", 0.0)
+
+    def try_acquire(self, queued=False):
+        # Newcomers do not overtake questions already waiting
+        with self.lock:
+            if self.max_in_flight and (self.in_flight.value >= self.max_in_flight
+                                       or (not queued and self.waiting.value > 0)):
+                return False
+            self.in_flight.value += 1
+            return True
+
+    def release(self, seconds):
+        with self.lock:
+            self.in_flight.value -= 1
+            average = self.service_seconds.value
+            self.service_seconds.value = seconds if average == 0 else 0.8 * average + 0.2 * seconds
+
+    def enter_queue(self):
+        with self.lock:
+            if self.waiting.value >= self.max_queue:
+                return False
+            self.waiting.value += 1
+            return True
+
+    def leave_queue(self):
+        with self.lock:
+            self.waiting.value -= 1
+
+    def estimated_wait(self, ahead=None):
+        """Seconds a question arriving now (or with ``ahead`` questions in front) waits for a slot."""
+        with self.lock:
+            in_flight, waiting = self.in_flight.value, self.waiting.value
+            service = self.service_seconds.value
+        ahead = waiting if ahead is None else ahead
+        if not self.max_in_flight or (in_flight < self.max_in_flight and ahead == 0):
+            return 0.0
+        # Each service time frees max_in_flight slots
+        return (ahead + 1) * service / self.max_in_flight
+
+    def snapshot(self):
+        with self.lock:
+            in_flight, waiting = self.in_flight.value, self.waiting.value
+            service = self.service_seconds.value
+        return {
+            "in_flight": in_flight,
+            "waiting": waiting,
+            "max_in_flight": self.max_in_flight,
+            "max_queue": self.max_queue,
+            "avg_service_s": round(service, 3),
+            "estimated_wait_s": round(self.estimated_wait(), 1),
+        }
+
+
+class AdmissionMiddleware:
+    """ASGI middleware in front of /predict that keeps one user from taking
+    every slot and bounds how long anyone waits for one.
+
+    A question is rejected with 429 when its session is over its rate
+    (``SessionRateLimiter``, per API server process). Otherwise it takes one
+    of the ``state.max_in_flight`` slots, or waits for one in a queue of at
+    most ``state.max_queue`` questions, for at most ``max_wait`` seconds
+    (or the question's own deadline). A full queue or a wait that runs out
+    is answered 503. Rejections carry Retry-After and a "response" message
+    the chat UI shows as is, and cost no LitServe worker time.
+    """
+
+    def __init__(self, app, state, rate=0.5, burst=3, max_wait=10.0, poll_interval=0.05, paths=("/predict",)):
+        self.app = app
+        self.state = state
+        self.limiter = SessionRateLimiter(rate, burst) if rate > 0 else None
+        self.max_wait = max_wait
+        self.poll_interval = poll_interval
+        self.paths = paths
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"] not in self.paths:
+            return await self.app(scope, receive, send)
+
+        # The session ID and deadline are in the (small) JSON body; it is read
+        # here and replayed to the app
+        messages = []
+        while True:
+            message = await receive()
+            messages.append(message)
+            if message["type"] != "http.request" or not message.get("more_body", False):
+                break
+        try:
+            request = json.loads(b"".join(m.get("body", b"") for m in messages))
+        except ValueError:
+            request = None
+        if not isinstance(request, dict):
+            # Malformed: let LitServe answer it
+            request = {}
+
+        async def replay():
+            if messages:
+                return messages.pop(0)
+            return await receive()
+
+        if self.limiter is not None:
+            wait = self.limiter.acquire(request.get("session_id", "immer-session"))
+            if wait > 0:
+                ADMISSION_DECISIONS.labels(result="rate_limited").inc()
+                return await self.reject(send, 429, wait, "You're sending questions too quickly. "
+                                                           f"Please wait {math.ceil(wait)} s and try again.")
+
+        if not await self.wait_for_slot(request, send):
+            return
+        start = time.monotonic()
+        try:
+            await self.app(scope, replay, send)
+        finally:
+            self.state.release(time.monotonic() - start)
+
+    async def wait_for_slot(self, request, send):
+        if self.state.try_acquire():
+            ADMISSION_DECISIONS.labels(result="admitted").inc()
+            return True
+        if not self.state.enter_queue():
+            ADMISSION_DECISIONS.labels(result="queue_full").inc()
+            await self.reject(send, 503, self.state.estimated_wait(),
+                              "The assistant is very busy right now. Please try again shortly.")
+            return False
+
+        try:
+            deadline = float(request.get("deadline") or self.max_wait)
+        except (TypeError, ValueError):
+            deadline = self.max_wait
+        start = time.monotonic()
+        give_up = start + min(self.max_wait, deadline)
+        try:
+            # Slots are freed in other processes, so waiters poll for them
+            while not self.state.try_acquire(queued=True):
+                if time.monotonic() >= give_up:
+                    ADMISSION_DECISIONS.labels(result="queue_timeout").inc()
+                    await self.reject(send, 503, self.state.estimated_wait(),
+                                      "The assistant is very busy right now. Please try again shortly.")
+                    return False
+                await asyncio.sleep(self.poll_interval)
+        finally:
+            self.state.leave_queue()
+        ADMISSION_DECISIONS.labels(result="queued").inc()
+        ADMISSION_WAIT_SECONDS.observe(time.monotonic() - start)
+        return True
+
+    async def reject(self, send, status, retry_after, message):
+        retry_after = max(1, math.ceil(retry_after))
+        body = json.dumps({"response": message, "retry_after": retry_after}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(b"content-type", b"application/json"),
+                        (b"retry-after", str(retry_after).encode())],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+def add_queue_route(server, state):
+    """/queue: questions answered and waiting right now, and the wait a new one can expect."""
+
+    async def queue():
+        return JSONResponse(state.snapshot())
+
+    server.app.add_api_route("/queue", queue, methods=["GET"])
@@ -0,0 +1,121 @@
+import threading
+import time
+from collections import OrderedDict
+
+from embeddings import cosine
+
+
+def normalize_query(query):
+    # Case, whitespace and trailing punctuation do not change the answer
+    return " ".join(query.lower().split()).rstrip(" ?!.")
+
+
+class _Entry:
+    __slots__ = ("answer", "vector", "expires_at", "size")
+
+    def __init__(self, answer, vector, expires_at, size):
+        self.answer = answer
+        self.vector = vector
+        self.expires_at = expires_at
+        self.size = size
+
+
+class AnswerCache:
+    """Two-tier answer cache: exact match on the normalized query, then
+    (optionally) the nearest cached query by embedding cosine similarity.
+
+    Entries expire after ``ttl`` seconds and the least recently used ones are
+    evicted once ``max_entries`` or ``max_bytes`` is exceeded. Safe to share
+    between threads.
+    """
+
+    def __init__(self, ttl=3600.0, max_entries=1024, max_bytes=16 * 1024 * 1024,
+                 embedder=None, similarity_threshold=0.92, clock=time.monotonic):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.embedder = embedder
+        self.similarity_threshold = similarity_threshold
+        self.clock = clock
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.counters = {"exact_hits": 0, "semantic_hits": 0, "misses": 0,
+                         "bypassed": 0, "evictions": 0, "expired": 0}
+
+    @property
+    def semantic(self):
+        return self.embedder is not None
+
+    def embed(self, query):
+        # Called outside the lock; may do network I/O
+        if self.embedder is None:
+            return None
+        return self.embedder.embed([normalize_query(query)])[0]
+
+    def get(self, query, vector=None):
+        return self.lookup(query, vector)[0]
+
+    def lookup(self, query, vector=None):
+        """Return (answer or None, tier) where tier is "exact", "semantic" or "miss"."""
+        key = normalize_query(query)
+        now = self.clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry.expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.counters["exact_hits"] += 1
+                    return entry.answer, "exact"
+                self._remove(key)
+                self.counters["expired"] += 1
+
+            if vector is not None:
+                best_key, best_score = None, self.similarity_threshold
+                for cached_key, cached in list(self._entries.items()):
+                    if cached.expires_at <= now:
+                        self._remove(cached_key)
+                        self.counters["expired"] += 1
+                        continue
+                    if cached.vector is None:
+                        continue
+                    score = cosine(vector, cached.vector)
+                    if score >= best_score:
+                        best_key, best_score = cached_key, score
+                if best_key is not None:
+                    self._entries.move_to_end(best_key)
+                    self.counters["semantic_hits"] += 1
+                    return self._entries[best_key].answer, "semantic"
+
+            self.counters["misses"] += 1
+            return None, "miss"
+
+    def put(self, query, answer, vector=None):
+        key = normalize_query(query)
+        size = len(key) + len(answer.encode("utf-8")) + (8 * len(vector) if vector else 0)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = _Entry(answer, vector, self.clock() + self.ttl, size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.counters["evictions"] += 1
+
+    def record_bypass(self):
+        with self._lock:
+            self.counters["bypassed"] += 1
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+
+    def stats(self):
+        with self._lock:
+            return dict(self.counters, entries=len(self._entries), bytes=self._bytes)
+
+    def __len__(self):
+        return len(self._entries)
@@ -1,26 +1,22 @@
 import streamlit as st
-import requests
+import os
 import subprocess
 import sys
-import time
-import threading
 from uuid import uuid4  # Added for session ID generation
 
+from chat_engine import UNAVAILABLE, ChatEngine
+from history_store import ConversationHistory, MemoryTranscriptStore, SQLiteTranscriptStore
+from template_questions import TEMPLATE_QUESTIONS
+
 # CRITICAL: Initialize session state at the very beginning
 # This ensures it's done before any other code runs
 if "messages" not in st.session_state:
     st.session_state["messages"] = []  # Active conversation
     st.session_state["session_id"] = str(uuid4())  # Generate initial session ID
 
-if "chat_history" not in st.session_state:
-    st.session_state["chat_history"] = []  # Archived conversations
-    
 if "template_used" not in st.session_state:
     st.session_state["template_used"] = False
     
-if "pending_input" not in st.session_state:
-    st.session_state["pending_input"] = None
-
 # Set Streamlit page configuration.
 st.set_page_config(
     page_title="DialogXR Godiva Chatbot",
@@ -28,69 +24,82 @@ st.set_page_config(
     layout="wide"
 )
 
-# Start the chat server with health checks
+# API configuration
+SERVER_URL = "http://localhost:7898"
+SERVER_LOG = "chat_server.log"
+
+# Conversation history: archived conversations kept per browser session, and
+# where their transcripts live (an SQLite file if HISTORY_DB is set, else memory)
+HISTORY_MAX_CONVERSATIONS = int(os.getenv("HISTORY_MAX_CONVERSATIONS", "20"))
+HISTORY_DB = os.getenv("HISTORY_DB", "")
+# Cap on in-memory transcripts across all sessions (ended sessions never delete theirs)
+HISTORY_MAX_TRANSCRIPTS = int(os.getenv("HISTORY_MAX_TRANSCRIPTS", "5000"))
+
+# One pooled HTTP client for every browser session of this Streamlit process
+@st.cache_resource
+def get_chat_engine():
+    return ChatEngine(SERVER_URL)
+
+# Start the chat server once per Streamlit process, without waiting for it:
+# the page renders straight away and the first question waits for readiness.
 @st.cache_resource
 def start_chat_api():
+    # Reuse a server that is already running (e.g. started by another app process)
+    if get_chat_engine().is_ready():
+        return {"proc": None, "ready": True}
     try:
-        # Start server with output capture
+        # Server output goes to a log file; an unread pipe would eventually block it
+        log_file = open(SERVER_LOG, "a")
         proc = subprocess.Popen([sys.executable, "chat_server.py"],
-                               stdout=subprocess.PIPE,
-                               stderr=subprocess.PIPE,
-                               text=True)
-        
-        # Wait for server to become ready
-        start_time = time.time()
-        server_ready = False
-        
-        with st.spinner("Starting chat server..."):
-            while (time.time() - start_time) < 30:  # 30-second timeout
-                try:
-                    # Try hitting health endpoint
-                    response = requests.get("http://localhost:7898/health", timeout=2)
-                    if response.status_code == 200:
-                        server_ready = True
-                        break
-                except (requests.ConnectionError, requests.Timeout):
-                    pass  # Server not ready yet
-                time.sleep(2)  # Check every 2 seconds
-
-        if not server_ready:
-            # Show error details
-            st.error(f"""
-                ⚠️ Chat server failed to start within 30 seconds!
-                Server status: {'running' if proc.poll() is None else 'stopped'}
-                Error logs: {proc.stderr.read()}
-            """)
-            st.stop()
-        
-        return proc
-
+                                stdout=log_file,
+                                stderr=subprocess.STDOUT)
+        return {"proc": proc, "ready": False}
     except Exception as e:
         st.error(f"🚨 Critical server error: {str(e)}")
         st.stop()
 
-chat_api_proc = start_chat_api()
+def wait_for_chat_api(chat_api, timeout=30):
+    if chat_api["ready"]:
+        return True
+    proc = chat_api["proc"]
+    is_alive = (lambda: proc.poll() is None) if proc is not None else None
+    if get_chat_engine().wait_until_ready(timeout, is_alive=is_alive):
+        chat_api["ready"] = True
+        return True
 
-# API configuration
-API_URL = "http://localhost:7898/predict"
+    try:
+        with open(SERVER_LOG) as f:
+            log_tail = f.read()[-2000:]
+    except OSError:
+        log_tail = ""
+    st.error(f"""
+        ⚠️ Chat server failed to start within {timeout} seconds!
+        Server status: {'running' if proc is not None and proc.poll() is None else 'stopped'}
+        Error logs: {log_tail}
+    """)
+    return False
+
+# One transcript store per Streamlit process, shared by all browser sessions
+@st.cache_resource
+def get_transcript_store():
+    if HISTORY_DB:
+        return SQLiteTranscriptStore(HISTORY_DB)
+    return MemoryTranscriptStore(max_transcripts=HISTORY_MAX_TRANSCRIPTS)
+
+chat_api = start_chat_api()
+chat_engine = get_chat_engine()
+
+if "chat_history" not in st.session_state:
+    st.session_state["chat_history"] = ConversationHistory(  # Archived conversations
+        get_transcript_store(), max_conversations=HISTORY_MAX_CONVERSATIONS
+    )
 
 # Double check session_id exists (defensive programming)
 if "session_id" not in st.session_state or not st.session_state["session_id"]:
     st.session_state["session_id"] = str(uuid4())
 
 # Template questions (only show if no chat has started)
-template_questions = [
-    "Can you explain Godiva's approach to creating tax-efficient retirement income strategies?",
-    "What investment strategies does Godiva recommend for preserving wealth across generations?",
-    "How does Godiva's wealth management service address inheritance tax planning?",
-    "What are the key considerations in Godiva's pension transfer advisory process?",
-    "How does Godiva balance risk and return in long-term investment portfolios?",
-    "What tax-efficient savings vehicles does Godiva recommend for high-net-worth individuals?",
-    "How does Godiva's trust planning service protect family assets?",
-    "What ethical investment options are available through Godiva's portfolios?",
-    "How does Godiva help clients navigate complex cross-border wealth management scenarios?",
-    "What strategies does Godiva employ to safeguard investments during market volatility?"
-]
+template_questions = TEMPLATE_QUESTIONS
 
 # Optional custom CSS for template question styling.
 st.markdown("""
@@ -124,30 +133,32 @@ with st.sidebar:
     st.image("Bikal_logo.svg", width=120)
     
     st.markdown("### Conversation History")
-    if st.session_state["chat_history"]:
-        for idx, conv in enumerate(st.session_state["chat_history"], 1):
+    history = st.session_state["chat_history"]
+    if history:
+        for idx, summary in enumerate(history.summaries, 1):
             with st.expander(f"Conversation {idx}", expanded=False):
-                preview = conv[-2:] if len(conv) >= 2 else conv
-                preview_html = "<div style='font-size:12px; max-width:200px;'>"
-                for msg in preview:
-                    preview_html += f"<p><strong>{msg['role'].capitalize()}:</strong> {msg['content']}</p>"
-                preview_html += "</div>"
-                st.markdown(preview_html, unsafe_allow_html=True)
+                # Preview rendered once, when the conversation was archived
+                st.markdown(summary.preview_html, unsafe_allow_html=True)
                 col1, col2 = st.columns(2)
                 with col1:
-                    if st.button("Load", key=f"load_{idx}"):
-                        st.session_state["messages"] = conv.copy()
-                        st.session_state["session_id"] = str(uuid4())  # New session when loading old chat
+                    if st.button("Load", key=f"load_{summary.id}"):
+                        # The full transcript is only read back here
+                        messages = history.load(summary.id)
+                        if messages:
+                            st.session_state["messages"] = messages
+                            st.session_state["session_id"] = str(uuid4())  # New session when loading old chat
+                        else:
+                            st.warning("This conversation has expired and was removed.")
                 with col2:
-                    if st.button("Delete", key=f"delete_{idx}"):
-                        st.session_state["chat_history"].pop(idx - 1)
+                    if st.button("Delete", key=f"delete_{summary.id}"):
+                        history.delete(summary.id)
                         st.rerun()
     else:
         st.info("No previous conversations stored.")
     
     if st.button("🆕 New Chat"):
         if st.session_state["messages"]:
-            st.session_state["chat_history"].append(st.session_state["messages"].copy())
+            history.archive(st.session_state["messages"])
         # Reset conversation AND generate new session ID
         st.session_state["messages"] = []
         st.session_state["session_id"] = str(uuid4())
@@ -157,86 +168,73 @@ with st.sidebar:
 # Main chat interface.
 st.markdown("### Welcome to Godiva Chatbot!")
 
-# Show template questions only if no chat has started.
-if not st.session_state["messages"] and not st.session_state["template_used"]:
-    st.markdown("<div class='template-box'><strong>Suggested Questions:</strong></div>", unsafe_allow_html=True)
-    
-    cols = st.columns(len(template_questions) if len(template_questions) < 5 else 5)
-    for idx, question in enumerate(template_questions):
-        if cols[idx % 5].button(question, key=f"template_{idx}", help="Click to ask this question", use_container_width=True):
-            st.session_state["pending_input"] = question
-            st.session_state["template_used"] = True
-            st.rerun()
-
-# Display existing chat messages.
-for msg in st.session_state["messages"]:
-    with st.chat_message(msg["role"]):
-        st.write(msg["content"])
-
-# Check if a template question was selected and process it.
-if st.session_state["pending_input"]:
-    user_input = st.session_state["pending_input"]
-    st.session_state["pending_input"] = None
-else:
-    user_input = st.chat_input("Ask me anything...")
-
-# Process user input
-if user_input:
+# The transcript lives outside the chat fragment below. A full script run
+# draws the messages so far; each new turn is then appended to it once by the
+# fragment. Elements a fragment writes outside its own body are kept across
+# its reruns, so asking a question draws only that turn, never the older ones
+# or the sidebar.
+transcript = st.container()
+with transcript:
+    for msg in st.session_state["messages"]:
+        with st.chat_message(msg["role"]):
+            st.write(msg["content"])
+
+def clear_on_first(chunks, placeholder):
+    # Removes the wait note as soon as the answer starts
+    for chunk in chunks:
+        placeholder.empty()
+        yield chunk
+
+def answer(user_input):
     st.session_state["messages"].append({"role": "user", "content": user_input})
-    with st.chat_message("user"):
+    with transcript, st.chat_message("user"):
         st.write(user_input)
 
-    # Create a placeholder for the assistant's response.
-    assistant_message = st.chat_message("assistant")
-    response_placeholder = assistant_message.empty()
-
-    # Get the session ID outside the thread
-    current_session_id = st.session_state["session_id"]
-    print(f"Using session ID (main thread): {current_session_id}")                # Debugging line 
-
-    # Function to fetch API response.
-    response_container = {"response": None}
-    def fetch_response(session_id):
-        try:
-            print(f"Using session ID (in thread): {session_id}")                  # Debugging line
-            
-            response = requests.post(
-                API_URL,
-                json={
-                    "query": user_input,
-                    "session_id": session_id
-                },
-                timeout=90
-            )
-            response.raise_for_status()
-            response_container["response"] = response.json().get("response", "Service is currently under maintenance. Please try again later.")
-        except Exception as e:
-            response_container["response"] = f"Error: {str(e)}"
-
-    # Start API request in a separate thread.
-    response_thread = threading.Thread(target=fetch_response, args=(current_session_id,))
-    response_thread.start()
-
-    # Show spinners
-    with response_placeholder:
-        with st.spinner("Analyzing the question..."):
-            time.sleep(3)
-        with st.spinner("Thinking..."):
-            time.sleep(3)
-        with st.spinner("Constructing response..."):
-            time.sleep(2)
-
-        # Wait for API response
-        generating_spinner = response_placeholder.empty()
-        while response_thread.is_alive():
-            generating_spinner.write("⏳ Generating response...")
-            time.sleep(0.5)
-        generating_spinner.empty()
-
-    # Display response
-    response_thread.join()
-    bot_response = response_container["response"]
+    # Only blocks on the very first question after a cold start
+    if not chat_api["ready"]:
+        with st.spinner("Starting chat server..."):
+            if not wait_for_chat_api(chat_api):
+                st.stop()
+
+    has_history = len(st.session_state["messages"]) > 1
+    with transcript, st.chat_message("assistant"):
+        # When questions are queued on the server, say how long this one may wait
+        wait_note = st.empty()
+        status = chat_engine.queue_status()
+        if status and status["estimated_wait_s"] >= 1:
+            wait_note.caption(f"⏳ {status['waiting']} question(s) ahead of yours, "
+                              f"about {status['estimated_wait_s']:.0f} s before an answer starts...")
+        bot_response = st.write_stream(
+            clear_on_first(chat_engine.stream_reply(user_input, st.session_state["session_id"], has_history),
+                           wait_note)
+        )
+        if not bot_response:
+            bot_response = UNAVAILABLE
+            st.write(bot_response)
+
     st.session_state["messages"].append({"role": "assistant", "content": bot_response})
-    response_placeholder.write(bot_response)
 
-    st.rerun()
+@st.fragment
+def chat_panel():
+    user_input = None
+
+    # Show template questions only if no chat has started.
+    if not st.session_state["messages"] and not st.session_state["template_used"]:
+        templates = st.empty()
+        with templates.container():
+            st.markdown("<div class='template-box'><strong>Suggested Questions:</strong></div>", unsafe_allow_html=True)
+
+            cols = st.columns(len(template_questions) if len(template_questions) < 5 else 5)
+            for idx, question in enumerate(template_questions):
+                if cols[idx % 5].button(question, key=f"template_{idx}", help="Click to ask this question", use_container_width=True):
+                    user_input = question
+                    st.session_state["template_used"] = True
+        if user_input:
+            templates.empty()
+
+    prompt = st.chat_input("Ask me anything...")
+    user_input = user_input or prompt
+    if user_input:
+        answer(user_input)
+
+chat_panel()
@@ -0,0 +1,88 @@
+"""Langflow backend vs. direct pipeline backend against the local stand-ins.
+
+Runs benchmarks/run_benchmark.py once per backend. The Langflow backend
+calls the mock's run API; the direct backend calls the mock's /api/embed and
+/api/chat and searches sample_documents.jsonl with the in-memory retriever.
+The answer cache and coalescing are off, so every question reaches the
+upstream. Prints a table and saves the combined results.
+
+    python benchmarks/backends.py --concurrency 16 --requests 400 --mock-flow-overhead 0.3
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+BACKEND_ENV = {
+    "langflow": ["CHAT_BACKEND=langflow"],
+    "direct": [
+        "CHAT_BACKEND=direct",
+        "PIPELINE_EMBEDDER=ollama",
+        "RETRIEVER=memory",
+        f"RETRIEVER_DOCS={os.path.join(HERE, 'sample_documents.jsonl')}",
+    ],
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--backends", nargs="+", choices=sorted(BACKEND_ENV), default=["langflow", "direct"])
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--turns", type=int, default=3)
+    parser.add_argument("--mock-port", type=int, default=7900)
+    parser.add_argument("--mock-latency", type=float, default=1.0)
+    parser.add_argument("--mock-flow-overhead", type=float, default=0.3,
+                        help="Langflow's own time per run, paid only by the Langflow backend")
+    parser.add_argument("--stream", choices=["0", "1"], default="1")
+    parser.add_argument("--output-dir", default="results/backends")
+    args = parser.parse_args()
+
+    rows = []
+    for backend in args.backends:
+        output = os.path.join(args.output_dir, f"{backend}.json")
+        server_env = BACKEND_ENV[backend] + [
+            f"OLLAMA_URL=http://127.0.0.1:{args.mock_port}",
+            f"CHAT_STREAM={args.stream}",
+            "CACHE_ENABLED=0",
+            "COALESCE_ENABLED=0",
+        ]
+        subprocess.run([
+            sys.executable, os.path.join(HERE, "run_benchmark.py"),
+            "--concurrency", str(args.concurrency),
+            "--requests", str(args.requests),
+            "--turns", str(args.turns),
+            "--mock-port", str(args.mock_port),
+            "--mock-latency", str(args.mock_latency),
+            "--mock-ttft", str(args.mock_latency / 5),
+            "--mock-flow-overhead", str(args.mock_flow_overhead),
+            *[arg for env in server_env for arg in ("--server-env", env)],
+            "--output", output,
+        ], check=True)
+        with open(output) as f:
+            report = json.load(f)
+        overall = report["overall"]
+        rows.append({
+            "backend": backend,
+            "throughput_rps": report["throughput_rps"],
+            "p50": overall["latency"]["p50"],
+            "p95": overall["latency"]["p95"],
+            "ttft_p50": overall["ttft"]["p50"],
+            "errors": overall["errors"],
+            "upstream": report["upstream"],
+        })
+
+    print(f"\n{'backend':>9} {'req/s':>8} {'p50 s':>8} {'p95 s':>8} {'ttft p50':>9} {'errors':>7}")
+    for row in rows:
+        ttft = f"{row['ttft_p50']:9.3f}" if row["ttft_p50"] is not None else f"{'-':>9}"
+        print(f"{row['backend']:>9} {row['throughput_rps']:>8.2f} {row['p50']:>8.3f} "
+              f"{row['p95']:>8.3f} {ttft} {row['errors']:>7}")
+    with open(os.path.join(args.output_dir, "summary.json"), "w") as f:
+        json.dump(rows, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
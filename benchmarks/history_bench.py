@@ -0,0 +1,102 @@
+"""Benchmark: prompt size and generation latency vs. conversation length.
+
+Builds the direct-pipeline prompt for conversations of increasing length,
+once with the flow's n_messages=100 history and once through the token
+window, and reports prompt tokens and the cost of windowing. With
+``--ollama-url`` each prompt is also sent to /api/chat (a real Ollama, or
+the mock started with ``--prefill``) to measure end-to-end latency.
+
+    python benchmarks/history_bench.py --lengths 0 10 20 50 100
+    python benchmarks/mock_langflow.py --port 7900 --latency 0.2 --prefill 0.5 &
+    python benchmarks/history_bench.py --ollama-url http://127.0.0.1:7900 --repeat 5
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chat_memory import MACHINE, USER, InMemoryChatMemory  # noqa: E402
+from chat_server import TWEAKS, build_generator  # noqa: E402
+from history_window import ExtractiveSummarizer, HistoryWindow, build_tokenizer  # noqa: E402
+from rag_pipeline import RagPipeline  # noqa: E402
+from template_questions import TEMPLATE_QUESTIONS  # noqa: E402
+
+CONTEXT = "Godiva reviews pensions, ISAs and trusts to plan tax-efficient retirement income. , Retirement\n" * 3
+ANSWER = ("Godiva Wealth Management builds retirement income plans around your pensions, ISAs and other "
+          "savings, drawing from each in the most tax-efficient order. This is general information, "
+          "not personalised advice. Consult a Godiva advisor for your situation.")
+
+
+async def conversation(memory, session_id, n_messages):
+    for index in range(n_messages // 2):
+        await memory.add_message(session_id, *USER, TEMPLATE_QUESTIONS[index % len(TEMPLATE_QUESTIONS)])
+        await memory.add_message(session_id, *MACHINE, ANSWER)
+
+
+async def run(args):
+    tokenizer = build_tokenizer(args.tokenizer)
+    history_template = TWEAKS["Memory-3Qm7y"]["template"]
+    window = HistoryWindow(tokenizer, token_budget=args.budget, max_turns=args.max_turns,
+                           summarizer=ExtractiveSummarizer(tokenizer, args.summary_tokens),
+                           history_template=history_template)
+    memory = InMemoryChatMemory()
+    generator = build_generator() if args.ollama_url else None
+    if generator is not None:
+        generator.client.base_url = args.ollama_url
+    pipelines = {
+        "full": RagPipeline(None, None, generator, memory, TWEAKS["Prompt-Ciphp"]["template"],
+                            n_messages=TWEAKS["Memory-3Qm7y"]["n_messages"], history_template=history_template),
+        "windowed": RagPipeline(None, None, generator, memory, TWEAKS["Prompt-Ciphp"]["template"],
+                                n_messages=TWEAKS["Memory-3Qm7y"]["n_messages"], history_template=history_template,
+                                window=window),
+    }
+
+    header = f"{'messages':>8s} {'full tok':>9s} {'window tok':>10s} {'build us':>10s}"
+    if generator is not None:
+        header += f" {'full s':>8s} {'window s':>9s}"
+    print(header)
+    for length in args.lengths:
+        session_id = f"bench-{length}"
+        await conversation(memory, session_id, length)
+        prompts = {name: await pipeline.build_prompt(TEMPLATE_QUESTIONS[0], session_id, CONTEXT)
+                   for name, pipeline in pipelines.items()}
+
+        # Warm path: the rolling summary for this session is already cached
+        start = time.perf_counter()
+        for _ in range(args.number):
+            await pipelines["windowed"].build_prompt(TEMPLATE_QUESTIONS[0], session_id, CONTEXT)
+        build_us = (time.perf_counter() - start) / args.number * 1e6
+
+        row = (f"{length:8d} {tokenizer.count(prompts['full']):9d} "
+               f"{tokenizer.count(prompts['windowed']):10d} {build_us:10.1f}")
+        if generator is not None:
+            for name in ("full", "windowed"):
+                latencies = []
+                for _ in range(args.repeat):
+                    start = time.perf_counter()
+                    await generator.generate(prompts[name])
+                    latencies.append(time.perf_counter() - start)
+                row += f" {statistics.median(latencies):{8 if name == 'full' else 9}.2f}"
+        print(row)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lengths", type=int, nargs="+", default=[0, 10, 20, 50, 100],
+                        help="messages of history before the question")
+    parser.add_argument("--budget", type=int, default=1024)
+    parser.add_argument("--max-turns", type=int, default=6)
+    parser.add_argument("--summary-tokens", type=int, default=200)
+    parser.add_argument("--tokenizer", default="approx")
+    parser.add_argument("--number", type=int, default=200, help="prompt builds timed per length")
+    parser.add_argument("--ollama-url", default="", help="also time /api/chat at this URL")
+    parser.add_argument("--repeat", type=int, default=3, help="generations per prompt and length")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
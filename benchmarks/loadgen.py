@@ -0,0 +1,190 @@
+"""Drive chat_server's /predict endpoint and report latency percentiles.
+
+Each virtual user opens a session, asks a first question (a template
+question or a unique one) and then follow-ups, until the request budget is
+used up. Results are written as JSON so runs can be compared.
+
+    python benchmarks/loadgen.py --concurrency 16 --requests 400 --output results/stream.json
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import time
+from uuid import uuid4
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from template_questions import TEMPLATE_QUESTIONS  # noqa: E402
+
+FOLLOW_UPS = [
+    "Can you tell me more about that?",
+    "How much does that cost?",
+    "Who should I contact to get started?",
+    "Does that apply if I live abroad?",
+]
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    # Nearest-rank percentile
+    ordered = sorted(values)
+    index = max(0, math.ceil(pct / 100 * len(ordered)) - 1)
+    return ordered[index]
+
+
+def summarize(samples):
+    latencies = [s["latency"] for s in samples if s["ok"]]
+    ttfts = [s["ttft"] for s in samples if s["ok"] and s["ttft"] is not None]
+    summary = {"count": len(samples), "errors": sum(1 for s in samples if not s["ok"])}
+    for name, values in (("latency", latencies), ("ttft", ttfts)):
+        summary[name] = {
+            "p50": percentile(values, 50),
+            "p95": percentile(values, 95),
+            "p99": percentile(values, 99),
+            "mean": sum(values) / len(values) if values else None,
+            "max": max(values) if values else None,
+        }
+    return summary
+
+
+async def send(client, url, query, session_id, has_history):
+    start = time.perf_counter()
+    ttft = None
+    text = []
+    failed = False
+    try:
+        async with client.stream("POST", url, json={"query": query, "session_id": session_id,
+                                                    "has_history": has_history}) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if not line:
+                    continue
+                if ttft is None:
+                    ttft = time.perf_counter() - start
+                chunk = json.loads(line)
+                # Upstream failures arrive as a 200 with an error message marked "error"
+                failed = failed or bool(chunk.get("error"))
+                text.append(chunk.get("response", ""))
+        ok = not failed and bool("".join(text).strip())
+    except (httpx.HTTPError, ValueError):
+        ok = False
+    return {
+        "kind": "follow_up" if has_history else "first",
+        "query": query,
+        "ok": ok,
+        "latency": time.perf_counter() - start,
+        "ttft": ttft,
+        "chars": sum(map(len, text)),
+    }
+
+
+async def virtual_user(client, args, budget, samples):
+    while budget["left"] > 0:
+        session_id = f"bench-{uuid4()}"
+        if random.random() < args.template_ratio:
+            query = random.choice(TEMPLATE_QUESTIONS)
+        else:
+            query = f"What does Godiva offer for client case {uuid4().hex[:8]}?"
+        for turn in range(args.turns):
+            if budget["left"] <= 0:
+                return
+            budget["left"] -= 1
+            samples.append(await send(client, args.url, query, session_id, has_history=turn > 0))
+            query = random.choice(FOLLOW_UPS)
+            if args.think_time:
+                await asyncio.sleep(random.uniform(0, 2 * args.think_time))
+
+
+async def run_load(args):
+    samples = []
+    budget = {"left": args.requests}
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(timeout=args.timeout, limits=limits) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(virtual_user(client, args, budget, samples) for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - start
+    return samples, elapsed
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def build_report(args, samples, elapsed, extra=None):
+    report = {
+        "revision": git_revision(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "config": {k: v for k, v in vars(args).items() if k != "output"},
+        "duration_s": elapsed,
+        "throughput_rps": len(samples) / elapsed if elapsed else None,
+        "overall": summarize(samples),
+        "first_questions": summarize([s for s in samples if s["kind"] == "first"]),
+        "follow_ups": summarize([s for s in samples if s["kind"] == "follow_up"]),
+    }
+    report.update(extra or {})
+    return report
+
+
+def print_report(report):
+    print(f"revision {report['revision']}  {report['overall']['count']} requests in "
+          f"{report['duration_s']:.1f}s  ({report['throughput_rps']:.2f} req/s, "
+          f"{report['overall']['errors']} errors)")
+    for section in ("overall", "first_questions", "follow_ups"):
+        stats = report[section]
+        if not stats["count"]:
+            continue
+        for metric in ("latency", "ttft"):
+            values = stats[metric]
+            if values["p50"] is None:
+                continue
+            print(f"  {section:16s} {metric:8s} p50 {values['p50']:7.3f}s  p95 {values['p95']:7.3f}s  "
+                  f"p99 {values['p99']:7.3f}s")
+
+
+def add_arguments(parser):
+    parser.add_argument("--url", default="http://127.0.0.1:7898/predict")
+    parser.add_argument("--concurrency", type=int, default=8, help="number of virtual users")
+    parser.add_argument("--requests", type=int, default=200, help="total requests to send")
+    parser.add_argument("--turns", type=int, default=3, help="questions per session")
+    parser.add_argument("--template-ratio", type=float, default=0.5,
+                        help="fraction of sessions that open with a template question")
+    parser.add_argument("--think-time", type=float, default=0.0, help="mean pause between turns (s)")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the JSON report to this path")
+
+
+def write_report(report, path):
+    if not path:
+        return
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Report written to {path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test for chat_server /predict")
+    add_arguments(parser)
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    samples, elapsed = asyncio.run(run_load(args))
+    report = build_report(args, samples, elapsed)
+    print_report(report)
+    write_report(report, args.output)
+
+
+if __name__ == "__main__":
+    main()
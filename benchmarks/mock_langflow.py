@@ -0,0 +1,227 @@
+"""Local stand-in for the Langflow run API, for benchmarking chat_server.
+
+Answers POST /api/v1/run/{flow} with the same response shape as the real
+flow (``outputs[0].outputs[0].results.message.text``) after a configurable
+delay, and with Langflow's event stream when called with ``?stream=true``.
+It also serves the two Ollama endpoints chat_server calls when it runs the
+RAG steps itself (/api/embed and /api/chat).
+
+    python benchmarks/mock_langflow.py --port 7900 --latency 1.5 --ttft 0.3
+    LANGFLOW_URL=http://127.0.0.1:7900/ python chat_server.py
+"""
+import argparse
+import asyncio
+import json
+import random
+import os
+import sys
+import time
+from uuid import uuid4
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from embeddings import HashingEmbedder  # noqa: E402
+
+DISCLAIMER = "This is general information, not personalised advice. Consult a Godiva advisor for your situation."
+
+ANSWER_BODIES = [
+    "Godiva Wealth Management builds retirement income plans around your pensions, ISAs and other savings, "
+    "drawing from each in the most tax-efficient order so more of your money stays invested for longer. "
+    "Learn more in our [Pensions & Retirement Planning](https://godiva-wealth.management/pensions-and-retirement/) guide.",
+    "We review your estate, gifts and trusts to reduce the inheritance tax your family may face, using "
+    "allowances, lifetime gifting and trust structures where appropriate. See "
+    "[Tax & Trust Planning](https://godiva-wealth.management/tax-and-trust-planning/) for details.",
+    "Our portfolios are diversified across asset classes and regions, and rebalanced to the level of risk "
+    "agreed with you, so short-term market movements do not derail long-term goals. Read more in "
+    "[Investments & Savings](https://godiva-wealth.management/investments-savings/).",
+    "No information is available. Contact Godiva at [01926 298567](tel:+441926298567) or "
+    "[info@godiva-wealth.management](mailto:info@godiva-wealth.management).",
+]
+
+
+class MockConfig:
+    latency = 1.5  # seconds until a blocking run returns
+    jitter = 0.2  # +/- fraction applied to every delay
+    ttft = 0.3  # seconds until the first streamed token
+    token_delay = 0.02  # seconds between streamed tokens
+    error_rate = 0.0  # fraction of runs answered with HTTP 500
+    padding_kb = 0  # extra artifacts/logs per response, to mimic large payloads
+    embed_latency = 0.05  # seconds per /api/embed call, whatever the number of inputs
+    prefill = 0.0  # extra seconds per 1000 prompt tokens (~4 characters each) on /api/chat
+    flow_overhead = 0.0  # extra seconds per run for Langflow's own work (graph build, memory, parsing)
+
+
+config = MockConfig()
+stats = {"runs": 0, "streamed_runs": 0, "errors": 0, "embed_calls": 0, "embed_inputs": 0, "chat_calls": 0}
+embedder = HashingEmbedder(dim=768)
+app = FastAPI()
+
+
+def _delay(seconds):
+    return max(0.0, seconds * random.uniform(1 - config.jitter, 1 + config.jitter))
+
+
+def _answer_for(query):
+    # Same question -> same answer, so cached and uncached runs can be compared
+    body = ANSWER_BODIES[sum(map(ord, query)) % len(ANSWER_BODIES)]
+    return f"{body}\n\n{DISCLAIMER}"
+
+
+def _run_result(query, session_id, text, elapsed):
+    message = {
+        "text": text,
+        "sender": "Machine",
+        "sender_name": "AI Assistant",
+        "session_id": session_id,
+        "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "files": [],
+        "error": False,
+        "properties": {"source": {"id": "OllamaModel-RdzdC", "display_name": "Ollama"}},
+    }
+    padding = "x" * (config.padding_kb * 1024)
+    return {
+        "session_id": session_id,
+        "outputs": [{
+            "inputs": {"input_value": query},
+            "outputs": [{
+                "results": {"message": message},
+                "artifacts": {"message": text, "sender": "Machine", "padding": padding},
+                "outputs": {"message": {"message": text, "type": "text"}},
+                "logs": {"message": []},
+                "messages": [{"message": text, "sender": "Machine", "sender_name": "AI Assistant",
+                              "session_id": session_id, "component_id": "ChatOutput-TR3Kc"}],
+                "timedelta": elapsed,
+                "duration": f"{elapsed:.2f} seconds",
+                "component_display_name": "Chat Output",
+                "component_id": "ChatOutput-TR3Kc",
+                "used_frozen_result": False,
+            }],
+        }],
+    }
+
+
+def _event(event, data):
+    return json.dumps({"event": event, "data": data}) + "\n\n"
+
+
+@app.get("/health")
+async def health():
+    return {"status": "ok"}
+
+
+@app.get("/api/version")
+async def version():
+    # Ollama's version endpoint: chat_server's /ready probes it for the direct pipeline backend
+    return {"version": "0.0.0-mock"}
+
+
+@app.get("/stats")
+async def get_stats():
+    return stats
+
+
+@app.post("/api/v1/run/{flow}")
+async def run_flow(flow: str, request: Request, stream: bool = False):
+    payload = await request.json()
+    chat_input = payload.get("tweaks", {}).get("ChatInput-8fGO2", {})
+    query = chat_input.get("input_value", "")
+    session_id = chat_input.get("session_id") or str(uuid4())
+    stats["runs"] += 1
+
+    if random.random() < config.error_rate:
+        stats["errors"] += 1
+        await asyncio.sleep(_delay(config.latency))
+        return JSONResponse({"detail": "mock failure"}, status_code=500)
+
+    text = _answer_for(query)
+    start = time.perf_counter()
+
+    if not stream:
+        await asyncio.sleep(_delay(config.latency + config.flow_overhead))
+        return _run_result(query, session_id, text, time.perf_counter() - start)
+
+    stats["streamed_runs"] += 1
+
+    async def events():
+        yield _event("add_message", {"sender": "User", "text": query, "session_id": session_id})
+        await asyncio.sleep(_delay(config.ttft + config.flow_overhead))
+        tokens = text.split(" ")
+        for index, token in enumerate(tokens):
+            chunk = token if index == len(tokens) - 1 else token + " "
+            yield _event("token", {"chunk": chunk, "id": str(uuid4()), "timestamp": time.time()})
+            await asyncio.sleep(_delay(config.token_delay))
+        yield _event("end", {"result": _run_result(query, session_id, text, time.perf_counter() - start)})
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+@app.post("/api/embed")
+async def embed(request: Request):
+    payload = await request.json()
+    inputs = payload.get("input", [])
+    if isinstance(inputs, str):
+        inputs = [inputs]
+    stats["embed_calls"] += 1
+    stats["embed_inputs"] += len(inputs)
+    await asyncio.sleep(_delay(config.embed_latency))
+    return {"model": payload.get("model"), "embeddings": embedder.embed(inputs)}
+
+
+@app.post("/api/chat")
+async def chat(request: Request):
+    payload = await request.json()
+    prompt = payload["messages"][-1]["content"]
+    stats["chat_calls"] += 1
+    text = _answer_for(prompt)
+    # Prompt processing time grows with the prompt, as with a real model
+    prefill = config.prefill * sum(len(m["content"]) for m in payload["messages"]) / 4000
+
+    if not payload.get("stream", True):
+        await asyncio.sleep(_delay(config.latency + prefill))
+        return {"model": payload.get("model"), "message": {"role": "assistant", "content": text}, "done": True}
+
+    async def chunks():
+        await asyncio.sleep(_delay(config.ttft + prefill))
+        for token in text.split(" "):
+            yield json.dumps({"message": {"role": "assistant", "content": token + " "}, "done": False}) + "\n"
+            await asyncio.sleep(_delay(config.token_delay))
+        yield json.dumps({"message": {"role": "assistant", "content": ""}, "done": True}) + "\n"
+
+    return StreamingResponse(chunks(), media_type="application/x-ndjson")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock Langflow run API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=7900)
+    parser.add_argument("--latency", type=float, default=MockConfig.latency)
+    parser.add_argument("--jitter", type=float, default=MockConfig.jitter)
+    parser.add_argument("--ttft", type=float, default=MockConfig.ttft)
+    parser.add_argument("--token-delay", type=float, default=MockConfig.token_delay)
+    parser.add_argument("--error-rate", type=float, default=MockConfig.error_rate)
+    parser.add_argument("--padding-kb", type=int, default=MockConfig.padding_kb)
+    parser.add_argument("--embed-latency", type=float, default=MockConfig.embed_latency)
+    parser.add_argument("--prefill", type=float, default=MockConfig.prefill,
+                        help="extra /api/chat seconds per 1000 prompt tokens")
+    parser.add_argument("--flow-overhead", type=float, default=MockConfig.flow_overhead,
+                        help="extra run API seconds for Langflow's orchestration")
+    args = parser.parse_args()
+
+    config.latency = args.latency
+    config.jitter = args.jitter
+    config.ttft = args.ttft
+    config.token_delay = args.token_delay
+    config.error_rate = args.error_rate
+    config.padding_kb = args.padding_kb
+    config.embed_latency = args.embed_latency
+    config.prefill = args.prefill
+    config.flow_overhead = args.flow_overhead
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
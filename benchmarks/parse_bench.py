@@ -0,0 +1,73 @@
+"""Micro-benchmark: extracting the answer from a blocking Langflow run response.
+
+Compares the original path (json.loads the whole body, then walk the fixed
+path) with parse_run_response: its partial parse, and the full parse
+(orjson when installed) it falls back to, for responses padded with
+artifacts and logs.
+
+    python benchmarks/parse_bench.py [--padding-kb 0 64 512] [--number 500]
+"""
+import argparse
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import langflow_response  # noqa: E402
+from langflow_response import parse_run_response  # noqa: E402
+
+TEXT = ("Godiva Wealth Management builds retirement income plans around your pensions, ISAs and other savings. "
+        "This is general information, not personalised advice. Consult a Godiva advisor for your situation.")
+
+
+def run_response(padding_kb):
+    # Shape of the flow's run response; artifacts and logs grow with padding_kb
+    padding = "x" * (padding_kb * 1024)
+    message = {"text": TEXT, "sender": "Machine", "sender_name": "AI Assistant", "session_id": "bench",
+               "files": [], "error": False, "properties": {"source": {"id": "OllamaModel-RdzdC"}}}
+    output = {
+        "results": {"message": message},
+        "artifacts": {"message": TEXT, "sender": "Machine", "padding": padding},
+        "outputs": {"message": {"message": TEXT, "type": "text"}},
+        "logs": {"message": [{"message": padding, "type": "text"}]},
+        "messages": [{"message": TEXT, "sender": "Machine", "component_id": "ChatOutput-TR3Kc"}],
+        "timedelta": 1.2,
+        "component_id": "ChatOutput-TR3Kc",
+    }
+    return json.dumps({"session_id": "bench", "outputs": [{"inputs": {"input_value": "q"},
+                                                           "outputs": [output]}]}).encode("utf-8")
+
+
+def legacy_extract(body):
+    data = json.loads(body)
+    return data["outputs"][0]["outputs"][0]["results"]["message"]["text"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--padding-kb", type=int, nargs="+", default=[0, 64, 512])
+    parser.add_argument("--number", type=int, default=500)
+    args = parser.parse_args()
+
+    full = "full parse (orjson)" if langflow_response.orjson is not None else "full parse (json)"
+    cases = {
+        "json.loads + fixed path": legacy_extract,
+        "partial parse": lambda body: parse_run_response(body).text,
+        full: lambda body: parse_run_response(body, full=True).text,
+    }
+
+    for padding_kb in args.padding_kb:
+        body = run_response(padding_kb)
+        print(f"\nresponse of {len(body) / 1024:.0f} KB")
+        baseline = None
+        for name, fn in cases.items():
+            assert fn(body) == TEXT
+            best = min(timeit.repeat(lambda: fn(body), number=args.number, repeat=5)) / args.number
+            baseline = baseline or best
+            print(f"  {name:26s} {best * 1e6:10.1f} us/response  x{baseline / best:.1f}")
+
+
+if __name__ == "__main__":
+    main()
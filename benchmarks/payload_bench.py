@@ -0,0 +1,66 @@
+"""Micro-benchmark: per-request Langflow payload construction.
+
+Compares the original path (deepcopy TWEAKS, set the slots, json.dumps the
+whole payload) with the precompiled payload used by chat_server.
+
+    python benchmarks/payload_bench.py [--number 5000]
+"""
+import argparse
+import copy
+import json
+import os
+import sys
+import timeit
+from uuid import uuid4
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chat_server import PAYLOAD_SLOTS, TWEAKS, compile_payload  # noqa: E402
+from langflow_payload import CompiledPayload  # noqa: E402
+
+QUERY = "How does Godiva's trust planning service protect family assets?"
+
+
+def legacy_payload(query, session_id):
+    updated_tweaks = copy.deepcopy(TWEAKS)
+    for component, field in PAYLOAD_SLOTS["session_id"]:
+        updated_tweaks[component][field] = session_id
+    updated_tweaks["ChatInput-8fGO2"]["input_value"] = query
+    payload = {"output_type": "chat", "input_type": "chat", "tweaks": updated_tweaks}
+    return json.dumps(payload).encode("utf-8")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--number", type=int, default=5000)
+    args = parser.parse_args()
+
+    session_id = str(uuid4())
+    compiled = compile_payload(stream=False)
+    minimal = CompiledPayload(TWEAKS, PAYLOAD_SLOTS, overrides={("OllamaModel-RdzdC", "stream"): False},
+                              minimal=True)
+
+    # Both paths must produce the same request
+    assert json.loads(compiled.render(query=QUERY, session_id=session_id)) == \
+        json.loads(legacy_payload(QUERY, session_id))
+
+    cases = {
+        "deepcopy + json.dumps": lambda: legacy_payload(QUERY, session_id),
+        "compiled": lambda: compiled.render(query=QUERY, session_id=session_id),
+        "compiled (minimal tweaks)": lambda: minimal.render(query=QUERY, session_id=session_id),
+    }
+    sizes = {
+        "deepcopy + json.dumps": len(legacy_payload(QUERY, session_id)),
+        "compiled": len(compiled.render(query=QUERY, session_id=session_id)),
+        "compiled (minimal tweaks)": len(minimal.render(query=QUERY, session_id=session_id)),
+    }
+
+    baseline = None
+    for name, fn in cases.items():
+        best = min(timeit.repeat(fn, number=args.number, repeat=5)) / args.number
+        baseline = baseline or best
+        print(f"{name:28s} {best * 1e6:8.1f} us/request  {sizes[name]:6d} bytes  x{baseline / best:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""Replay captured traffic against chat_server's /predict endpoint.
+
+Reads a capture written by chat_server.py (CAPTURE_PATH) and sends every
+question again at its original pace, or faster with --speed. Each captured
+session becomes a fresh session whose questions are asked in order, so
+follow-ups see the answers of this run. Every answer is written as a JSONL
+record in the capture's format, for benchmarks/replay_report.py.
+
+    python benchmarks/replay.py capture.jsonl --speed 4 --output results/replay-main.jsonl
+    python benchmarks/replay.py capture.jsonl --with-mock --mock-latency 0.5 \\
+        --server-env CACHE_ENABLED=0 --output results/replay-no-cache.jsonl
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+from collections import OrderedDict
+from uuid import uuid4
+
+import httpx
+
+from loadgen import git_revision, percentile
+from run_benchmark import add_stack_arguments, start_mock, start_server, stop
+
+
+def load_capture(path, limit=None):
+    """Captured records grouped by session, in capture order: {session: [record, ...]}."""
+    sessions = OrderedDict()
+    with open(path) as f:
+        for count, line in enumerate(f):
+            if limit is not None and count >= limit:
+                break
+            if line.strip():
+                record = json.loads(line)
+                sessions.setdefault(record["session"], []).append(record)
+    return sessions
+
+
+async def ask(client, url, record, session_id, timeout):
+    start = time.perf_counter()
+    ttft = None
+    chunks = []
+    status = None
+    failed = False
+    try:
+        async with client.stream("POST", url, timeout=timeout,
+                                 json={"query": record["query"], "session_id": session_id,
+                                       "has_history": record["has_history"]}) as response:
+            status = response.status_code
+            async for line in response.aiter_lines():
+                if not line:
+                    continue
+                if ttft is None:
+                    ttft = time.perf_counter() - start
+                chunk = json.loads(line)
+                # chat_server marks upstream failures and empty answers with "error"
+                failed = failed or bool(chunk.get("error"))
+                chunks.append(chunk.get("response", ""))
+        ok = status == 200 and not failed and bool("".join(chunks).strip())
+    except (httpx.HTTPError, ValueError):
+        ok = False
+    return {"latency_s": round(time.perf_counter() - start, 4),
+            "ttft_s": round(ttft, 4) if ttft is not None else None,
+            # Turned away by the server's per-session rate limit, not a failed answer
+            "ok": ok, "status": status, "rate_limited": status == 429, "response": "".join(chunks)}
+
+
+async def replay_session(client, args, records, t0, first_ts, results):
+    session_id = f"replay-{uuid4()}"
+    for record in records:
+        # Original offset from the start of the capture, scaled by --speed
+        due = t0 + (record["ts"] - first_ts) / args.speed if args.speed > 0 else t0
+        delay = due - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        sent_at = time.perf_counter()
+        sent_wall = time.time()
+        answer = await ask(client, args.url, record, session_id, args.timeout)
+        results.append({
+            "ts": round(sent_wall, 3),
+            "session": record["session"],
+            "query": record["query"],
+            "has_history": record["has_history"],
+            "mode": "replay",
+            # How late the question went out (the previous turn was still running)
+            "lag_s": round(max(0.0, sent_at - due), 4),
+            **answer,
+        })
+
+
+async def replay(args, sessions):
+    results = []
+    first_ts = min(records[0]["ts"] for records in sessions.values())
+    limits = httpx.Limits(max_connections=args.max_connections, max_keepalive_connections=args.max_connections)
+    async with httpx.AsyncClient(limits=limits) as client:
+        t0 = time.perf_counter()
+        await asyncio.gather(*(replay_session(client, args, records, t0, first_ts, results)
+                               for records in sessions.values()))
+        elapsed = time.perf_counter() - t0
+    results.sort(key=lambda r: r["ts"])
+    return results, elapsed
+
+
+def write_results(results, path):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as f:
+        for result in results:
+            f.write(json.dumps(result, ensure_ascii=False) + "\n")
+    print(f"Replay written to {path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("capture", help="JSONL capture (CAPTURE_PATH) or an earlier replay")
+    parser.add_argument("--url", default="http://127.0.0.1:7898/predict")
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="pace relative to the capture (2 = twice as fast, 0 = every session at once)")
+    parser.add_argument("--limit", type=int, help="replay only the first N captured questions")
+    parser.add_argument("--max-connections", type=int, default=256)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--with-mock", action="store_true",
+                        help="start the mock Langflow and chat_server.py (see run_benchmark.py) for the replay")
+    add_stack_arguments(parser)
+    parser.add_argument("--output", required=True, help="JSONL file for the replayed answers")
+    args = parser.parse_args()
+
+    sessions = load_capture(args.capture, args.limit)
+    questions = sum(len(records) for records in sessions.values())
+    print(f"Replaying {questions} questions from {len(sessions)} sessions at x{args.speed:g}")
+
+    mock = server = None
+    try:
+        if args.with_mock:
+            mock, mock_url = start_mock(args)
+            # A sped-up replay asks faster than SESSION_RATE allows; --server-env SESSION_RATE=... overrides
+            server_env = {"SESSION_RATE": "0", **dict(kv.split("=", 1) for kv in args.server_env)}
+            server = start_server(args, mock_url, server_env)
+        results, elapsed = asyncio.run(replay(args, sessions))
+    finally:
+        if server is not None:
+            stop(server)
+        if mock is not None:
+            stop(mock)
+
+    latencies = [r["latency_s"] for r in results if r["ok"]]
+    lags = [r["lag_s"] for r in results]
+    rate_limited = sum(1 for r in results if r["rate_limited"])
+    print(f"revision {git_revision()}  {len(results)} questions in {elapsed:.1f}s, "
+          f"{sum(1 for r in results if not r['ok'] and not r['rate_limited'])} errors, "
+          f"{rate_limited} rate limited (429)")
+    if latencies:
+        print(f"  latency p50 {percentile(latencies, 50):.3f}s  p95 {percentile(latencies, 95):.3f}s  "
+              f"pacing lag p95 {percentile(lags, 95):.3f}s")
+    write_results(results, args.output)
+
+
+if __name__ == "__main__":
+    main()
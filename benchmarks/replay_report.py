@@ -0,0 +1,133 @@
+"""Compare two runs of the same traffic: latency distributions and answer diffs.
+
+Each run is a JSONL file from chat_server.py's capture (CAPTURE_PATH) or from
+benchmarks/replay.py. Questions are paired by captured session and position
+within it. A capture's latencies are measured in the server and a replay's
+at the client, so compare replays with replays for latency.
+
+    python benchmarks/replay_report.py results/replay-main.jsonl results/replay-no-cache.jsonl \\
+        --show 5 --output results/replay-diff.json
+"""
+import argparse
+import difflib
+import json
+import os
+from collections import defaultdict
+
+from loadgen import percentile
+
+
+def load_run(path):
+    """{(session, position in session): record}"""
+    records = {}
+    positions = defaultdict(int)
+    with open(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            records[(record["session"], positions[record["session"]])] = record
+            positions[record["session"]] += 1
+    return records
+
+
+def errors(records):
+    # 429s are the server's per-session rate limit rejecting a sped-up replay; counted separately
+    return sum(1 for r in records if not r["ok"] and not r.get("rate_limited", False))
+
+
+def distribution(records, field):
+    values = [r[field] for r in records if r["ok"] and r.get(field) is not None]
+    return {
+        "count": len(values),
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+        "mean": sum(values) / len(values) if values else None,
+    }
+
+
+def similarity(a, b):
+    return difflib.SequenceMatcher(None, a or "", b or "", autojunk=False).ratio()
+
+
+def compare(baseline, candidate, changed_below=0.9):
+    keys = sorted(baseline.keys() & candidate.keys())
+    report = {
+        "questions": {"baseline": len(baseline), "candidate": len(candidate), "paired": len(keys)},
+        "errors": {"baseline": errors(baseline.values()), "candidate": errors(candidate.values())},
+        "rate_limited": {name: sum(1 for r in run.values() if r.get("rate_limited", False))
+                         for name, run in (("baseline", baseline), ("candidate", candidate))},
+    }
+    for field in ("latency_s", "ttft_s"):
+        report[field] = {name: distribution(run.values(), field)
+                         for name, run in (("baseline", baseline), ("candidate", candidate))}
+
+    pairs = []
+    for key in keys:
+        before, after = baseline[key], candidate[key]
+        if before["ok"] and after["ok"]:
+            pairs.append((similarity(before["response"], after["response"]), key, before, after))
+    scores = [score for score, *_ in pairs]
+    report["answers"] = {
+        "compared": len(pairs),
+        "identical": sum(1 for score in scores if score == 1.0),
+        "changed": sum(1 for score in scores if score < changed_below),
+        "mean_similarity": sum(scores) / len(scores) if scores else None,
+    }
+    report["most_changed"] = [
+        {"session": key[0], "turn": key[1], "similarity": round(score, 3), "query": before["query"],
+         "baseline": before["response"], "candidate": after["response"]}
+        for score, key, before, after in sorted(pairs, key=lambda pair: pair[0])
+        if score < changed_below
+    ]
+    return report
+
+
+def print_report(report, show):
+    questions, failed, limited = report["questions"], report["errors"], report["rate_limited"]
+    print(f"{questions['paired']} paired questions ({questions['baseline']} baseline, "
+          f"{questions['candidate']} candidate); errors {failed['baseline']} -> {failed['candidate']}, "
+          f"rate limited {limited['baseline']} -> {limited['candidate']}")
+    if limited["baseline"] or limited["candidate"]:
+        print("  rate-limited (429) questions are left out of latencies and answer diffs; "
+              "replay with SESSION_RATE=0 on the server to compare them")
+    for field in ("latency_s", "ttft_s"):
+        before, after = report[field]["baseline"], report[field]["candidate"]
+        if before["p50"] is None or after["p50"] is None:
+            continue
+        for stat in ("p50", "p95", "p99", "mean"):
+            change = (after[stat] - before[stat]) / before[stat] * 100 if before[stat] else 0.0
+            print(f"  {field:10s} {stat:4s} {before[stat]:8.3f}s -> {after[stat]:8.3f}s  ({change:+6.1f}%)")
+    answers = report["answers"]
+    if answers["compared"]:
+        print(f"  answers: {answers['identical']} identical, {answers['changed']} changed "
+              f"of {answers['compared']} (mean similarity {answers['mean_similarity']:.3f})")
+    for item in report["most_changed"][:show]:
+        print(f"\n--- {item['session']} turn {item['turn']} (similarity {item['similarity']}): {item['query']}")
+        for line in difflib.unified_diff(item["baseline"].split(". "), item["candidate"].split(". "),
+                                         "baseline", "candidate", lineterm="", n=0):
+            print(f"    {line}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--changed-below", type=float, default=0.9,
+                        help="answers less similar than this count as changed")
+    parser.add_argument("--show", type=int, default=3, help="print diffs of the N most changed answers")
+    parser.add_argument("--output", help="write the JSON report to this path")
+    args = parser.parse_args()
+
+    report = compare(load_run(args.baseline), load_run(args.candidate), args.changed_below)
+    print_report(report, args.show)
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""Benchmark chat_server end to end against the mock Langflow upstream.
+
+Starts benchmarks/mock_langflow.py, starts chat_server.py with LANGFLOW_URL
+pointing at it, runs the load test and saves a JSON report that also records
+the server settings and how many runs reached the upstream.
+
+    python benchmarks/run_benchmark.py --concurrency 16 --requests 400 \\
+        --server-env CACHE_ENABLED=0 --output results/no-cache.json
+"""
+import argparse
+import asyncio
+import os
+import random
+import subprocess
+import sys
+import time
+from urllib.parse import urlsplit
+
+import httpx
+
+from loadgen import add_arguments, build_report, print_report, run_load, write_report
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def wait_until_ready(url, proc, timeout=60.0):
+    deadline = time.monotonic() + timeout
+    delay = 0.05
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"{url} process exited with code {proc.returncode}")
+        try:
+            if httpx.get(url, timeout=1.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(delay)
+        delay = min(delay * 2, 1.0)
+    raise TimeoutError(f"{url} not ready after {timeout:.0f}s")
+
+
+def stop(proc):
+    if proc.poll() is None:
+        proc.terminate()
+        try:
+            proc.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+def add_stack_arguments(parser):
+    parser.add_argument("--mock-port", type=int, default=7900)
+    parser.add_argument("--mock-latency", type=float, default=1.5)
+    parser.add_argument("--mock-ttft", type=float, default=0.3)
+    parser.add_argument("--mock-token-delay", type=float, default=0.02)
+    parser.add_argument("--mock-error-rate", type=float, default=0.0)
+    parser.add_argument("--mock-padding-kb", type=int, default=0)
+    parser.add_argument("--mock-flow-overhead", type=float, default=0.0)
+    parser.add_argument("--server-env", action="append", default=[], metavar="KEY=VALUE",
+                        help="extra environment for chat_server.py (repeatable)")
+
+
+def start_mock(args):
+    """Start mock_langflow.py with the --mock-* settings; returns (process, base URL)."""
+    mock_url = f"http://127.0.0.1:{args.mock_port}"
+    mock = subprocess.Popen([
+        sys.executable, os.path.join(ROOT, "benchmarks", "mock_langflow.py"),
+        "--port", str(args.mock_port),
+        "--latency", str(args.mock_latency),
+        "--ttft", str(args.mock_ttft),
+        "--token-delay", str(args.mock_token_delay),
+        "--error-rate", str(args.mock_error_rate),
+        "--padding-kb", str(args.mock_padding_kb),
+        "--flow-overhead", str(args.mock_flow_overhead),
+    ])
+    try:
+        wait_until_ready(f"{mock_url}/health", mock)
+    except Exception:
+        stop(mock)
+        raise
+    return mock, mock_url
+
+
+def start_server(args, mock_url, server_env):
+    """Start chat_server.py on the port of --url, calling the mock."""
+    server_port = str(urlsplit(args.url).port or 80)
+    env = dict(os.environ, LANGFLOW_URL=f"{mock_url}/", CHAT_PORT=server_port, **server_env)
+    server = subprocess.Popen([sys.executable, "chat_server.py"], cwd=ROOT, env=env)
+    base_url = args.url.rsplit("/", 1)[0]
+    wait_until_ready(f"{base_url}/health", server)
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end chat_server benchmark with a mock upstream")
+    add_arguments(parser)
+    add_stack_arguments(parser)
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    mock, mock_url = start_mock(args)
+    server = None
+    try:
+        server_env = dict(kv.split("=", 1) for kv in args.server_env)
+        server = start_server(args, mock_url, server_env)
+
+        samples, elapsed = asyncio.run(run_load(args))
+        upstream = httpx.get(f"{mock_url}/stats", timeout=5.0).json()
+        report = build_report(args, samples, elapsed, extra={"server_env": server_env, "upstream": upstream})
+        print_report(report)
+        print(f"  upstream runs: {upstream['runs']}")
+        write_report(report, args.output)
+    finally:
+        if server is not None:
+            stop(server)
+        stop(mock)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Throughput vs. worker count against the mock upstream.
+
+Runs benchmarks/run_benchmark.py once per worker count, with the answer
+cache and coalescing off and unique questions only, so every request
+reaches the upstream. Prints a table and saves the combined results.
+
+    python benchmarks/scaling.py --workers 1 2 4 --concurrency 64 --requests 1000
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--api-servers", type=int, default=1)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--mock-latency", type=float, default=0.5)
+    parser.add_argument("--stream", choices=["0", "1"], default="1")
+    parser.add_argument("--output-dir", default="results/scaling")
+    args = parser.parse_args()
+
+    rows = []
+    for workers in args.workers:
+        output = os.path.join(args.output_dir, f"workers-{workers}.json")
+        subprocess.run([
+            sys.executable, os.path.join(HERE, "run_benchmark.py"),
+            "--concurrency", str(args.concurrency),
+            "--requests", str(args.requests),
+            "--turns", "1",
+            "--template-ratio", "0",
+            "--mock-latency", str(args.mock_latency),
+            "--mock-ttft", str(args.mock_latency / 5),
+            "--server-env", f"CHAT_WORKERS_PER_DEVICE={workers}",
+            "--server-env", f"CHAT_API_SERVERS={args.api_servers}",
+            "--server-env", f"CHAT_STREAM={args.stream}",
+            "--server-env", "CACHE_ENABLED=0",
+            "--server-env", "COALESCE_ENABLED=0",
+            "--output", output,
+        ], check=True)
+        with open(output) as f:
+            report = json.load(f)
+        rows.append({
+            "workers": workers,
+            "throughput_rps": report["throughput_rps"],
+            "p50": report["overall"]["latency"]["p50"],
+            "p95": report["overall"]["latency"]["p95"],
+            "p99": report["overall"]["latency"]["p99"],
+            "errors": report["overall"]["errors"],
+        })
+
+    print(f"\n{'workers':>8} {'req/s':>8} {'p50 s':>8} {'p95 s':>8} {'p99 s':>8} {'errors':>7}")
+    for row in rows:
+        print(f"{row['workers']:>8} {row['throughput_rps']:>8.2f} {row['p50']:>8.3f} "
+              f"{row['p95']:>8.3f} {row['p99']:>8.3f} {row['errors']:>7}")
+    with open(os.path.join(args.output_dir, "summary.json"), "w") as f:
+        json.dump(rows, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
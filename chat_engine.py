@@ -0,0 +1,85 @@
+import json
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+UNAVAILABLE = "Service is currently under maintenance. Please try again later."
+
+
+class ChatEngine:
+    """HTTP client the Streamlit app uses to talk to chat_server.
+
+    One instance is shared by all browser sessions of a Streamlit process,
+    so its pooled keep-alive connections are reused across turns and users.
+
+    Each question carries a deadline ``deadline_margin`` seconds shorter than
+    ``timeout``, so the server gives up (and says so) before this client does.
+    """
+
+    def __init__(self, server_url, pool_size=32, timeout=90, deadline_margin=2.0):
+        self.server_url = server_url.rstrip("/")
+        self.timeout = timeout
+        self.deadline = max(1.0, timeout - deadline_margin)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def is_ready(self, timeout=0.5):
+        try:
+            return self.session.get(f"{self.server_url}/health", timeout=timeout).status_code == 200
+        except requests.RequestException:
+            return False
+
+    def queue_status(self, timeout=0.5):
+        """The server's admission queue (see /queue), or None if it did not answer."""
+        try:
+            response = self.session.get(f"{self.server_url}/queue", timeout=timeout)
+            response.raise_for_status()
+            return response.json()
+        except (requests.RequestException, ValueError):
+            return None
+
+    def wait_until_ready(self, timeout=30, is_alive=None):
+        # Exponential backoff: a server that is (nearly) up is found within tens of ms
+        deadline = time.monotonic() + timeout
+        delay = 0.05
+        while time.monotonic() < deadline:
+            if self.is_ready():
+                return True
+            if is_alive is not None and not is_alive():
+                return False
+            time.sleep(delay)
+            delay = min(delay * 2, 1.0)
+        return False
+
+    def stream_reply(self, query, session_id, has_history=False):
+        """Yield the answer chunk by chunk; the server sends one JSON object per line."""
+        try:
+            with self.session.post(
+                f"{self.server_url}/predict",
+                json={
+                    "query": query,
+                    "session_id": session_id,
+                    # Lets the server skip its answer cache for follow-up questions
+                    "has_history": has_history,
+                    # Seconds the server may wait on Langflow (to the first token when streaming)
+                    "deadline": self.deadline
+                },
+                stream=True,
+                timeout=self.timeout
+            ) as response:
+                if response.status_code in (429, 503) and "retry-after" in response.headers:
+                    # Turned away by admission control; the body says why and for how long
+                    yield response.json().get("response", UNAVAILABLE)
+                    return
+                response.raise_for_status()
+                for line in response.iter_lines(decode_unicode=True):
+                    if not line:
+                        continue
+                    chunk = json.loads(line).get("response", "")
+                    if chunk:
+                        yield chunk
+        except Exception as e:
+            yield f"Error: {str(e)}"
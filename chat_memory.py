@@ -0,0 +1,69 @@
+import json
+from collections import OrderedDict, defaultdict
+
+USER = ("User", "User")
+MACHINE = ("Machine", "AI Assistant")
+
+
+def format_history(messages, template="{sender_name}: {text}"):
+    # Same rendering as the flow's Memory-3Qm7y component
+    return "\n".join(template.format_map(defaultdict(str, message)) for message in messages)
+
+
+class InMemoryChatMemory:
+    """Per-session message history kept in this process (bounded LRU of sessions)."""
+
+    def __init__(self, max_sessions=10000, max_messages=200):
+        self.max_sessions = max_sessions
+        self.max_messages = max_messages
+        self._sessions = OrderedDict()
+
+    async def get_messages(self, session_id, n_messages):
+        messages = self._sessions.get(session_id, [])
+        return messages[-n_messages:] if n_messages else []
+
+    async def add_message(self, session_id, sender, sender_name, text):
+        messages = self._sessions.setdefault(session_id, [])
+        self._sessions.move_to_end(session_id)
+        messages.append({"sender": sender, "sender_name": sender_name, "text": text})
+        del messages[:-self.max_messages]
+        if len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+
+
+class RedisChatMemory:
+    """Message history in Redis, in the format Langflow's RedisChatMemory
+    component uses (one list per session, newest message first), so turns
+    written here are visible to the Langflow flow and vice versa.
+
+    Needs the ``redis`` package.
+    """
+
+    _TYPES = {"human": USER, "ai": MACHINE}
+    # The component leaves an empty key_prefix out, so LangChain's
+    # RedisChatMessageHistory default applies
+    DEFAULT_KEY_PREFIX = "message_store:"
+
+    def __init__(self, url, key_prefix=""):
+        import redis.asyncio as redis
+
+        self.client = redis.from_url(url)
+        self.key_prefix = key_prefix or self.DEFAULT_KEY_PREFIX
+
+    async def get_messages(self, session_id, n_messages):
+        if not n_messages:
+            return []
+        items = await self.client.lrange(f"{self.key_prefix}{session_id}", 0, n_messages - 1)
+        messages = []
+        for item in reversed(items):
+            stored = json.loads(item)
+            sender, sender_name = self._TYPES.get(stored.get("type"), USER)
+            messages.append({"sender": sender, "sender_name": sender_name,
+                             "text": stored.get("data", {}).get("content", "")})
+        return messages
+
+    async def add_message(self, session_id, sender, sender_name, text):
+        message_type = "ai" if sender == MACHINE[0] else "human"
+        stored = {"type": message_type, "data": {"content": text, "type": message_type,
+                                                  "additional_kwargs": {}, "response_metadata": {}}}
+        await self.client.lpush(f"{self.key_prefix}{session_id}", json.dumps(stored))
@@ -1,19 +1,43 @@
+# Multiprocess metrics need their directory before prometheus_client is
+# imported (through server_metrics below); spawned workers inherit it
+if __name__ == "__main__":
+    from serving import prepare_metrics_dir
+    prepare_metrics_dir()
+
+from collections import OrderedDict
 from uuid import uuid4
+import argparse
+import asyncio
 import logging
-import requests
+import os
+import random
+import threading
+import time
+import httpx
 import litserve as ls
-import copy
-
-from fastapi import FastAPI
 
-app = FastAPI()
-
-@app.get("/health")
-async def health_check():
-    return {"status": "ready", "service": "chat_api"}
+from admission import AdmissionMiddleware, AdmissionState, add_queue_route
+from answer_cache import AnswerCache, normalize_query
+from coalesce import SingleFlight
+from chat_memory import MACHINE, USER, InMemoryChatMemory, RedisChatMemory
+from embeddings import HashingEmbedder, OllamaEmbedder
+from history_window import ExtractiveSummarizer, HistoryWindow, LLMSummarizer, build_tokenizer, insert_summary
+from langflow_payload import CompiledPayload
+from langflow_response import LangflowResponseError, iter_langflow_tokens, parse_run_response
+from rag_pipeline import OllamaGenerator, RagPipeline
+from readiness import UpstreamProbe, add_health_routes
+from resilience import (CircuitBreaker, CircuitOpenError, Deadline, DeadlineExceeded, LatencyTracker, backoff,
+                        counts_as_failure, hedge, is_retryable)
+from retrieval import InMemoryRetriever, MilvusRetriever, format_context
+from server_metrics import (BATCH_SIZE_OBSERVED, COALESCED_REQUESTS, CACHE_REQUESTS, HISTORY_TOKENS,
+                            RESPONSE_BYTES, RESPONSE_PARSES, RETRIEVAL_SECONDS, STAGE_SECONDS, UPSTREAM_FAILURES, UPSTREAM_FIRST_TOKEN_SECONDS, UPSTREAM_HEDGES,
+                            UPSTREAM_RETRIES, UPSTREAM_SECONDS, metrics_app, observe_component_timings, timed)
+from serving import DrainMiddleware, DrainState, install_graceful_shutdown
+from template_questions import TEMPLATE_QUESTIONS
+from traffic_capture import TrafficCapture
 
 # Use the same configuration as your original API
-BASE_API_URL = "http://94.56.105.18:7898/"
+BASE_API_URL = os.getenv("LANGFLOW_URL", "http://94.56.105.18:7898/")
 FLOW_ID = "e1f7e7f9-9f59-4c88-b64e-a6430836f311"
 ENDPOINT = "dxr-rag-godiva"
 
@@ -138,74 +162,945 @@ TWEAKS = {
 
 logging.basicConfig(level=logging.INFO)
 
+# Stream tokens from Langflow to the client as they are generated
+STREAM_RESPONSES = os.getenv("CHAT_STREAM", "1") == "1"
+
+# Pooled keep-alive connection to Langflow (one pool per worker process)
+LANGFLOW_POOL_SIZE = int(os.getenv("LANGFLOW_POOL_SIZE", "64"))
+LANGFLOW_KEEPALIVE = int(os.getenv("LANGFLOW_KEEPALIVE", "16"))
+LANGFLOW_KEEPALIVE_EXPIRY = float(os.getenv("LANGFLOW_KEEPALIVE_EXPIRY", "60"))
+LANGFLOW_CONNECT_TIMEOUT = float(os.getenv("LANGFLOW_CONNECT_TIMEOUT", "5"))
+LANGFLOW_READ_TIMEOUT = float(os.getenv("LANGFLOW_READ_TIMEOUT", "90"))
+
+# Resilience of Langflow calls. Each request carries a deadline (the client's,
+# clamped to MIN_DEADLINE..MAX_DEADLINE) bounding the time to the answer, or
+# to the first token when streaming. A circuit breaker per upstream fails fast
+# after BREAKER_FAILURES consecutive failures, for BREAKER_RESET seconds. A
+# missed deadline only counts as a failure when the upstream had at least
+# BREAKER_SLOW_CALL seconds, so short client deadlines cannot open it. Failures
+# where the flow did not run are retried with jittered backoff. With
+# LANGFLOW_SECONDARY_URL set, a call still running after the recent
+# HEDGE_PERCENTILE latency is repeated against that replica and the first
+# answer wins; both runs write the turn to the session's memory.
+MAX_DEADLINE = LANGFLOW_CONNECT_TIMEOUT + LANGFLOW_READ_TIMEOUT
+MIN_DEADLINE = float(os.getenv("MIN_DEADLINE", "1"))
+LANGFLOW_RETRIES = int(os.getenv("LANGFLOW_RETRIES", "2"))
+RETRY_BASE_DELAY = float(os.getenv("RETRY_BASE_DELAY", "0.2"))
+RETRY_MAX_DELAY = float(os.getenv("RETRY_MAX_DELAY", "2"))
+BREAKER_FAILURES = int(os.getenv("BREAKER_FAILURES", "5"))
+BREAKER_RESET = float(os.getenv("BREAKER_RESET", "30"))
+BREAKER_SLOW_CALL = float(os.getenv("BREAKER_SLOW_CALL", "30"))
+LANGFLOW_SECONDARY_URL = os.getenv("LANGFLOW_SECONDARY_URL", "")
+HEDGE_PERCENTILE = float(os.getenv("HEDGE_PERCENTILE", "0.95"))
+HEDGE_MIN_DELAY = float(os.getenv("HEDGE_MIN_DELAY", "0.5"))
+
+# Answer cache for first questions of a session (exact + optional semantic tier).
+# A cache hit is written to the session's history so follow-ups see it; with
+# the Langflow backend that needs REDIS_URL, and the cache is off without it.
+CACHE_ENABLED = os.getenv("CACHE_ENABLED", "1") == "1"
+CACHE_TTL = float(os.getenv("CACHE_TTL", "3600"))
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "1024"))
+CACHE_MAX_BYTES = int(os.getenv("CACHE_MAX_BYTES", str(16 * 1024 * 1024)))
+CACHE_SEMANTIC = os.getenv("CACHE_SEMANTIC", "0") == "1"
+CACHE_EMBEDDER = os.getenv("CACHE_EMBEDDER", "hashing")  # "hashing" or "ollama"
+CACHE_SIMILARITY = float(os.getenv("CACHE_SIMILARITY", "0.92"))
+CACHE_PREWARM = os.getenv("CACHE_PREWARM", "0") == "1"
+MAX_TRACKED_SESSIONS = 10000
+
+# Coalesce identical in-flight first questions into a single Langflow run
+# (needs REDIS_URL with the Langflow backend, like the answer cache)
+COALESCE_ENABLED = os.getenv("COALESCE_ENABLED", "1") == "1"
+
+# Micro-batching: with CHAT_BATCH_SIZE > 1, concurrent questions share one
+# embedding call and one vector search (see BatchedChatLitAPI)
+BATCH_SIZE = int(os.getenv("CHAT_BATCH_SIZE", "1"))
+BATCH_TIMEOUT = float(os.getenv("CHAT_BATCH_TIMEOUT", "0.05"))
+
+# Where answers come from: "langflow" (the flow's run API) or "direct"
+# (chat_server runs the flow's RAG steps itself, with the endpoints below)
+CHAT_BACKEND = os.getenv("CHAT_BACKEND", "langflow")
+OLLAMA_URL = os.getenv("OLLAMA_URL", TWEAKS["OllamaModel-RdzdC"]["base_url"])
+MILVUS_URI = os.getenv("MILVUS_URI", TWEAKS["Milvus-tbjwD"]["uri"])
+MILVUS_TOKEN = os.getenv("MILVUS_TOKEN", TWEAKS["Milvus-tbjwD"]["password"])
+PIPELINE_EMBEDDER = os.getenv("PIPELINE_EMBEDDER", "ollama")  # "ollama" or "hashing"
+RETRIEVER = os.getenv("RETRIEVER", "milvus")  # "milvus" or "memory"
+RETRIEVER_DOCS = os.getenv("RETRIEVER_DOCS", "")  # JSONL documents for the in-memory retriever
+REDIS_URL = os.getenv("REDIS_URL", "")  # chat memory; kept in-process when unset
+
+# Token-budgeted conversation history: follow-up questions get the last
+# HISTORY_MAX_TURNS turns that fit in HISTORY_TOKEN_BUDGET tokens, and older
+# turns are folded into a rolling summary. 0 turns the window off (the flow
+# then reads Memory-3Qm7y's n_messages). Without REDIS_URL the server windows
+# the turns it relayed itself, which is exact with a single worker.
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "1024"))
+HISTORY_MAX_TURNS = int(os.getenv("HISTORY_MAX_TURNS", "6"))
+HISTORY_TOKENIZER = os.getenv("HISTORY_TOKENIZER", "approx")  # "approx" or "hf:<tokenizer name>"
+HISTORY_SUMMARY = os.getenv("HISTORY_SUMMARY", "extractive")  # "extractive", "llm" or "off"
+HISTORY_SUMMARY_TOKENS = int(os.getenv("HISTORY_SUMMARY_TOKENS", "200"))
+
+# Admission control in front of /predict: each session may ask SESSION_BURST
+# questions at once and SESSION_RATE per second after that (0 = no limit);
+# at most ADMISSION_MAX_IN_FLIGHT questions are answered at a time (0 = no
+# cap), and up to ADMISSION_MAX_QUEUE more wait up to ADMISSION_MAX_WAIT
+# seconds for a slot. Rejections are answered at once with Retry-After.
+SESSION_RATE = float(os.getenv("SESSION_RATE", "0.5"))
+SESSION_BURST = int(os.getenv("SESSION_BURST", "3"))
+ADMISSION_MAX_IN_FLIGHT = int(os.getenv("ADMISSION_MAX_IN_FLIGHT", "64"))
+ADMISSION_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", "128"))
+ADMISSION_MAX_WAIT = float(os.getenv("ADMISSION_MAX_WAIT", "10"))
+
+# Opt-in traffic capture for offline replay (benchmarks/replay.py): every
+# answered question of a CAPTURE_SAMPLE_RATE share of sessions is appended to
+# CAPTURE_PATH as anonymized JSONL, with session IDs hashed with CAPTURE_SALT
+CAPTURE_PATH = os.getenv("CAPTURE_PATH", "")
+CAPTURE_SAMPLE_RATE = float(os.getenv("CAPTURE_SAMPLE_RATE", "1"))
+CAPTURE_SALT = os.getenv("CAPTURE_SALT", "")
+
+# How long /ready reuses the result of its upstream reachability probes
+READINESS_TTL = float(os.getenv("READINESS_TTL", "10"))
+
+# Send only the per-request tweak fields when the flow already stores the defaults
+LANGFLOW_MINIMAL_TWEAKS = os.getenv("LANGFLOW_MINIMAL_TWEAKS", "0") == "1"
+
+# Fraction of requests whose Langflow payload and response are logged (0 = off),
+# and how much of each is logged
+LOG_PAYLOAD_SAMPLE_RATE = float(os.getenv("LOG_PAYLOAD_SAMPLE_RATE", "0"))
+LOG_PAYLOAD_MAX_BYTES = int(os.getenv("LOG_PAYLOAD_MAX_BYTES", "2048"))
+
+# Fraction of blocking responses parsed in full to record per-component timings;
+# the others only decode the answer
+COMPONENT_TIMINGS_SAMPLE_RATE = float(os.getenv("COMPONENT_TIMINGS_SAMPLE_RATE", "0.05"))
+
+JSON_HEADERS = {"Content-Type": "application/json"}
+# Shown when the upstream answered with no text; counted as a failed turn
+NO_ANSWER = "No valid response found."
+
+# Tweak fields filled in per request: every place that needs the session ID
+# (critical session binding) and the chat input itself
+PAYLOAD_SLOTS = {
+    "session_id": [
+        ("TextInput-uI2CW", "input_value"),
+        ("ChatInput-8fGO2", "session_id"),
+        ("Memory-3Qm7y", "session_id"),
+        ("ChatOutput-TR3Kc", "session_id"),
+        ("RedisChatMemory-03Kf3", "session_id"),
+        ("StoreMessage-MfcnZ", "session_id"),
+        ("StoreMessage-ar6CI", "session_id"),
+    ],
+    "query": [
+        ("ChatInput-8fGO2", "input_value"),
+    ],
+}
+
+# Filled in per request when the history window is on: how many stored
+# messages Memory-3Qm7y reads, and the prompt template carrying the summary.
+# (conversation_history itself is fed by an edge, which tweaks cannot override.)
+HISTORY_SLOTS = {
+    "n_messages": [("Memory-3Qm7y", "n_messages")],
+    "prompt_template": [("Prompt-Ciphp", "template")],
+}
+
+
+def sample_payload_log():
+    return LOG_PAYLOAD_SAMPLE_RATE > 0 and random.random() < LOG_PAYLOAD_SAMPLE_RATE
+
+
+def excerpt(body):
+    # Payloads and responses are tens of KB to MB; logs get the start and the size
+    text = body[:LOG_PAYLOAD_MAX_BYTES].decode("utf-8", errors="replace")
+    return text if len(body) <= LOG_PAYLOAD_MAX_BYTES else f"{text}... ({len(body)} bytes)"
+
+
+def build_http_client(base_url=BASE_API_URL):
+    return httpx.AsyncClient(
+        base_url=base_url,
+        limits=httpx.Limits(
+            max_connections=LANGFLOW_POOL_SIZE,
+            max_keepalive_connections=LANGFLOW_KEEPALIVE,
+            keepalive_expiry=LANGFLOW_KEEPALIVE_EXPIRY,
+        ),
+        timeout=httpx.Timeout(LANGFLOW_READ_TIMEOUT, connect=LANGFLOW_CONNECT_TIMEOUT),
+    )
+
+
+def compile_payload(stream=False, windowed=False):
+    return CompiledPayload(
+        TWEAKS,
+        {**PAYLOAD_SLOTS, **HISTORY_SLOTS} if windowed else PAYLOAD_SLOTS,
+        # The model only emits token events when streaming is enabled on it
+        overrides={("OllamaModel-RdzdC", "stream"): stream},
+        minimal=LANGFLOW_MINIMAL_TWEAKS,
+    )
+
+
+def build_chat_memory():
+    if REDIS_URL:
+        return RedisChatMemory(REDIS_URL, key_prefix=TWEAKS["RedisChatMemory-03Kf3"]["key_prefix"])
+    return InMemoryChatMemory()
+
+
+def build_generator():
+    model = TWEAKS["OllamaModel-RdzdC"]
+    return OllamaGenerator(OLLAMA_URL, model["model_name"], system_message=model["system_message"],
+                           temperature=model["temperature"], timeout=LANGFLOW_READ_TIMEOUT)
+
+
+def build_history_window(generator=None):
+    if HISTORY_TOKEN_BUDGET <= 0:
+        return None
+    tokenizer = build_tokenizer(HISTORY_TOKENIZER)
+    history_template = TWEAKS["Memory-3Qm7y"]["template"]
+    if HISTORY_SUMMARY == "llm":
+        summarizer = LLMSummarizer(generator or build_generator(), tokenizer, HISTORY_SUMMARY_TOKENS,
+                                   history_template=history_template)
+    elif HISTORY_SUMMARY == "extractive":
+        summarizer = ExtractiveSummarizer(tokenizer, HISTORY_SUMMARY_TOKENS)
+    else:
+        summarizer = None
+    return HistoryWindow(tokenizer, token_budget=HISTORY_TOKEN_BUDGET, max_turns=HISTORY_MAX_TURNS,
+                         summarizer=summarizer, history_template=history_template)
+
+
+def build_rag_pipeline():
+    milvus = TWEAKS["Milvus-tbjwD"]
+    if PIPELINE_EMBEDDER == "hashing":
+        embedder = HashingEmbedder()
+    else:
+        embedder = OllamaEmbedder(OLLAMA_URL, TWEAKS["OllamaEmbeddings-EarNo"]["model_name"])
+    if RETRIEVER == "memory":
+        retriever = InMemoryRetriever.from_jsonl(RETRIEVER_DOCS, embedder) if RETRIEVER_DOCS \
+            else InMemoryRetriever([], embedder)
+    else:
+        retriever = MilvusRetriever(MILVUS_URI, MILVUS_TOKEN, milvus["collection_name"],
+                                    text_field=milvus["text_field"], vector_field=milvus["vector_field"],
+                                    search_params=milvus["search_params"],
+                                    consistency_level=milvus["consistency_level"], timeout=milvus["timeout"])
+    generator = build_generator()
+    return RagPipeline(
+        embedder, retriever, generator, build_chat_memory(),
+        prompt_template=TWEAKS["Prompt-Ciphp"]["template"],
+        number_of_results=milvus["number_of_results"],
+        n_messages=TWEAKS["Memory-3Qm7y"]["n_messages"],
+        context_template=TWEAKS["ParseData-FAWPR"]["template"],
+        context_sep=TWEAKS["ParseData-FAWPR"]["sep"],
+        history_template=TWEAKS["Memory-3Qm7y"]["template"],
+        window=build_history_window(generator),
+    )
+
+
+def build_answer_cache():
+    if not CACHE_ENABLED:
+        return None
+    embedder = None
+    if CACHE_SEMANTIC:
+        if CACHE_EMBEDDER == "ollama":
+            embedder = OllamaEmbedder(TWEAKS["OllamaEmbeddings-EarNo"]["base_url"],
+                                      TWEAKS["OllamaEmbeddings-EarNo"]["model_name"])
+        else:
+            embedder = HashingEmbedder()
+    return AnswerCache(ttl=CACHE_TTL, max_entries=CACHE_MAX_ENTRIES, max_bytes=CACHE_MAX_BYTES,
+                       embedder=embedder, similarity_threshold=CACHE_SIMILARITY)
+
+
+def build_traffic_capture():
+    if not CAPTURE_PATH:
+        return None
+    return TrafficCapture(CAPTURE_PATH, salt=CAPTURE_SALT, sample_rate=CAPTURE_SAMPLE_RATE)
+
+
+class LangflowBackend:
+    """Answers through the Langflow flow: one run API call per question."""
+
+    def __init__(self):
+        self.api_path = f"/api/v1/run/{ENDPOINT}"
+        # Shared by every in-flight request of this worker
+        self.clients = {"primary": build_http_client()}
+        if LANGFLOW_SECONDARY_URL:
+            self.clients["secondary"] = build_http_client(LANGFLOW_SECONDARY_URL)
+        self.breakers = {name: CircuitBreaker(BREAKER_FAILURES, BREAKER_RESET) for name in self.clients}
+        # Recent primary latencies (full answer / first token) that set the hedging delay
+        self.latency = {"blocking": LatencyTracker(), "stream": LatencyTracker()}
+        self.window = build_history_window()
+        # Turns the window reads: Redis (shared with the flow) or this worker's own record
+        self.history = build_chat_memory() if self.window is not None or REDIS_URL else None
+        # Turns answered without a run (e.g. from the answer cache) can only
+        # reach the flow's memory through Redis
+        self.records_turns = bool(REDIS_URL)
+        # Static tweaks are serialized once; only query/session (and history) slots change per request
+        self.payloads = {stream: compile_payload(stream, windowed=self.window is not None)
+                         for stream in (False, True)}
+
+    async def aclose(self):
+        for client in self.clients.values():
+            await client.aclose()
+
+    async def history_values(self, session_id, has_history):
+        """Values of the history slots: Memory-3Qm7y's n_messages and the prompt template."""
+        if self.window is None:
+            return {}
+        values = {"n_messages": TWEAKS["Memory-3Qm7y"]["n_messages"],
+                  "prompt_template": TWEAKS["Prompt-Ciphp"]["template"]}
+        if not has_history:
+            return values
+        with timed(STAGE_SECONDS.labels(stage="history")):
+            try:
+                messages = await self.history.get_messages(session_id, TWEAKS["Memory-3Qm7y"]["n_messages"])
+            except Exception as e:
+                logging.warning(f"Reading conversation history failed, sending it untrimmed: {str(e)}")
+                return values
+            if not messages:
+                # Turns this worker never saw: leave the flow's own setting
+                return values
+            kept, summary = await self.window.compact(session_id, messages)
+        HISTORY_TOKENS.labels(stage="full").observe(self.window.count(messages))
+        HISTORY_TOKENS.labels(stage="windowed").observe(self.window.count(kept))
+        # +1: ChatInput-8fGO2 stores the question before Memory-3Qm7y reads the history
+        values["n_messages"] = len(kept) + 1
+        values["prompt_template"] = insert_summary(values["prompt_template"], summary)
+        return values
+
+    async def remember(self, session_id, query, answer):
+        # With Redis the flow stores the turn itself
+        if self.history is not None and not REDIS_URL and answer:
+            await self.history.add_message(session_id, *USER, query)
+            await self.history.add_message(session_id, *MACHINE, answer)
+
+    async def record_turn(self, session_id, query, answer):
+        """Store a turn the flow did not run where the flow reads the session's history."""
+        await self.history.add_message(session_id, *USER, query)
+        await self.history.add_message(session_id, *MACHINE, answer)
+
+    async def guarded(self, name, call, body, deadline, kind):
+        """One call to the named upstream, through its circuit breaker and within the deadline."""
+        breaker = self.breakers[name]
+        if not breaker.allow():
+            raise CircuitOpenError(f"Langflow {name} circuit is open")
+        start = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(call(self.clients[name], body), deadline.remaining())
+        except asyncio.TimeoutError as e:
+            if time.perf_counter() - start >= BREAKER_SLOW_CALL:
+                breaker.record_failure()
+            else:
+                # The caller's deadline was shorter than the upstream deserves
+                breaker.release()
+            raise DeadlineExceeded(f"No answer from Langflow {name} within the deadline") from e
+        except asyncio.CancelledError:
+            breaker.release()
+            raise
+        except Exception as e:
+            if counts_as_failure(e):
+                breaker.record_failure()
+            else:
+                breaker.release()
+            raise
+        breaker.record_success()
+        if name == "primary":
+            self.latency[kind].observe(time.perf_counter() - start)
+        return result
+
+    async def hedged_call(self, call, body, deadline, kind):
+        UPSTREAM_HEDGES.labels(result="launched").inc()
+        return await self.guarded("secondary", call, body, deadline, kind)
+
+    async def call_upstream(self, call, body, deadline, kind, discard=None):
+        """``call(client, body)`` with the circuit breaker, retries and, when a
+        secondary replica is configured, a hedged call to it."""
+        attempt = 0
+        while True:
+            try:
+                if "secondary" not in self.clients:
+                    return await self.guarded("primary", call, body, deadline, kind)
+                delay = max(HEDGE_MIN_DELAY, self.latency[kind].percentile(HEDGE_PERCENTILE) or 0.0)
+                result, winner = await hedge(lambda: self.guarded("primary", call, body, deadline, kind),
+                                             lambda: self.hedged_call(call, body, deadline, kind),
+                                             delay, discard=discard)
+                if winner:
+                    UPSTREAM_HEDGES.labels(result="won").inc()
+                return result
+            except Exception as e:
+                delay = backoff(attempt, RETRY_BASE_DELAY, RETRY_MAX_DELAY)
+                if attempt >= LANGFLOW_RETRIES or not is_retryable(e) or deadline.remaining() <= delay:
+                    raise
+                attempt += 1
+                UPSTREAM_RETRIES.inc()
+                logging.warning(f"Retrying Langflow call in {delay:.2f}s after: {str(e)}")
+                await asyncio.sleep(delay)
+
+    async def run_blocking(self, client, body):
+        with timed(UPSTREAM_SECONDS.labels(mode="blocking")):
+            response = await client.post(self.api_path, content=body, headers=JSON_HEADERS)
+        response.raise_for_status()
+        return response
+
+    async def answer(self, query, session_id, has_history=False, deadline=None):
+        values = await self.history_values(session_id, has_history)
+        with timed(STAGE_SECONDS.labels(stage="payload")):
+            body = self.payloads[False].render(query=query, session_id=session_id, **values)
+
+        # Full payloads are large; only log (the start of) a sample of them
+        verbose = sample_payload_log()
+        if verbose:
+            logging.info(f"Sending to Langflow: {excerpt(body)}")
+
+        response = await self.call_upstream(self.run_blocking, body, deadline or Deadline(MAX_DEADLINE), "blocking")
+        content = response.content
+        RESPONSE_BYTES.observe(len(content))
+        if verbose:
+            logging.info(f"Raw Langflow response: {excerpt(content)}")
+
+        try:
+            with timed(STAGE_SECONDS.labels(stage="parse")):
+                parsed = parse_run_response(content, full=random.random() < COMPONENT_TIMINGS_SAMPLE_RATE)
+        except (ValueError, LangflowResponseError) as e:
+            UPSTREAM_FAILURES.labels(kind="parse").inc()
+            logging.warning(f"Unparseable Langflow response: {excerpt(content)}")
+            raise LangflowResponseError(f"Unexpected Langflow response: {str(e)}") from e
+        RESPONSE_PARSES.labels(method=parsed.method, shape=parsed.shape).inc()
+        if parsed.data is not None:
+            observe_component_timings(parsed.data)
+        await self.remember(session_id, query, parsed.text)
+        return parsed.text
+
+    async def run_stream(self, client, body):
+        async with client.stream("POST", self.api_path, params={"stream": "true"},
+                                 content=body, headers=JSON_HEADERS) as response:
+            response.raise_for_status()
+            async for chunk in iter_langflow_tokens(response.aiter_lines()):
+                yield chunk
+
+    async def start_stream(self, client, body):
+        """Open a streamed run and wait for its first chunk: (first chunk or None, rest of the stream).
+
+        This is the part the deadline, retries and hedging apply to; once
+        tokens flow, the rest of the answer is relayed as it comes.
+        """
+        stream = self.run_stream(client, body)
+        try:
+            return await stream.__anext__(), stream
+        except StopAsyncIteration:
+            return None, stream
+        except BaseException:
+            await stream.aclose()
+            raise
+
+    @staticmethod
+    async def close_stream(started):
+        await started[1].aclose()
+
+    async def stream(self, query, session_id, has_history=False, deadline=None):
+        values = await self.history_values(session_id, has_history)
+        with timed(STAGE_SECONDS.labels(stage="payload")):
+            body = self.payloads[True].render(query=query, session_id=session_id, **values)
+        if sample_payload_log():
+            logging.info(f"Sending to Langflow: {excerpt(body)}")
+
+        start = time.perf_counter()
+        first, stream = await self.call_upstream(self.start_stream, body, deadline or Deadline(MAX_DEADLINE),
+                                                 "stream", discard=self.close_stream)
+        UPSTREAM_FIRST_TOKEN_SECONDS.observe(time.perf_counter() - start)
+        chunks = []
+        try:
+            if first is not None:
+                chunks.append(first)
+                yield first
+            async for chunk in stream:
+                chunks.append(chunk)
+                yield chunk
+        finally:
+            await stream.aclose()
+        UPSTREAM_SECONDS.labels(mode="stream").observe(time.perf_counter() - start)
+        await self.remember(session_id, query, "".join(chunks))
+
+
+class DirectPipelineBackend:
+    """Runs the flow's steps itself (embed -> retrieve -> prompt -> generate,
+    see RagPipeline) against Ollama and the vector store, without the Langflow
+    hop and its large run response."""
+
+    def __init__(self):
+        self.pipeline = build_rag_pipeline()
+        self.records_turns = True
+
+    async def record_turn(self, session_id, query, answer):
+        await self.pipeline.remember(session_id, query, answer)
+
+    async def aclose(self):
+        await self.pipeline.generator.client.aclose()
+
+    async def answer(self, query, session_id, has_history=False, deadline=None):
+        deadline = deadline or Deadline(MAX_DEADLINE)
+        try:
+            with timed(UPSTREAM_SECONDS.labels(mode="direct")):
+                return await asyncio.wait_for(self.pipeline.answer(query, session_id), deadline.remaining())
+        except asyncio.TimeoutError as e:
+            raise DeadlineExceeded("No answer from the RAG pipeline within the deadline") from e
+
+    async def stream(self, query, session_id, has_history=False, deadline=None):
+        deadline = deadline or Deadline(MAX_DEADLINE)
+        start = time.perf_counter()
+        stream = self.pipeline.stream_answer(query, session_id)
+        try:
+            try:
+                first = await asyncio.wait_for(stream.__anext__(), deadline.remaining())
+            except StopAsyncIteration:
+                return
+            except asyncio.TimeoutError as e:
+                raise DeadlineExceeded("No answer from the RAG pipeline within the deadline") from e
+            UPSTREAM_FIRST_TOKEN_SECONDS.observe(time.perf_counter() - start)
+            yield first
+            async for chunk in stream:
+                yield chunk
+        finally:
+            await stream.aclose()
+        UPSTREAM_SECONDS.labels(mode="direct_stream").observe(time.perf_counter() - start)
+
+
+def error_output(error):
+    """Count and log a failed turn; returns the error shown to the user."""
+    if isinstance(error, CircuitOpenError):
+        UPSTREAM_FAILURES.labels(kind="circuit_open").inc()
+        logging.warning(str(error))
+    elif isinstance(error, DeadlineExceeded):
+        UPSTREAM_FAILURES.labels(kind="deadline").inc()
+        logging.error(str(error))
+        return {"error": "The request took too long. Please try again."}
+    elif isinstance(error, httpx.TimeoutException):
+        UPSTREAM_FAILURES.labels(kind="timeout").inc()
+        logging.error(f"Upstream timed out: {str(error)}")
+    elif isinstance(error, httpx.HTTPStatusError):
+        UPSTREAM_FAILURES.labels(kind="http").inc()
+        logging.error(f"HTTP error: {str(error)}")
+    elif isinstance(error, LangflowResponseError):
+        # Counted as a parse failure where it was raised
+        logging.error(str(error))
+    else:
+        logging.error(f"Unexpected error: {str(error)}")
+        return {"error": "An unexpected error occurred."}
+    return {"error": "Service unavailable. Please try again later."}
+
+
+def build_backend(kind=CHAT_BACKEND):
+    if kind == "direct":
+        return DirectPipelineBackend()
+    return LangflowBackend()
+
+
 class ChatLitAPI(ls.LitAPI):
+    # Where answers come from: "langflow" or "direct" (see build_backend)
+    backend_kind = CHAT_BACKEND
+
     def setup(self, device):
         self.device = device
-        logging.info(f"ChatLitAPI initialized on device: {device}")
+        self.backend = build_backend(self.backend_kind)
+        self.cache = build_answer_cache()
+        if self.cache is not None and not self.backend.records_turns:
+            # A cached answer would be missing from the history of the session's next question
+            logging.warning("Answer cache disabled: the Langflow backend needs REDIS_URL to record cached turns")
+            self.cache = None
+        # Identical first questions in flight at the same time share one upstream call
+        self.flights = SingleFlight() if COALESCE_ENABLED else None
+        if self.flights is not None and not self.backend.records_turns:
+            # Only the leader's session would have the turn in its history
+            logging.warning("Coalescing disabled: the Langflow backend needs REDIS_URL to record shared turns")
+            self.flights = None
+        # Sessions that already had a turn on this worker (bounded LRU)
+        self.seen_sessions = OrderedDict()
+        self.capture = build_traffic_capture()
+        if self.cache is not None and CACHE_PREWARM:
+            threading.Thread(target=self.prewarm_cache, args=(TEMPLATE_QUESTIONS,), daemon=True).start()
+        logging.info(f"ChatLitAPI initialized on device: {device} ({self.backend_kind} backend)")
 
-    def decode_request(self, request):
-        # Extract both query AND session_id from request
-        return {
-            "query": request.get("query", ""),
-            "session_id": request.get("session_id", "immer-session") # Get session ID
-        }
+    async def decode_request(self, request):
+        return self.parse_request(request)
+
+    def parse_request(self, request):
+        with timed(STAGE_SECONDS.labels(stage="decode")):
+            # Extract both query AND session_id from request
+            session_id = request.get("session_id", "immer-session") # Get session ID
+            has_history = request.get("has_history")
+            if has_history is None:
+                has_history = session_id in self.seen_sessions
+            # Seconds the client will wait; answering after that is wasted work
+            try:
+                deadline = float(request.get("deadline") or MAX_DEADLINE)
+            except (TypeError, ValueError):
+                deadline = MAX_DEADLINE
+            if not deadline > 0:  # Also NaN
+                deadline = MAX_DEADLINE
+            deadline = max(MIN_DEADLINE, min(deadline, MAX_DEADLINE))
+            return {
+                "query": request.get("query", ""),
+                "session_id": session_id,
+                "has_history": bool(has_history),
+                "deadline": Deadline(deadline)
+            }
+
+    def mark_session(self, session_id):
+        self.seen_sessions[session_id] = True
+        self.seen_sessions.move_to_end(session_id)
+        if len(self.seen_sessions) > MAX_TRACKED_SESSIONS:
+            self.seen_sessions.popitem(last=False)
+
+    async def cache_lookup(self, input_data):
+        """Return (cached answer or None, query embedding or None)."""
+        if self.cache is None:
+            return None, None
+        if input_data["has_history"]:
+            # Follow-up questions depend on the conversation so far
+            self.cache.record_bypass()
+            CACHE_REQUESTS.labels(result="bypass").inc()
+            return None, None
+        vector = None
+        if self.cache.semantic:
+            try:
+                vector = await asyncio.to_thread(self.cache.embed, input_data["query"])
+            except Exception as e:
+                logging.warning(f"Cache embedding failed, using exact match only: {str(e)}")
+        answer, tier = self.cache.lookup(input_data["query"], vector)
+        CACHE_REQUESTS.labels(result=tier).inc()
+        return answer, vector
+
+    async def record_shared_turn(self, input_data, answer):
+        # A cached or coalesced answer: the upstream did not run this session's
+        # turn, and follow-ups need it in the session's history
+        try:
+            await self.backend.record_turn(input_data["session_id"], input_data["query"], answer)
+        except Exception as e:
+            logging.warning(f"Recording a shared turn failed: {str(e)}")
+
+    def cache_store(self, input_data, answer, vector):
+        if self.cache is not None and answer and not input_data["has_history"]:
+            self.cache.put(input_data["query"], answer, vector)
 
-    def predict(self, input_data):
+    def prewarm_cache(self, questions):
+        # Runs in a background thread with its own event loop and backend
+        async def warm():
+            # HTTP clients are bound to the event loop that uses them
+            backend = build_backend(self.backend_kind)
+            try:
+                for question in questions:
+                    try:
+                        answer = await backend.answer(question, f"prewarm-{uuid4()}")
+                    except Exception as e:
+                        logging.warning(f"Cache prewarm failed for {question!r}: {str(e)}")
+                        continue
+                    if answer:
+                        vector = self.cache.embed(question) if self.cache.semantic else None
+                        self.cache.put(question, answer, vector)
+            finally:
+                await backend.aclose()
+            logging.info(f"Answer cache prewarmed: {self.cache.stats()}")
+
+        asyncio.run(warm())
+
+    def coalesce_key(self, input_data):
+        # Only first questions are shared; follow-ups depend on the session's history
+        if self.flights is None or input_data["has_history"]:
+            return None
+        key = normalize_query(input_data["query"])
+        if key in self.flights:
+            COALESCED_REQUESTS.inc()
+        return key
+
+    def capture_turn(self, input_data, output, latency, mode, ttft=None):
+        if self.capture is None:
+            return
+        try:
+            self.capture.record(input_data["session_id"], input_data["query"],
+                                output.get("error") or output.get("bot_response"), latency,
+                                has_history=input_data["has_history"], mode=mode, ttft=ttft,
+                                ok="error" not in output, cached=output.get("cached", False))
+        except OSError as e:
+            logging.warning(f"Traffic capture failed: {str(e)}")
+
+    # The shared call runs with the longest deadline; every caller (leader
+    # included) waits for it only up to its own. Only the leader's session
+    # reaches the upstream, so followers record the turn themselves.
+    async def coalesced_answer(self, key, input_data):
+        follower = key in self.flights
+        try:
+            text = await self.flights.do(key, self.backend.answer, input_data["query"], input_data["session_id"],
+                                         False, Deadline(MAX_DEADLINE), timeout=input_data["deadline"].remaining())
+        except asyncio.TimeoutError as e:
+            raise DeadlineExceeded("No shared answer within the deadline") from e
+        if follower and text:
+            await self.record_shared_turn(input_data, text)
+        return text
+
+    async def coalesced_stream(self, key, input_data):
+        follower = key in self.flights
+        stream = self.flights.stream(key, self.backend.stream, input_data["query"], input_data["session_id"],
+                                     False, Deadline(MAX_DEADLINE), first_timeout=input_data["deadline"].remaining())
+        chunks = []
+        try:
+            async for chunk in stream:
+                chunks.append(chunk)
+                yield chunk
+        except asyncio.TimeoutError as e:
+            raise DeadlineExceeded("No shared answer within the deadline") from e
+        finally:
+            await stream.aclose()
+        if follower and chunks:
+            await self.record_shared_turn(input_data, "".join(chunks))
+
+    async def predict(self, input_data):
+        start = time.perf_counter()
+        output = await self.answer_turn(input_data)
+        self.capture_turn(input_data, output, time.perf_counter() - start, "blocking")
+        return output
+
+    async def answer_turn(self, input_data):
         query = input_data.get("query", "")
         session_id = input_data.get("session_id", "immer-session")  # Get session ID
-        
-        # Update both input value AND session ID in tweaks
-        updated_tweaks = copy.deepcopy(TWEAKS)
-        
-        # Update the session ID in TextInput-uI2CW
-        updated_tweaks["TextInput-uI2CW"]["input_value"] = session_id
-        
-        # Update all other places that need session_id
-        updated_tweaks["ChatInput-8fGO2"].update({
-            "input_value": query,
-            "session_id": session_id  # Critical session binding
-        })
-        updated_tweaks["Memory-3Qm7y"]["session_id"] = session_id
-        updated_tweaks["ChatOutput-TR3Kc"]["session_id"] = session_id
-        updated_tweaks["RedisChatMemory-03Kf3"]["session_id"] = session_id
-        updated_tweaks["StoreMessage-MfcnZ"]["session_id"] = session_id
-        updated_tweaks["StoreMessage-ar6CI"]["session_id"] = session_id
-
-        payload = {
-            "output_type": "chat",
-            "input_type": "chat",
-            "tweaks": updated_tweaks
-        }
-        
-        api_url = f"{BASE_API_URL}/api/v1/run/{ENDPOINT}"
-        
+        self.mark_session(session_id)
+
+        cached, vector = await self.cache_lookup(input_data)
+        if cached is not None:
+            await self.record_shared_turn(input_data, cached)
+            return {"bot_response": cached, "cached": True}
+
         try:
-            # Add debug logging
-            logging.info(f"Sending to Langflow: {payload}")
-            response = requests.post(api_url, json=payload, timeout=90)
-            response.raise_for_status()
-            response_data = response.json()
-            
-            # Enhanced error logging
-            logging.info(f"Raw Langflow response: {response_data}")
+            key = self.coalesce_key(input_data)
+            if key is not None:
+                text = await self.coalesced_answer(key, input_data)
+            else:
+                text = await self.backend.answer(query, session_id, input_data["has_history"],
+                                                 input_data["deadline"])
+            if text:
+                self.cache_store(input_data, text, vector)
+                return {"bot_response": text}
+            return {"error": NO_ANSWER}
             
-            # Modified response parsing
-            if "outputs" in response_data:
-                return {"bot_response": response_data["outputs"][0]["outputs"][0]["results"]["message"]["text"]}
-            return {"bot_response": "No valid response found."}
-            
-        except requests.exceptions.HTTPError as e:
-            logging.error(f"HTTP error: {str(e)}")
-            return {"error": "Service unavailable. Please try again later."}
         except Exception as e:
-            logging.error(f"Unexpected error: {str(e)}")
-            return {"error": "An unexpected error occurred."}
+            return error_output(e)
+
+    async def encode_response(self, output):
+        return self.format_output(output)
+
+    def format_output(self, output):
+        with timed(STAGE_SECONDS.labels(stage="encode")):
+            if "error" in output:
+                # Still a 200 (a stream may fail after its first chunk); "error" tells clients it failed
+                return {"response": output["error"], "error": True}
+            return {"response": output.get("bot_response", "No response available.")}
+
+
+class StreamingChatLitAPI(ChatLitAPI):
+    """Relays the backend's token stream; each chunk is sent to the client as one JSON line."""
+
+    async def predict(self, input_data):
+        if self.capture is None:
+            async for output in self.stream_turn(input_data):
+                yield output
+            return
+        start = time.perf_counter()
+        ttft = None
+        chunks = []
+        captured = {}
+        async for output in self.stream_turn(input_data):
+            if ttft is None:
+                ttft = time.perf_counter() - start
+            if "error" in output:
+                captured["error"] = output["error"]
+            else:
+                chunks.append(output["bot_response"])
+                captured["cached"] = output.get("cached", False)
+            yield output
+        if "error" not in captured:
+            captured["bot_response"] = "".join(chunks)
+        self.capture_turn(input_data, captured, time.perf_counter() - start, "stream", ttft)
+
+    async def stream_turn(self, input_data):
+        query = input_data.get("query", "")
+        session_id = input_data.get("session_id", "immer-session")
+        self.mark_session(session_id)
+
+        cached, vector = await self.cache_lookup(input_data)
+        if cached is not None:
+            await self.record_shared_turn(input_data, cached)
+            yield {"bot_response": cached, "cached": True}
+            return
+
+        try:
+            key = self.coalesce_key(input_data)
+            if key is not None:
+                stream = self.coalesced_stream(key, input_data)
+            else:
+                stream = self.backend.stream(query, session_id, input_data["has_history"], input_data["deadline"])
+            chunks = []
+            async for chunk in stream:
+                chunks.append(chunk)
+                yield {"bot_response": chunk}
+            if chunks:
+                self.cache_store(input_data, "".join(chunks), vector)
+            else:
+                yield {"error": NO_ANSWER}
+
+        except Exception as e:
+            yield error_output(e)
+
+    async def encode_response(self, outputs):
+        # LitServe passes predict's async generator; up to 0.2.12 it passes a list
+        if not hasattr(outputs, "__aiter__"):
+            for output in outputs:
+                yield self.format_output(output)
+            return
+        async for output in outputs:
+            yield self.format_output(output)
+
+
+class BatchedChatLitAPI(ChatLitAPI):
+    """Groups concurrent questions so a batch costs one embedding call and one
+    multi-vector search, then generates each answer from its retrieved context
+    (always the direct pipeline backend).
+
+    LitServe batching runs synchronous predict/batch/unbatch, so the async
+    pipeline runs on an event loop owned by a background thread of the worker.
+    """
+
+    backend_kind = "direct"
+
+    def setup(self, device):
+        super().setup(device)
+        self.pipeline = self.backend.pipeline
+        self.loop = asyncio.new_event_loop()
+        threading.Thread(target=self.loop.run_forever, daemon=True).start()
+
+    def run_async(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+    def decode_request(self, request):
+        return self.parse_request(request)
+
+    def batch(self, inputs):
+        return list(inputs)
+
+    def predict(self, inputs):
+        start = time.perf_counter()
+        outputs = self.run_async(self.predict_batch(inputs))
+        # Every question of a batch is answered when the batch is
+        latency = time.perf_counter() - start
+        for input_data, output in zip(inputs, outputs):
+            self.capture_turn(input_data, output, latency, "batched")
+        return outputs
+
+    async def predict_batch(self, inputs):
+        BATCH_SIZE_OBSERVED.observe(len(inputs))
+        outputs = [None] * len(inputs)
+        pending = []
+        for index, input_data in enumerate(inputs):
+            self.mark_session(input_data["session_id"])
+            cached, vector = await self.cache_lookup(input_data)
+            if cached is not None:
+                await self.record_shared_turn(input_data, cached)
+                outputs[index] = {"bot_response": cached, "cached": True}
+            else:
+                pending.append((index, vector))
+        if not pending:
+            return outputs
+
+        queries = [inputs[index]["query"] for index, _ in pending]
+        try:
+            with timed(RETRIEVAL_SECONDS.labels(stage="embed")):
+                vectors = await self.pipeline.embed(queries)
+            with timed(RETRIEVAL_SECONDS.labels(stage="search")):
+                documents = await self.pipeline.search(vectors)
+        except Exception as e:
+            logging.error(f"Batched retrieval failed: {str(e)}")
+            for index, _ in pending:
+                outputs[index] = {"error": "Service unavailable. Please try again later."}
+            return outputs
+
+        contexts = [format_context(docs, self.pipeline.context_template, self.pipeline.context_sep)
+                    for docs in documents]
+        answers = await asyncio.gather(
+            *(self.pipeline.answer(inputs[index]["query"], inputs[index]["session_id"], context)
+              for (index, _), context in zip(pending, contexts)),
+            return_exceptions=True,
+        )
+        for (index, vector), answer in zip(pending, answers):
+            if isinstance(answer, Exception):
+                logging.error(f"Generation failed: {str(answer)}")
+                outputs[index] = {"error": "Service unavailable. Please try again later."}
+            elif answer:
+                self.cache_store(inputs[index], answer, vector)
+                outputs[index] = {"bot_response": answer}
+            else:
+                outputs[index] = {"error": NO_ANSWER}
+        return outputs
+
+    def unbatch(self, output):
+        return list(output)
 
     def encode_response(self, output):
-        if "error" in output:
-            return {"response": output["error"]}
-        return {"response": output.get("bot_response", "No response available.")}
+        return self.format_output(output)
+
+
+def readiness_targets():
+    if BATCH_SIZE > 1 or CHAT_BACKEND == "direct":
+        return {"ollama": f"{OLLAMA_URL.rstrip('/')}/api/version"}
+    return {"langflow": f"{BASE_API_URL.rstrip('/')}/health"}
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Godiva chat API (LitServe proxy in front of Langflow)")
+    parser.add_argument("--host", default=os.getenv("CHAT_HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("CHAT_PORT", "7898")))
+    parser.add_argument("--accelerator", default=os.getenv("CHAT_ACCELERATOR", "auto"))
+    parser.add_argument("--workers-per-device", type=int, default=int(os.getenv("CHAT_WORKERS_PER_DEVICE", "1")),
+                        help="inference worker processes (each runs many async Langflow calls)")
+    parser.add_argument("--api-servers", type=int, default=int(os.getenv("CHAT_API_SERVERS", "1")),
+                        help="uvicorn API server processes")
+    parser.add_argument("--timeout", type=float,
+                        default=float(os.getenv("CHAT_TIMEOUT", str(LANGFLOW_CONNECT_TIMEOUT + LANGFLOW_READ_TIMEOUT))),
+                        help="seconds before LitServe gives up on a request")
+    parser.add_argument("--drain-timeout", type=float, default=float(os.getenv("CHAT_DRAIN_TIMEOUT", "30")),
+                        help="seconds to let in-flight requests finish on SIGTERM")
+    return parser.parse_args(argv)
+
+
+def build_api():
+    if BATCH_SIZE > 1:
+        # Batched retrieval answers whole responses; streaming is not combined with it
+        return BatchedChatLitAPI(max_batch_size=BATCH_SIZE, batch_timeout=BATCH_TIMEOUT)
+    if STREAM_RESPONSES:
+        return StreamingChatLitAPI(max_batch_size=1, stream=True, enable_async=True)
+    return ChatLitAPI(max_batch_size=1, enable_async=True)
+
+
+def build_server(api, args, drain_state):
+    """LitServer for ``api`` with admission control, draining and the /metrics, /live, /ready and /queue routes."""
+    # No session affinity needed: conversation memory lives in Redis
+    # (RedisChatMemory-03Kf3), so any worker can serve any session.
+    admission_state = AdmissionState(ADMISSION_MAX_IN_FLIGHT, ADMISSION_MAX_QUEUE)
+    server = ls.LitServer(
+        api,
+        accelerator=args.accelerator,
+        workers_per_device=args.workers_per_device,
+        timeout=args.timeout,
+        # The last middleware is the outermost: draining is checked before admission
+        middlewares=[
+            (AdmissionMiddleware, {"state": admission_state, "rate": SESSION_RATE, "burst": SESSION_BURST,
+                                   "max_wait": ADMISSION_MAX_WAIT}),
+            (DrainMiddleware, {"state": drain_state}),
+        ],
+    )
+    # How long each API server lets open connections finish on shutdown;
+    # LitServe passes it to uvicorn itself
+    server.uvicorn_graceful_timeout = args.drain_timeout
+    # Histograms and counters from the API server and all workers; the
+    # metrics app is plain ASGI, so it is mounted rather than added as a route
+    server.app.mount("/metrics", metrics_app())
+    # LitServe's own /health reports worker setup; /live and /ready are added here
+    add_health_routes(server, UpstreamProbe(readiness_targets(), ttl=READINESS_TTL))
+    add_queue_route(server, admission_state)
+    return server
+
 
 if __name__ == "__main__":
-    server = ls.LitServer(ChatLitAPI(), accelerator="auto", max_batch_size=1)
-    server.run(port=7898)
+    args = parse_args()
+    drain_state = DrainState()
+    install_graceful_shutdown(drain_state, args.drain_timeout)
+    server = build_server(build_api(), args, drain_state)
+    server.run(host=args.host, port=args.port, num_api_servers=args.api_servers)
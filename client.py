@@ -1,18 +1,19 @@
-
-# Copyright The Lightning AI team.
-#
-# Licensed under the Apache License, Version 2.0 (the "License");
-# you may not use this file except in compliance with the License.
-# You may obtain a copy of the License at
-#
-#     http://www.apache.org/licenses/LICENSE-2.0
+# Minimal client for chat_server.py: sends one question and prints the answer as it streams.
 #
-# Unless required by applicable law or agreed to in writing, software
-# distributed under the License is distributed on an "AS IS" BASIS,
-# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
-# See the License for the specific language governing permissions and
-# limitations under the License.
+#     python client.py "How does Godiva's trust planning service protect family assets?"
+import json
+import sys
+from uuid import uuid4
+
 import requests
 
-response = requests.post("http://127.0.0.1:8000/predict", json={"input": 4.0})
-print(f"Status: {response.status_code}\nResponse:\n {response.text}")
+query = sys.argv[1] if len(sys.argv) > 1 else "What tax-efficient savings vehicles does Godiva recommend?"
+
+with requests.post("http://127.0.0.1:7898/predict",
+                   json={"query": query, "session_id": str(uuid4())},
+                   stream=True, timeout=90) as response:
+    print(f"Status: {response.status_code}\nResponse:")
+    for line in response.iter_lines(decode_unicode=True):
+        if line:
+            print(json.loads(line).get("response", ""), end="", flush=True)
+    print()
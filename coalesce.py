@@ -0,0 +1,124 @@
+import asyncio
+
+
+class _Flight:
+    __slots__ = ("task", "chunks", "done", "error", "changed", "waiters")
+
+    def __init__(self):
+        self.task = None
+        self.waiters = 0
+        self.chunks = []
+        self.done = False
+        self.error = None
+        self.changed = asyncio.Event()
+
+
+class SingleFlight:
+    """Coalesces identical concurrent upstream calls into one.
+
+    The first caller for a key (the leader) starts the call; callers arriving
+    while it is in flight share its result instead of starting their own.
+    The shared call runs in its own task, so a cancelled caller does not
+    cancel it for the others; it is cancelled once no caller waits for it.
+    Each caller gives its own ``timeout`` (to the result, or to the first
+    chunk of a stream), so a caller in a hurry does not cut the call short
+    for the rest. Must be used from a single event loop.
+    """
+
+    def __init__(self):
+        self._flights = {}
+        self.counters = {"leaders": 0, "coalesced": 0}
+
+    async def do(self, key, fn, *args, timeout=None):
+        """Await ``fn(*args)`` once per key among concurrent callers.
+
+        Raises asyncio.TimeoutError if this caller's ``timeout`` runs out first.
+        """
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = self._start(key, self._run(fn, *args))
+        else:
+            self.counters["coalesced"] += 1
+        flight.waiters += 1
+        try:
+            return await asyncio.wait_for(asyncio.shield(flight.task), timeout)
+        finally:
+            self._leave(flight)
+
+    async def stream(self, key, fn, *args, first_timeout=None):
+        """Iterate the async generator ``fn(*args)`` once per key; every caller
+        receives all chunks from the beginning, including ones produced
+        before it joined.
+
+        Raises asyncio.TimeoutError if no chunk came within this caller's
+        ``first_timeout``.
+        """
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = self._start(key, None)
+            flight.task = asyncio.ensure_future(self._pump(key, flight, fn, *args))
+        else:
+            self.counters["coalesced"] += 1
+        flight.waiters += 1
+        loop = asyncio.get_running_loop()
+        first_by = loop.time() + first_timeout if first_timeout is not None else None
+
+        position = 0
+        try:
+            while True:
+                while position < len(flight.chunks):
+                    yield flight.chunks[position]
+                    position += 1
+                if flight.done:
+                    if flight.error is not None:
+                        raise flight.error
+                    return
+                flight.changed.clear()
+                if position == 0 and first_by is not None:
+                    await asyncio.wait_for(flight.changed.wait(), max(0.0, first_by - loop.time()))
+                else:
+                    await flight.changed.wait()
+        finally:
+            self._leave(flight)
+
+    @staticmethod
+    def _leave(flight):
+        flight.waiters -= 1
+        if not flight.waiters and not flight.task.done():
+            # Nobody is left to receive the result
+            flight.task.cancel()
+
+    def _start(self, key, coro):
+        flight = _Flight()
+        self._flights[key] = flight
+        self.counters["leaders"] += 1
+        if coro is not None:
+            flight.task = asyncio.ensure_future(coro)
+            flight.task.add_done_callback(lambda _: self._flights.pop(key, None))
+        return flight
+
+    @staticmethod
+    async def _run(fn, *args):
+        return await fn(*args)
+
+    async def _pump(self, key, flight, fn, *args):
+        try:
+            async for chunk in fn(*args):
+                flight.chunks.append(chunk)
+                flight.changed.set()
+        except Exception as e:
+            flight.error = e
+        finally:
+            flight.done = True
+            self._flights.pop(key, None)
+            flight.changed.set()
+
+    def __contains__(self, key):
+        return key in self._flights
+
+    @property
+    def in_flight(self):
+        return len(self._flights)
+
+    def stats(self):
+        return dict(self.counters, in_flight=self.in_flight)
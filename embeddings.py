@@ -0,0 +1,51 @@
+import hashlib
+import math
+import re
+
+import httpx
+
+_WORD_RE = re.compile(r"[a-z0-9']+")
+
+
+class HashingEmbedder:
+    """Deterministic bag-of-words embedder, a local stand-in for a real embedding model."""
+
+    def __init__(self, dim=256):
+        self.dim = dim
+
+    def embed(self, texts):
+        vectors = []
+        for text in texts:
+            vector = [0.0] * self.dim
+            for word in _WORD_RE.findall(text.lower()):
+                digest = hashlib.blake2b(word.encode("utf-8"), digest_size=8).digest()
+                bucket = int.from_bytes(digest[:4], "little") % self.dim
+                sign = 1.0 if digest[4] & 1 else -1.0
+                vector[bucket] += sign
+            vectors.append(unit(vector))
+        return vectors
+
+
+class OllamaEmbedder:
+    """Embeds through Ollama's /api/embed endpoint (same model as OllamaEmbeddings-EarNo)."""
+
+    def __init__(self, base_url, model_name, timeout=10.0):
+        self.model_name = model_name
+        self.client = httpx.Client(base_url=base_url, timeout=timeout)
+
+    def embed(self, texts):
+        response = self.client.post("/api/embed", json={"model": self.model_name, "input": list(texts)})
+        response.raise_for_status()
+        return [unit(vector) for vector in response.json()["embeddings"]]
+
+
+def unit(vector):
+    norm = math.sqrt(sum(v * v for v in vector))
+    if not norm:
+        return vector
+    return [v / norm for v in vector]
+
+
+def cosine(a, b):
+    # Vectors are unit-length, so the dot product is the cosine
+    return sum(x * y for x, y in zip(a, b))
@@ -0,0 +1,159 @@
+import html
+import json
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from uuid import uuid4
+
+
+def _pack(messages):
+    return zlib.compress(json.dumps(messages, separators=(",", ":")).encode("utf-8"))
+
+
+def _unpack(data):
+    return json.loads(zlib.decompress(data).decode("utf-8"))
+
+
+def render_preview(messages, n=2):
+    # Last exchange of the conversation, as shown in the sidebar
+    preview_html = "<div style='font-size:12px; max-width:200px;'>"
+    for msg in messages[-n:]:
+        preview_html += f"<p><strong>{msg['role'].capitalize()}:</strong> {html.escape(msg['content'])}</p>"
+    preview_html += "</div>"
+    return preview_html
+
+
+class MemoryTranscriptStore:
+    """Keeps archived transcripts compressed in process memory.
+
+    Shared by all Streamlit sessions of a process, so it is bounded on its
+    own: transcripts expire after ``ttl`` seconds, and beyond
+    ``max_transcripts`` the least recently used one is dropped (ended
+    sessions never delete theirs).
+    """
+
+    def __init__(self, max_transcripts=5000, ttl=7 * 86400, clock=time.monotonic):
+        self.max_transcripts = max_transcripts
+        self.ttl = ttl
+        self.clock = clock
+        self._data = OrderedDict()  # key -> (expires_at, packed transcript), least recently used first
+        self._lock = threading.Lock()
+
+    def put(self, key, messages):
+        data = _pack(messages)
+        with self._lock:
+            now = self.clock()
+            self._data[key] = (now + self.ttl, data)
+            self._data.move_to_end(key)
+            # Oldest first: expired entries are at the front unless read since
+            while self._data and (len(self._data) > self.max_transcripts
+                                  or next(iter(self._data.values()))[0] <= now):
+                self._data.popitem(last=False)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return []
+            if entry[0] <= self.clock():
+                del self._data[key]
+                return []
+            self._data.move_to_end(key)
+        return _unpack(entry[1])
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SQLiteTranscriptStore:
+    """Spills archived transcripts to a local SQLite file.
+
+    Shared by all Streamlit sessions of a process; rows older than
+    ``max_age_days`` are dropped when the store is opened and then at most
+    every ``prune_interval`` seconds, on writes.
+    """
+
+    def __init__(self, path, max_age_days=7, prune_interval=3600):
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self.max_age = max_age_days * 86400
+        self.prune_interval = prune_interval
+        with self._lock, self._conn:
+            self._conn.execute("CREATE TABLE IF NOT EXISTS transcripts "
+                               "(key TEXT PRIMARY KEY, data BLOB NOT NULL, created REAL NOT NULL)")
+            self._prune()
+
+    def _prune(self):
+        self._conn.execute("DELETE FROM transcripts WHERE created < ?", (time.time() - self.max_age,))
+        self._pruned_at = time.monotonic()
+
+    def put(self, key, messages):
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO transcripts (key, data, created) VALUES (?, ?, ?)",
+                               (key, _pack(messages), time.time()))
+            if time.monotonic() - self._pruned_at >= self.prune_interval:
+                self._prune()
+
+    def get(self, key):
+        with self._lock:
+            row = self._conn.execute("SELECT data FROM transcripts WHERE key = ?", (key,)).fetchone()
+        return _unpack(row[0]) if row else []
+
+    def delete(self, key):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM transcripts WHERE key = ?", (key,))
+
+
+class ConversationSummary:
+    __slots__ = ("id", "preview_html", "message_count")
+
+    def __init__(self, id, preview_html, message_count):
+        self.id = id
+        self.preview_html = preview_html
+        self.message_count = message_count
+
+
+class ConversationHistory:
+    """Archived conversations of one browser session.
+
+    Only a small summary (with its preview HTML, rendered once) is kept per
+    conversation; the full transcript lives in ``store`` and is read back
+    when the conversation is loaded. Beyond ``max_conversations`` the oldest
+    conversation is evicted.
+    """
+
+    def __init__(self, store, max_conversations=20):
+        self.store = store
+        self.max_conversations = max_conversations
+        self.summaries = []  # Oldest first
+
+    def archive(self, messages):
+        summary = ConversationSummary(str(uuid4()), render_preview(messages), len(messages))
+        self.store.put(summary.id, messages)
+        self.summaries.append(summary)
+        while len(self.summaries) > self.max_conversations:
+            self.store.delete(self.summaries.pop(0).id)
+        return summary
+
+    def load(self, conversation_id):
+        """The conversation's messages; [] (and the summary is dropped) if its transcript expired."""
+        messages = self.store.get(conversation_id)
+        if not messages:
+            self.summaries = [s for s in self.summaries if s.id != conversation_id]
+        return messages
+
+    def delete(self, conversation_id):
+        self.summaries = [s for s in self.summaries if s.id != conversation_id]
+        self.store.delete(conversation_id)
+
+    def __len__(self):
+        return len(self.summaries)
+
+    def __bool__(self):
+        return bool(self.summaries)
@@ -0,0 +1,161 @@
+import math
+import re
+from collections import OrderedDict
+
+from chat_memory import USER, format_history
+
+
+class ApproxTokenizer:
+    """Token estimate from text length (~4 characters per token for llama-family models)."""
+
+    def __init__(self, chars_per_token=4.0):
+        self.chars_per_token = chars_per_token
+
+    def count(self, text):
+        return math.ceil(len(text) / self.chars_per_token)
+
+
+class HuggingFaceTokenizer:
+    """Exact counts with a Hugging Face tokenizer. Needs the ``tokenizers`` package."""
+
+    def __init__(self, name):
+        from tokenizers import Tokenizer
+
+        self.tokenizer = Tokenizer.from_pretrained(name)
+
+    def count(self, text):
+        return len(self.tokenizer.encode(text, add_special_tokens=False).ids)
+
+
+def build_tokenizer(spec):
+    # "approx" or "hf:<tokenizer name>", e.g. "hf:meta-llama/Llama-3.3-70B-Instruct"
+    if spec.startswith("hf:"):
+        return HuggingFaceTokenizer(spec[len("hf:"):])
+    return ApproxTokenizer()
+
+
+def _clip(text, tokenizer, max_tokens):
+    # Drop whole words from the front until the text fits (the newest part is kept)
+    words = text.split(" ")
+    while words and tokenizer.count(" ".join(words)) > max_tokens:
+        words = words[max(1, len(words) // 8):]
+    return " ".join(words)
+
+
+class ExtractiveSummarizer:
+    """Summary built from the user's earlier questions; no model call."""
+
+    def __init__(self, tokenizer, max_tokens=200):
+        self.tokenizer = tokenizer
+        self.max_tokens = max_tokens
+
+    async def summarize(self, previous, messages):
+        topics = [re.split(r"(?<=[.?!])\s", message["text"].strip(), maxsplit=1)[0][:200]
+                  for message in messages if message.get("sender") == USER[0] and message.get("text")]
+        lines = [previous] if previous else []
+        if topics:
+            lines.append("The user asked: " + " | ".join(topics))
+        return _clip(" ".join(lines), self.tokenizer, self.max_tokens)
+
+
+class LLMSummarizer:
+    """Rolling summary written by the chat model (an OllamaGenerator)."""
+
+    PROMPT = ("Update the summary of a conversation between a user and a wealth management assistant "
+              "with the new messages. Keep facts the user shared and the topics discussed. "
+              "Answer with the summary only, in at most {max_words} words.\n\n"
+              "Summary so far: {previous}\n\nNew messages:\n{messages}")
+
+    def __init__(self, generator, tokenizer, max_tokens=200, history_template="{sender_name}: {text}"):
+        self.generator = generator
+        self.tokenizer = tokenizer
+        self.max_tokens = max_tokens
+        self.history_template = history_template
+
+    async def summarize(self, previous, messages):
+        prompt = self.PROMPT.format(max_words=int(self.max_tokens * 0.75), previous=previous or "(none)",
+                                    messages=format_history(messages, self.history_template))
+        return _clip((await self.generator.generate(prompt)).strip(), self.tokenizer, self.max_tokens)
+
+
+def insert_summary(template, summary):
+    """Put ``summary`` in front of the {conversation_history} variable of a prompt template."""
+    if not summary:
+        return template
+    # Braces would be read as template variables by the prompt component
+    summary = summary.replace("{", "(").replace("}", ")")
+    return template.replace("{conversation_history}",
+                            f"(Summary of earlier conversation: {summary})\n{{conversation_history}}", 1)
+
+
+class HistoryWindow:
+    """Trims a session's history to its last ``max_turns`` turns within ``token_budget``.
+
+    Messages that fall out of the window are folded into a rolling summary,
+    cached per session: each call only summarizes the messages dropped since
+    the previous call. The summary's share of the budget is the summarizer's
+    ``max_tokens``.
+    """
+
+    def __init__(self, tokenizer, token_budget=1024, max_turns=6, summarizer=None,
+                 history_template="{sender_name}: {text}", max_sessions=10000):
+        self.tokenizer = tokenizer
+        self.token_budget = token_budget
+        self.max_turns = max_turns
+        self.summarizer = summarizer
+        self.summary_tokens = summarizer.max_tokens if summarizer is not None else 0
+        self.history_template = history_template
+        self.max_sessions = max_sessions
+        # session_id -> (last two summarized messages, summary)
+        self._summaries = OrderedDict()
+
+    def count(self, messages):
+        return sum(self.tokenizer.count(format_history([message], self.history_template)) + 1
+                   for message in messages)
+
+    def _fit(self, messages, budget):
+        kept = 0
+        used = 0
+        for message in reversed(messages[-2 * self.max_turns:] if self.max_turns else messages):
+            cost = self.tokenizer.count(format_history([message], self.history_template)) + 1
+            if used + cost > budget:
+                break
+            used += cost
+            kept += 1
+        # Start the window at a question, not in the middle of a turn
+        while kept and kept < len(messages) and messages[-kept].get("sender") != USER[0]:
+            kept -= 1
+        return kept
+
+    async def compact(self, session_id, messages):
+        """Return (messages to keep, summary of the older ones or "")."""
+        if not messages:
+            return [], ""
+        kept = self._fit(messages, self.token_budget)
+        if kept < len(messages):
+            kept = self._fit(messages, self.token_budget - self.summary_tokens)
+        dropped = messages[:len(messages) - kept]
+        kept_messages = messages[len(messages) - kept:]
+        if not dropped or self.summarizer is None:
+            return kept_messages, ""
+        return kept_messages, await self.summary(session_id, dropped)
+
+    async def summary(self, session_id, dropped):
+        previous, new = "", dropped
+        cached = self._summaries.get(session_id)
+        if cached is not None:
+            last, previous = cached
+            # Only the messages dropped after the last summarized ones are new
+            for index in range(len(dropped), len(last) - 1, -1):
+                if dropped[index - len(last):index] == last:
+                    new = dropped[index:]
+                    break
+            else:
+                previous = ""
+        if new:
+            previous = await self.summarizer.summarize(previous, new)
+        self._summaries[session_id] = (dropped[-2:], previous)
+        self._summaries.move_to_end(session_id)
+        if len(self._summaries) > self.max_sessions:
+            self._summaries.popitem(last=False)
+        return previous
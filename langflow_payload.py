@@ -0,0 +1,55 @@
+import copy
+import json
+import re
+
+
+class CompiledPayload:
+    """A Langflow run payload serialized once, with per-request slots spliced in.
+
+    ``slots`` maps a slot name to the (component, field) tweak paths that take
+    its value, e.g. ``{"session_id": [("Memory-3Qm7y", "session_id")]}``. The
+    static part of the payload is encoded to JSON bytes at construction time;
+    ``render`` only JSON-encodes the slot values and joins the pieces, so no
+    deepcopy or full re-serialization happens per request.
+
+    With ``minimal=True`` only the slotted fields and ``overrides`` are sent,
+    for flows that already store the remaining tweak defaults.
+    """
+
+    def __init__(self, tweaks, slots, overrides=None, minimal=False,
+                 output_type="chat", input_type="chat"):
+        if minimal:
+            compiled = {}
+            for paths in slots.values():
+                for component, field in paths:
+                    compiled.setdefault(component, {})[field] = None
+        else:
+            compiled = copy.deepcopy(tweaks)
+        for (component, field), value in (overrides or {}).items():
+            compiled.setdefault(component, {})[field] = value
+
+        markers = {}
+        for index, (name, paths) in enumerate(slots.items()):
+            marker = f"@@slot{index}@@"
+            markers[marker] = name
+            for component, field in paths:
+                compiled.setdefault(component, {})[field] = marker
+
+        payload = {"output_type": output_type, "input_type": input_type, "tweaks": compiled}
+        encoded = json.dumps(payload, ensure_ascii=False)
+
+        # Alternate static text and slot names: [text, name, text, name, ..., text]
+        pattern = "|".join(re.escape(json.dumps(marker)) for marker in markers)
+        parts = re.split(f"({pattern})", encoded)
+        self._static = [part.encode("utf-8") for part in parts[0::2]]
+        self._slot_names = [markers[json.loads(part)] for part in parts[1::2]]
+        self.slot_names = frozenset(slots)
+
+    def render(self, **values):
+        encoded = {name: json.dumps(value, ensure_ascii=False).encode("utf-8")
+                   for name, value in values.items()}
+        pieces = [self._static[0]]
+        for name, static in zip(self._slot_names, self._static[1:]):
+            pieces.append(encoded[name])
+            pieces.append(static)
+        return b"".join(pieces)
@@ -0,0 +1,162 @@
+import json
+import logging
+import re
+from collections import namedtuple
+
+try:
+    import orjson
+except ImportError:  # Optional; full parses fall back to the json module
+    orjson = None
+
+from server_metrics import UPSTREAM_FAILURES
+
+
+class LangflowResponseError(Exception):
+    """The Langflow response did not have the expected shape."""
+
+
+# Where Langflow versions put the final answer within one run output, most common first
+TEXT_PATHS = (
+    ("results.message.text", ("results", "message", "text")),
+    ("results.message.data.text", ("results", "message", "data", "text")),
+    ("outputs.message.message", ("outputs", "message", "message")),
+    ("artifacts.message", ("artifacts", "message")),
+)
+
+ParsedRun = namedtuple("ParsedRun", ["text", "shape", "method", "data"])
+
+_RESULTS_KEY = re.compile(rb'"results"\s*:\s*')
+_decoder = json.JSONDecoder()
+
+
+def loads(data):
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+def _text_at(output, path):
+    value = output
+    for key in path:
+        if not isinstance(value, dict):
+            return None
+        value = value.get(key)
+    return value if isinstance(value, str) else None
+
+
+def _text_in_output(output):
+    for shape, path in TEXT_PATHS:
+        text = _text_at(output, path)
+        if text is not None:
+            return text, shape
+    messages = output.get("messages")
+    if isinstance(messages, list) and messages and isinstance(messages[-1], dict) \
+            and isinstance(messages[-1].get("message"), str):
+        return messages[-1]["message"], "messages"
+    return None, None
+
+
+def extract_message_text(response_data):
+    """Final answer of a (non-streamed) Langflow run: (text, shape it was found in).
+
+    A run without outputs gives (None, "empty"); outputs without text in any
+    known shape raise LangflowResponseError.
+    """
+    if not isinstance(response_data, dict):
+        raise LangflowResponseError(f"Run response is a {type(response_data).__name__}, not an object")
+    found_output = False
+    for run_output in response_data.get("outputs") or []:
+        for output in (run_output.get("outputs") or []) if isinstance(run_output, dict) else []:
+            if not isinstance(output, dict):
+                continue
+            found_output = True
+            text, shape = _text_in_output(output)
+            if text is not None:
+                return text, shape
+    if not found_output:
+        return None, "empty"
+    raise LangflowResponseError("No answer text in any known Langflow output shape")
+
+
+def _partial_text(body):
+    # A results object is small next to the artifacts and logs around it;
+    # decoding starts at its key and stops at its end. An unescaped
+    # "results": can only be a key, so the search cannot land inside a string.
+    match = _RESULTS_KEY.search(body)
+    if match is None:
+        return None, None
+    # Decode a growing window rather than the whole (possibly MB-sized) rest;
+    # only the last character of a window can be cut, and it lies past the object
+    size = 16384
+    while True:
+        end = match.end() + size
+        try:
+            results, _ = _decoder.raw_decode(body[match.end():end].decode("utf-8", errors="ignore"))
+            break
+        except ValueError:
+            if end >= len(body):
+                raise
+            size *= 4
+    return _text_in_output({"results": results})
+
+
+def parse_run_response(body, full=False):
+    """Answer of a blocking run response (the raw ``body`` bytes).
+
+    Only the first "results" object is decoded; the artifacts and logs
+    around it are never parsed. If that object has no answer, or with
+    ``full=True`` (e.g. to read component timings from ``data``), the
+    whole body is parsed (orjson when installed) and every known output
+    shape is tried.
+    """
+    if not full:
+        try:
+            text, shape = _partial_text(body)
+        except ValueError:
+            text = None
+        if text is not None:
+            return ParsedRun(text, shape, "partial", None)
+    data = loads(body)
+    text, shape = extract_message_text(data)
+    return ParsedRun(text, shape, "orjson" if orjson is not None else "json", data)
+
+
+async def iter_langflow_tokens(lines):
+    """Yield text chunks from a streamed Langflow run.
+
+    Langflow emits one JSON event per line ("token", "add_message", "end",
+    "error"). Token events carry the generated chunk; if the model did not
+    stream at all, the final text is taken from the "end" event instead.
+    """
+    streamed = False
+    async for line in lines:
+        if not line:
+            continue
+        if isinstance(line, bytes):
+            line = line.decode("utf-8")
+        if line.startswith("data:"):
+            line = line[len("data:"):].strip()
+        try:
+            event = loads(line)
+        except ValueError:
+            UPSTREAM_FAILURES.labels(kind="parse").inc()
+            logging.warning(f"Skipping malformed Langflow event: {line[:200]}")
+            continue
+
+        event_type = event.get("event")
+        data = event.get("data") or {}
+        if event_type == "token":
+            chunk = data.get("chunk", "")
+            if chunk:
+                streamed = True
+                yield chunk
+        elif event_type == "error":
+            raise RuntimeError(data.get("error") or data.get("text") or "Langflow stream error")
+        elif event_type == "end":
+            if not streamed:
+                try:
+                    text, _ = extract_message_text(data.get("result") or {})
+                except LangflowResponseError:
+                    UPSTREAM_FAILURES.labels(kind="parse").inc()
+                    raise
+                if text:
+                    yield text
+            return
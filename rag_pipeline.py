@@ -0,0 +1,111 @@
+import asyncio
+import json
+from collections import defaultdict
+
+import httpx
+
+from chat_memory import MACHINE, USER, format_history
+from history_window import insert_summary
+from retrieval import format_context
+
+
+class OllamaGenerator:
+    """Chat completion through Ollama's /api/chat, with the settings of OllamaModel-RdzdC."""
+
+    def __init__(self, base_url, model_name, system_message="", temperature=None, timeout=90.0):
+        self.model_name = model_name
+        self.system_message = system_message
+        self.options = {"temperature": temperature} if temperature is not None else {}
+        self.client = httpx.AsyncClient(base_url=base_url, timeout=httpx.Timeout(timeout, connect=5.0))
+
+    def _request(self, prompt, stream):
+        messages = [{"role": "user", "content": prompt}]
+        if self.system_message:
+            messages.insert(0, {"role": "system", "content": self.system_message})
+        return {"model": self.model_name, "messages": messages, "stream": stream, "options": self.options}
+
+    async def generate(self, prompt):
+        response = await self.client.post("/api/chat", json=self._request(prompt, stream=False))
+        response.raise_for_status()
+        return response.json()["message"]["content"]
+
+    async def stream(self, prompt):
+        async with self.client.stream("POST", "/api/chat", json=self._request(prompt, stream=True)) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if not line:
+                    continue
+                event = json.loads(line)
+                chunk = event.get("message", {}).get("content", "")
+                if chunk:
+                    yield chunk
+                if event.get("done"):
+                    return
+
+
+class RagPipeline:
+    """embed -> retrieve -> prompt -> generate, the steps of the Langflow flow.
+
+    ``retrieve`` takes a list of queries so a batch costs one embedding call
+    and one multi-vector search. With a ``window`` (HistoryWindow), the
+    conversation history is trimmed to its token budget before prompting.
+    """
+
+    def __init__(self, embedder, retriever, generator, memory, prompt_template,
+                 number_of_results=3, n_messages=100,
+                 context_template="{text} , {title}", context_sep="\n",
+                 history_template="{sender_name}: {text}", window=None):
+        self.embedder = embedder
+        self.retriever = retriever
+        self.generator = generator
+        self.memory = memory
+        self.prompt_template = prompt_template
+        self.number_of_results = number_of_results
+        self.n_messages = n_messages
+        self.context_template = context_template
+        self.context_sep = context_sep
+        self.history_template = history_template
+        self.window = window
+
+    async def embed(self, queries):
+        # Embedders and retrievers are blocking clients; keep them off the event loop
+        return await asyncio.to_thread(self.embedder.embed, list(queries))
+
+    async def search(self, vectors):
+        return await asyncio.to_thread(self.retriever.search, vectors, self.number_of_results)
+
+    async def retrieve(self, queries):
+        documents = await self.search(await self.embed(queries))
+        return [format_context(docs, self.context_template, self.context_sep) for docs in documents]
+
+    async def build_prompt(self, query, session_id, context):
+        messages = await self.memory.get_messages(session_id, self.n_messages)
+        template = self.prompt_template
+        if self.window is not None:
+            messages, summary = await self.window.compact(session_id, messages)
+            template = insert_summary(template, summary)
+        history = format_history(messages, self.history_template)
+        values = defaultdict(str, question=query, context=context, conversation_history=history)
+        return template.format_map(values)
+
+    async def remember(self, session_id, query, answer):
+        await self.memory.add_message(session_id, *USER, query)
+        await self.memory.add_message(session_id, *MACHINE, answer)
+
+    async def answer(self, query, session_id, context=None):
+        if context is None:
+            context = (await self.retrieve([query]))[0]
+        prompt = await self.build_prompt(query, session_id, context)
+        text = await self.generator.generate(prompt)
+        await self.remember(session_id, query, text)
+        return text
+
+    async def stream_answer(self, query, session_id, context=None):
+        if context is None:
+            context = (await self.retrieve([query]))[0]
+        prompt = await self.build_prompt(query, session_id, context)
+        chunks = []
+        async for chunk in self.generator.stream(prompt):
+            chunks.append(chunk)
+            yield chunk
+        await self.remember(session_id, query, "".join(chunks))
@@ -0,0 +1,73 @@
+import asyncio
+import time
+
+import httpx
+from fastapi.responses import JSONResponse
+
+
+class UpstreamProbe:
+    """Cached reachability checks for the services the chat server depends on.
+
+    ``targets`` maps a name to a URL that answers 2xx when the service is up.
+    Results are reused for ``ttl`` seconds, and concurrent callers share one
+    round of probes, so /ready stays cheap however often it is polled.
+    """
+
+    def __init__(self, targets, ttl=10.0, timeout=2.0):
+        self.targets = dict(targets)
+        self.ttl = ttl
+        self.timeout = timeout
+        self._results = {}
+        self._checked_at = None
+        self._lock = None
+
+    async def _probe(self, client, name, url):
+        start = time.perf_counter()
+        try:
+            response = await client.get(url)
+            ok = response.status_code < 300
+            detail = f"HTTP {response.status_code}"
+        except httpx.HTTPError as e:
+            ok = False
+            detail = type(e).__name__
+        return name, {"ok": ok, "detail": detail, "latency_s": round(time.perf_counter() - start, 4)}
+
+    async def check(self):
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            now = time.monotonic()
+            if self._checked_at is None or now - self._checked_at >= self.ttl:
+                async with httpx.AsyncClient(timeout=self.timeout) as client:
+                    results = await asyncio.gather(*(self._probe(client, name, url)
+                                                     for name, url in self.targets.items()))
+                self._results = dict(results)
+                self._checked_at = time.monotonic()
+            age = time.monotonic() - self._checked_at
+        return all(r["ok"] for r in self._results.values()), self._results, age
+
+
+def workers_ready(server):
+    # LitServe tracks each inference worker's setup status ("starting", "ready", ...)
+    statuses = getattr(server, "workers_setup_status", None)
+    if not statuses:
+        return True
+    return all(status == "ready" for status in statuses.values())
+
+
+def add_health_routes(server, probe):
+    """/live: the API process is serving (no checks).
+    /ready: workers are set up and every upstream answered its last probe."""
+
+    async def live():
+        return {"status": "alive"}
+
+    async def ready():
+        if not workers_ready(server):
+            return JSONResponse({"status": "starting"}, status_code=503)
+        ok, upstreams, age = await probe.check()
+        body = {"status": "ready" if ok else "degraded", "upstreams": upstreams, "checked_s_ago": round(age, 1)}
+        return JSONResponse(body, status_code=200 if ok else 503)
+
+    server.app.add_api_route("/live", live, methods=["GET"])
+    server.app.add_api_route("/ready", ready, methods=["GET"])
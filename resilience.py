@@ -0,0 +1,146 @@
+import asyncio
+import random
+import time
+from collections import deque
+
+import httpx
+
+# Statuses worth retrying: the upstream (or a proxy in front of it) did not run the flow
+RETRYABLE_STATUS = frozenset({429, 502, 503, 504})
+
+
+class CircuitOpenError(Exception):
+    """The upstream is failing; calls are rejected without being sent."""
+
+
+class DeadlineExceeded(Exception):
+    """The client's deadline passed before the upstream answered."""
+
+
+class Deadline:
+    """Absolute point in time by which a request must be answered."""
+
+    def __init__(self, seconds):
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self):
+        return max(0.0, self.expires_at - time.monotonic())
+
+
+class CircuitBreaker:
+    """Fails fast while an upstream is unhealthy.
+
+    After ``failure_threshold`` consecutive failures the circuit opens and
+    calls are rejected for ``reset_timeout`` seconds. Then a single trial call
+    is let through (half-open): its success closes the circuit, its failure
+    opens it again. Used from one event loop, so it needs no locking.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+
+    def allow(self):
+        if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_timeout:
+            self.state = "half_open"
+        if self.state == "closed":
+            return True
+        if self.state == "half_open" and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+        return False
+
+    def record_success(self):
+        self.state = "closed"
+        self.failures = 0
+        self._trial_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            self.state = "open"
+            self.opened_at = time.monotonic()
+        self._trial_in_flight = False
+
+    def release(self):
+        # The call ended without telling anything about the upstream (cancelled, client error)
+        self._trial_in_flight = False
+
+
+class LatencyTracker:
+    """Latencies of the last ``size`` successful calls, for percentile-based hedging delays."""
+
+    def __init__(self, size=256, min_samples=20):
+        self.samples = deque(maxlen=size)
+        self.min_samples = min_samples
+
+    def observe(self, seconds):
+        self.samples.append(seconds)
+
+    def percentile(self, q):
+        if len(self.samples) < self.min_samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def is_retryable(error):
+    # Only failures where the flow cannot have run: the request never reached
+    # Langflow, or a proxy/overloaded server turned it away
+    if isinstance(error, (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)):
+        return True
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code in RETRYABLE_STATUS
+    return False
+
+
+def counts_as_failure(error):
+    if isinstance(error, (httpx.TransportError, DeadlineExceeded)):
+        return True
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code >= 500 or error.response.status_code == 429
+    return False
+
+
+def backoff(attempt, base=0.2, cap=2.0):
+    # "Full jitter": spreads the retries of many clients hitting the same failure
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+async def hedge(primary, secondary, delay, discard=None):
+    """Await ``primary()``; if it is still running after ``delay`` seconds, or
+    failed, also start ``secondary()``. Returns (result, index of the call
+    that produced it). The other call is cancelled, or passed to
+    ``discard`` (a coroutine function) if it also succeeded. If both fail,
+    the last error is raised.
+    """
+    tasks = [asyncio.ensure_future(primary())]
+    winner = None
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=delay)
+        if done and tasks[0].exception() is None:
+            winner = tasks[0]
+            return winner.result(), 0
+        tasks.append(asyncio.ensure_future(secondary()))
+        pending = {task for task in tasks if not task.done()}
+        error = tasks[0].exception() if tasks[0].done() else None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    winner = task
+                    return task.result(), tasks.index(task)
+                error = task.exception()
+        raise error
+    finally:
+        for task in tasks:
+            if task is winner:
+                continue
+            if not task.done():
+                task.cancel()
+            elif discard is not None and not task.cancelled() and task.exception() is None:
+                await discard(task.result())
@@ -0,0 +1,76 @@
+import json
+from collections import defaultdict
+
+from embeddings import cosine
+
+
+def format_context(documents, template="{text} , {title}", sep="\n"):
+    # Same rendering as the flow's ParseData-FAWPR component
+    return sep.join(template.format_map(defaultdict(str, doc)) for doc in documents)
+
+
+class InMemoryRetriever:
+    """Brute-force cosine search over documents held in memory; a local stand-in for Milvus.
+
+    Documents are dicts with a "text" key and any metadata (e.g. "title").
+    """
+
+    def __init__(self, documents, embedder):
+        self.documents = list(documents)
+        self.vectors = embedder.embed([doc["text"] for doc in self.documents]) if self.documents else []
+
+    @classmethod
+    def from_jsonl(cls, path, embedder):
+        with open(path) as f:
+            return cls([json.loads(line) for line in f if line.strip()], embedder)
+
+    def search(self, vectors, k):
+        results = []
+        for vector in vectors:
+            scored = sorted(((cosine(vector, doc_vector), index)
+                             for index, doc_vector in enumerate(self.vectors)), reverse=True)
+            results.append([self.documents[index] for _, index in scored[:k]])
+        return results
+
+
+class MilvusRetriever:
+    """Multi-vector search against the Milvus collection used by Milvus-tbjwD.
+
+    All query vectors of a batch go to Milvus in a single search request.
+    Needs the optional ``pymilvus`` package.
+    """
+
+    def __init__(self, uri, token, collection_name, text_field="content", vector_field="vector",
+                 output_fields=None, search_params=None, consistency_level="Strong", timeout=None):
+        try:
+            from pymilvus import MilvusClient
+        except ImportError as e:
+            raise ImportError("MilvusRetriever needs pymilvus: pip install pymilvus") from e
+
+        self.client = MilvusClient(uri=uri, token=token, timeout=timeout)
+        self.collection_name = collection_name
+        self.text_field = text_field
+        self.vector_field = vector_field
+        self.output_fields = output_fields or [text_field]
+        self.search_params = search_params or {}
+        self.consistency_level = consistency_level
+
+    def search(self, vectors, k):
+        hits = self.client.search(
+            collection_name=self.collection_name,
+            data=vectors,
+            limit=k,
+            anns_field=self.vector_field,
+            search_params=self.search_params,
+            output_fields=self.output_fields,
+            consistency_level=self.consistency_level,
+        )
+        results = []
+        for query_hits in hits:
+            documents = []
+            for hit in query_hits:
+                entity = dict(hit.get("entity", {}))
+                entity["text"] = entity.pop(self.text_field, "")
+                documents.append(entity)
+            results.append(documents)
+        return results
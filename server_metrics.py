@@ -0,0 +1,125 @@
+import os
+import time
+from contextlib import contextmanager
+
+# LitServe runs the API server and the inference workers in separate
+# processes. chat_server.py's entry point sets PROMETHEUS_MULTIPROC_DIR
+# (serving.prepare_metrics_dir) before this module is imported, which puts
+# prometheus_client in multiprocess mode; without it metrics stay in-process.
+from prometheus_client import REGISTRY, CollectorRegistry, Counter, Histogram, make_asgi_app, multiprocess
+
+# Local (in-process) stages are sub-millisecond; upstream calls take seconds
+STAGE_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+UPSTREAM_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 15.0, 30.0, 60.0, 90.0, 120.0)
+
+STAGE_SECONDS = Histogram(
+    "godiva_chat_stage_seconds",
+    "Time spent in each local stage of a chat turn",
+    ["stage"],  # decode, history, payload, parse, encode
+    buckets=STAGE_BUCKETS,
+)
+UPSTREAM_SECONDS = Histogram(
+    "godiva_chat_upstream_seconds",
+    "Latency of the upstream answer (full response)",
+    ["mode"],  # blocking, stream (Langflow run); direct, direct_stream (direct pipeline)
+    buckets=UPSTREAM_BUCKETS,
+)
+UPSTREAM_FIRST_TOKEN_SECONDS = Histogram(
+    "godiva_chat_upstream_first_token_seconds",
+    "Time from sending a streamed question upstream to its first token",
+    buckets=UPSTREAM_BUCKETS,
+)
+COMPONENT_SECONDS = Histogram(
+    "godiva_chat_langflow_component_seconds",
+    "Per-component build time reported by Langflow",
+    ["component"],
+    buckets=UPSTREAM_BUCKETS,
+)
+UPSTREAM_FAILURES = Counter(
+    "godiva_chat_upstream_failures_total",
+    "Failed Langflow calls",
+    ["kind"],  # timeout, http, parse, deadline, circuit_open
+)
+RESPONSE_BYTES = Histogram(
+    "godiva_chat_langflow_response_bytes",
+    "Size of blocking Langflow run responses",
+    buckets=(1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216),
+)
+RESPONSE_PARSES = Counter(
+    "godiva_chat_langflow_response_parses_total",
+    "Parsed Langflow run responses, by parser and the output shape the answer was found in",
+    ["method", "shape"],  # method: orjson, partial, json
+)
+UPSTREAM_RETRIES = Counter(
+    "godiva_chat_upstream_retries_total",
+    "Langflow calls retried after a failure where the flow did not run",
+)
+UPSTREAM_HEDGES = Counter(
+    "godiva_chat_upstream_hedges_total",
+    "Hedged calls to the secondary Langflow replica",
+    ["result"],  # launched, won
+)
+ADMISSION_DECISIONS = Counter(
+    "godiva_chat_admission_decisions_total",
+    "Questions admitted at once, after queueing, or rejected before reaching a worker",
+    ["result"],  # admitted, queued, rate_limited, queue_full, queue_timeout
+)
+ADMISSION_WAIT_SECONDS = Histogram(
+    "godiva_chat_admission_wait_seconds",
+    "Time queued questions waited for a slot",
+    buckets=UPSTREAM_BUCKETS,
+)
+CACHE_REQUESTS = Counter(
+    "godiva_chat_cache_requests_total",
+    "Answer cache lookups",
+    ["result"],  # exact, semantic, miss, bypass
+)
+RETRIEVAL_SECONDS = Histogram(
+    "godiva_chat_retrieval_seconds",
+    "Batched embedding and vector search latency",
+    ["stage"],  # embed, search
+    buckets=UPSTREAM_BUCKETS,
+)
+BATCH_SIZE_OBSERVED = Histogram(
+    "godiva_chat_batch_size",
+    "Questions per micro-batch",
+    buckets=(1, 2, 4, 8, 16, 32, 64),
+)
+HISTORY_TOKENS = Histogram(
+    "godiva_chat_history_tokens",
+    "Conversation history size per follow-up question, before and after the token window",
+    ["stage"],  # full, windowed
+    buckets=(0, 64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384),
+)
+COALESCED_REQUESTS = Counter(
+    "godiva_chat_coalesced_requests_total",
+    "Requests that joined an identical in-flight Langflow call",
+)
+
+
+@contextmanager
+def timed(histogram):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        histogram.observe(time.perf_counter() - start)
+
+
+def observe_component_timings(response_data):
+    # Langflow reports a "timedelta" (seconds) for each output component of the run
+    for run_output in response_data.get("outputs") or []:
+        for output in run_output.get("outputs") or []:
+            seconds = output.get("timedelta") if isinstance(output, dict) else None
+            if isinstance(seconds, (int, float)):
+                component = output.get("component_id") or output.get("component_display_name") or "unknown"
+                COMPONENT_SECONDS.labels(component=component).observe(seconds)
+
+
+def metrics_app():
+    """ASGI app serving the metrics of every server process, for mounting at /metrics."""
+    if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+        return make_asgi_app(registry=REGISTRY)
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return make_asgi_app(registry=registry)
@@ -0,0 +1,98 @@
+import glob
+import logging
+import multiprocessing
+import os
+import signal
+import tempfile
+import time
+
+
+class DrainState:
+    """Shutdown state shared by the main process and the API server processes.
+
+    Created in the main process before ``LitServer.run`` so the API servers
+    inherit it.
+    """
+
+    def __init__(self):
+        self.draining = multiprocessing.Event()
+        self.in_flight = multiprocessing.Value("i", 0)
+
+    def wait_idle(self, timeout):
+        deadline = time.monotonic() + timeout
+        while self.in_flight.value > 0 and time.monotonic() < deadline:
+            time.sleep(0.1)
+        return self.in_flight.value == 0
+
+
+class DrainMiddleware:
+    """ASGI middleware that counts in-flight requests and, once draining,
+    rejects new ones with 503 so a load balancer moves traffic elsewhere.
+
+    A request counts as in flight until its (possibly streamed) response body
+    is complete.
+    """
+
+    def __init__(self, app, state, retry_after=5):
+        self.app = app
+        self.state = state
+        self.retry_after = retry_after
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        if self.state.draining.is_set():
+            await send({
+                "type": "http.response.start",
+                "status": 503,
+                "headers": [(b"content-type", b"application/json"),
+                            (b"retry-after", str(self.retry_after).encode())],
+            })
+            await send({"type": "http.response.body", "body": b'{"status": "draining"}'})
+            return
+
+        with self.state.in_flight.get_lock():
+            self.state.in_flight.value += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            with self.state.in_flight.get_lock():
+                self.state.in_flight.value -= 1
+
+
+def install_graceful_shutdown(state, drain_timeout):
+    """On SIGTERM: stop admitting requests, let in-flight ones finish (up to
+    ``drain_timeout`` seconds), then stop the server the same way Ctrl-C does."""
+
+    main_pid = os.getpid()
+
+    def handle_sigterm(signum, frame):
+        if os.getpid() != main_pid:
+            # Forked child (e.g. an inference worker being terminated): default behaviour
+            signal.signal(signum, signal.SIG_DFL)
+            os.kill(os.getpid(), signum)
+            return
+        if state.draining.is_set():
+            return
+        state.draining.set()
+        logging.info(f"SIGTERM received, draining {state.in_flight.value} in-flight request(s)")
+        if not state.wait_idle(drain_timeout):
+            logging.warning(f"Drain timeout after {drain_timeout}s with {state.in_flight.value} request(s) left")
+        raise KeyboardInterrupt
+
+    signal.signal(signal.SIGTERM, handle_sigterm)
+
+
+def prepare_metrics_dir(default=os.path.join(tempfile.gettempdir(), "godiva_chat_metrics")):
+    """Point prometheus_client's multiprocess mode at PROMETHEUS_MULTIPROC_DIR
+    (or ``default``) and remove the metric files of earlier runs.
+
+    Must run in the main process before server_metrics (prometheus_client)
+    is imported; the API server and worker processes inherit the setting.
+    """
+    path = os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", default)
+    os.makedirs(path, exist_ok=True)
+    for stale in glob.glob(os.path.join(path, "*.db")):
+        os.remove(stale)
+    return path
@@ -0,0 +1,13 @@
+# Suggested questions shown in the UI; the chat server can prewarm its answer cache with them
+TEMPLATE_QUESTIONS = [
+    "Can you explain Godiva's approach to creating tax-efficient retirement income strategies?",
+    "What investment strategies does Godiva recommend for preserving wealth across generations?",
+    "How does Godiva's wealth management service address inheritance tax planning?",
+    "What are the key considerations in Godiva's pension transfer advisory process?",
+    "How does Godiva balance risk and return in long-term investment portfolios?",
+    "What tax-efficient savings vehicles does Godiva recommend for high-net-worth individuals?",
+    "How does Godiva's trust planning service protect family assets?",
+    "What ethical investment options are available through Godiva's portfolios?",
+    "How does Godiva help clients navigate complex cross-border wealth management scenarios?",
+    "What strategies does Godiva employ to safeguard investments during market volatility?"
+]
@@ -0,0 +1,213 @@
+import asyncio
+import json
+import time
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("fastapi")
+
+from admission import AdmissionMiddleware, AdmissionState, SessionRateLimiter, add_queue_route  # noqa: E402
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("admission.time.monotonic", lambda: now[0])
+    return now
+
+
+def test_burst_then_rate_limited(clock):
+    limiter = SessionRateLimiter(rate=0.5, burst=3)
+    assert [limiter.acquire("s") for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert limiter.acquire("s") == pytest.approx(2.0)
+
+
+def test_tokens_refill_at_the_rate(clock):
+    limiter = SessionRateLimiter(rate=0.5, burst=2)
+    limiter.acquire("s")
+    limiter.acquire("s")
+    clock[0] += 1.0
+    assert limiter.acquire("s") == pytest.approx(1.0)
+    clock[0] += 1.0
+    assert limiter.acquire("s") == 0.0
+
+
+def test_refill_is_capped_at_burst(clock):
+    limiter = SessionRateLimiter(rate=1.0, burst=2)
+    limiter.acquire("s")
+    clock[0] += 3600
+    assert [limiter.acquire("s") for _ in range(3)] == [0.0, 0.0, pytest.approx(1.0)]
+
+
+def test_sessions_have_separate_buckets(clock):
+    limiter = SessionRateLimiter(rate=0.5, burst=1)
+    assert limiter.acquire("a") == 0.0
+    assert limiter.acquire("a") > 0
+    assert limiter.acquire("b") == 0.0
+
+
+def test_least_recent_sessions_are_forgotten(clock):
+    limiter = SessionRateLimiter(rate=0.5, burst=1, max_sessions=2)
+    limiter.acquire("a")
+    limiter.acquire("b")
+    limiter.acquire("c")
+    assert list(limiter.buckets) == ["b", "c"]
+    assert limiter.acquire("a") == 0.0
+
+
+def test_admission_state_caps_in_flight_and_keeps_queue_order():
+    state = AdmissionState(max_in_flight=1, max_queue=1)
+    assert state.try_acquire()
+    assert not state.try_acquire()
+    assert state.enter_queue()
+    assert not state.enter_queue()
+    state.release(2.0)
+    # A newcomer does not overtake the queued question
+    assert not state.try_acquire()
+    assert state.try_acquire(queued=True)
+    state.leave_queue()
+    assert state.snapshot()["in_flight"] == 1
+    assert state.estimated_wait() == pytest.approx(2.0)
+
+
+class EchoApp:
+    """Downstream app: answers with the request body it received."""
+
+    def __init__(self, release=None):
+        self.calls = 0
+        self.release = release
+
+    async def __call__(self, scope, receive, send):
+        self.calls += 1
+        if self.release is not None:
+            await self.release.wait()
+        body = b""
+        while True:
+            message = await receive()
+            body += message.get("body", b"")
+            if not message.get("more_body", False):
+                break
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": body})
+
+
+def post(middleware, payload, path="/predict"):
+    """Sends one POST through the middleware in two body chunks; returns (status, headers, body)."""
+    body = json.dumps(payload).encode()
+    chunks = [{"type": "http.request", "body": body[:5], "more_body": True},
+              {"type": "http.request", "body": body[5:], "more_body": False}]
+    sent = []
+
+    async def receive():
+        return chunks.pop(0) if chunks else {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "method": "POST", "path": path}
+    return asyncio.run(middleware(scope, receive, send)), sent
+
+
+def response(sent):
+    start, body = sent
+    return start["status"], dict(start["headers"]), json.loads(body["body"])
+
+
+def test_middleware_replays_the_body_to_the_app():
+    app = EchoApp()
+    state = AdmissionState(max_in_flight=2)
+    _, sent = post(AdmissionMiddleware(app, state), {"question": "Hi", "session_id": "s"})
+    assert response(sent) == (200, {}, {"question": "Hi", "session_id": "s"})
+    assert state.snapshot()["in_flight"] == 0
+
+
+def test_middleware_rate_limits_a_session():
+    app = EchoApp()
+    middleware = AdmissionMiddleware(app, AdmissionState(), rate=0.5, burst=1)
+    post(middleware, {"session_id": "s"})
+    _, sent = post(middleware, {"session_id": "s"})
+    status, headers, body = response(sent)
+    assert status == 429
+    assert headers[b"retry-after"] == b"2"
+    assert body["retry_after"] == 2
+    assert "too quickly" in body["response"]
+    assert app.calls == 1
+    # Other sessions are not affected
+    _, sent = post(middleware, {"session_id": "t"})
+    assert sent[0]["status"] == 200
+
+
+def test_middleware_rejects_when_the_queue_is_full():
+    app = EchoApp()
+    state = AdmissionState(max_in_flight=1, max_queue=0)
+    state.try_acquire()
+    _, sent = post(AdmissionMiddleware(app, state, rate=0), {"session_id": "s"})
+    status, headers, body = response(sent)
+    assert status == 503
+    assert int(headers[b"retry-after"]) >= 1
+    assert "busy" in body["response"]
+    assert app.calls == 0
+
+
+def test_middleware_gives_up_after_the_deadline():
+    app = EchoApp()
+    state = AdmissionState(max_in_flight=1, max_queue=4)
+    state.try_acquire()
+    middleware = AdmissionMiddleware(app, state, rate=0, max_wait=10.0, poll_interval=0.01)
+    started = time.monotonic()
+    _, sent = post(middleware, {"session_id": "s", "deadline": 0.05})
+    assert time.monotonic() - started < 1.0
+    assert sent[0]["status"] == 503
+    assert app.calls == 0
+    assert state.snapshot()["waiting"] == 0
+
+
+def test_middleware_admits_queued_question_when_a_slot_frees():
+    app = EchoApp()
+    state = AdmissionState(max_in_flight=1, max_queue=4)
+    state.try_acquire()
+    middleware = AdmissionMiddleware(app, state, rate=0, poll_interval=0.01)
+
+    async def scenario():
+        loop = asyncio.get_running_loop()
+        loop.call_later(0.05, state.release, 1.0)
+        sent = []
+        body = [{"type": "http.request", "body": b'{"session_id": "s"}'}]
+
+        async def receive():
+            return body.pop(0)
+
+        async def send(message):
+            sent.append(message)
+
+        await middleware({"type": "http", "method": "POST", "path": "/predict"}, receive, send)
+        return sent
+
+    sent = asyncio.run(scenario())
+    assert response(sent)[0] == 200
+    snapshot = state.snapshot()
+    assert (snapshot["in_flight"], snapshot["waiting"]) == (0, 0)
+
+
+def test_middleware_passes_other_paths_through():
+    app = EchoApp()
+    state = AdmissionState(max_in_flight=1, max_queue=0)
+    state.try_acquire()
+    _, sent = post(AdmissionMiddleware(app, state), {"x": 1}, path="/health")
+    assert sent[0]["status"] == 200
+
+
+def test_queue_route_reports_the_snapshot():
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    state = AdmissionState(max_in_flight=2, max_queue=8)
+    state.try_acquire()
+    server = SimpleNamespace(app=FastAPI())
+    add_queue_route(server, state)
+    snapshot = TestClient(server.app).get("/queue").json()
+    assert snapshot["in_flight"] == 1
+    assert snapshot["waiting"] == 0
+    assert snapshot["max_in_flight"] == 2
+    assert snapshot["max_queue"] == 8
@@ -0,0 +1,88 @@
+from answer_cache import AnswerCache, normalize_query
+from embeddings import HashingEmbedder
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_normalize_query_ignores_case_whitespace_and_trailing_punctuation():
+    assert normalize_query("  What is an ISA?! ") == normalize_query("what is  an isa")
+
+
+def test_exact_hit_and_miss():
+    cache = AnswerCache()
+    cache.put("What is an ISA?", "A tax-free savings account.")
+    assert cache.lookup("what is an isa") == ("A tax-free savings account.", "exact")
+    assert cache.lookup("What is a pension?") == (None, "miss")
+    assert cache.stats()["exact_hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_entries_expire_after_ttl():
+    clock = FakeClock()
+    cache = AnswerCache(ttl=10, clock=clock)
+    cache.put("q", "a")
+    clock.now = 9.9
+    assert cache.get("q") == "a"
+    clock.now = 10.0
+    assert cache.get("q") is None
+    assert cache.stats()["expired"] == 1
+    assert len(cache) == 0
+
+
+def test_least_recently_used_entry_is_evicted_first():
+    cache = AnswerCache(max_entries=2)
+    cache.put("one", "1")
+    cache.put("two", "2")
+    assert cache.get("one") == "1"  # "two" is now the least recently used
+    cache.put("three", "3")
+    assert cache.get("two") is None
+    assert cache.get("one") == "1"
+    assert cache.get("three") == "3"
+    assert cache.stats()["evictions"] == 1
+
+
+def test_byte_budget_evicts_and_skips_oversized_answers():
+    cache = AnswerCache(max_bytes=100)
+    cache.put("a", "x" * 40)
+    cache.put("b", "y" * 40)
+    cache.put("c", "z" * 40)  # Over budget: "a" goes
+    assert cache.get("a") is None
+    assert cache.get("b") and cache.get("c")
+    assert cache.stats()["bytes"] <= 100
+
+    cache.put("huge", "h" * 200)
+    assert cache.get("huge") is None
+    assert cache.get("b") and cache.get("c")
+
+
+def test_replacing_an_entry_keeps_the_byte_count_exact():
+    cache = AnswerCache()
+    cache.put("q", "first answer")
+    cache.put("q", "second")
+    assert cache.get("q") == "second"
+    assert cache.stats()["bytes"] == len("q") + len("second")
+
+
+def test_semantic_hit_respects_similarity_threshold():
+    embedder = HashingEmbedder()
+    cache = AnswerCache(embedder=embedder, similarity_threshold=0.8)
+    question = "How do I plan for retirement with Godiva"
+    cache.put(question, "Book a pension review.", cache.embed(question))
+
+    similar = "How do I plan for my retirement with Godiva"
+    assert cache.lookup(similar, cache.embed(similar)) == ("Book a pension review.", "semantic")
+
+    unrelated = "What are your office opening hours"
+    assert cache.lookup(unrelated, cache.embed(unrelated)) == (None, "miss")
+
+
+def test_without_embedder_only_exact_matches_hit():
+    cache = AnswerCache()
+    assert not cache.semantic
+    assert cache.embed("anything") is None
@@ -0,0 +1,128 @@
+import asyncio
+import json
+
+import pytest
+
+ls = pytest.importorskip("litserve")
+from fastapi.testclient import TestClient  # noqa: E402
+from litserve.utils import wrap_litserve_start  # noqa: E402
+
+from chat_server import ChatLitAPI, StreamingChatLitAPI, build_server, parse_args  # noqa: E402
+from serving import DrainState  # noqa: E402
+
+
+class FakeBackend:
+    """Answers "Answer to <query>", streamed word by word; "fail" raises and "empty" answers nothing."""
+
+    records_turns = True
+
+    def __init__(self):
+        self.turns = []
+
+    async def answer(self, query, session_id, has_history=False, deadline=None):
+        if query == "fail":
+            raise RuntimeError("upstream down")
+        return "" if query == "empty" else f"Answer to {query}"
+
+    async def stream(self, query, session_id, has_history=False, deadline=None):
+        if query == "fail":
+            raise RuntimeError("upstream down")
+        if query == "empty":
+            return
+        for word in f"Answer to {query}".split(" "):
+            yield word + " "
+
+    async def record_turn(self, session_id, query, answer):
+        self.turns.append((session_id, query, answer))
+
+    async def aclose(self):
+        pass
+
+
+class FakeBackendMixin:
+    def setup(self, device):
+        super().setup(device)
+        self.backend = FakeBackend()
+
+
+class FakeChatAPI(FakeBackendMixin, ChatLitAPI):
+    pass
+
+
+class FakeStreamingChatAPI(FakeBackendMixin, StreamingChatLitAPI):
+    pass
+
+
+def stream_lines(response):
+    return [json.loads(line) for line in response.text.splitlines() if line]
+
+
+def test_blocking_predict_through_litserve():
+    server = ls.LitServer(FakeChatAPI(max_batch_size=1, enable_async=True), accelerator="cpu")
+    with wrap_litserve_start(server) as server, TestClient(server.app) as client:
+        response = client.post("/predict", json={"query": "What is an ISA?", "session_id": "s"})
+        assert response.status_code == 200
+        assert response.json() == {"response": "Answer to What is an ISA?"}
+
+
+def test_streaming_predict_through_litserve():
+    server = ls.LitServer(FakeStreamingChatAPI(max_batch_size=1, stream=True, enable_async=True),
+                          accelerator="cpu")
+    with wrap_litserve_start(server) as server, TestClient(server.app) as client:
+        response = client.post("/predict", json={"query": "What is an ISA?", "session_id": "s"})
+        assert response.status_code == 200
+        chunks = stream_lines(response)
+        assert "".join(chunk["response"] for chunk in chunks) == "Answer to What is an ISA? "
+        assert len(chunks) == 6
+
+
+def test_failed_and_empty_answers_are_marked_as_errors():
+    server = ls.LitServer(FakeChatAPI(max_batch_size=1, enable_async=True), accelerator="cpu")
+    with wrap_litserve_start(server) as server, TestClient(server.app) as client:
+        for query in ("fail", "empty"):
+            response = client.post("/predict", json={"query": query, "session_id": "s"})
+            assert response.status_code == 200
+            assert response.json()["error"] is True
+            assert response.json()["response"]
+        assert "error" not in client.post("/predict", json={"query": "ok", "session_id": "s"}).json()
+
+
+def test_failed_and_empty_streams_are_marked_as_errors():
+    server = ls.LitServer(FakeStreamingChatAPI(max_batch_size=1, stream=True, enable_async=True),
+                          accelerator="cpu")
+    with wrap_litserve_start(server) as server, TestClient(server.app) as client:
+        for query in ("fail", "empty"):
+            chunks = stream_lines(client.post("/predict", json={"query": query, "session_id": "s"}))
+            assert len(chunks) == 1
+            assert chunks[0]["error"] is True
+
+
+def test_streaming_encode_response_accepts_a_list():
+    # LitServe up to 0.2.12 hands encode_response the collected outputs
+    api = StreamingChatLitAPI(max_batch_size=1, stream=True, enable_async=True)
+
+    async def collect(outputs):
+        return [item async for item in api.encode_response(outputs)]
+
+    outputs = [{"bot_response": "a"}, {"bot_response": "b"}]
+
+    async def generate():
+        for output in outputs:
+            yield output
+
+    assert asyncio.run(collect(outputs)) == [{"response": "a"}, {"response": "b"}]
+    assert asyncio.run(collect(generate())) == [{"response": "a"}, {"response": "b"}]
+
+
+def test_metrics_route_serves_the_histograms():
+    server = build_server(FakeChatAPI(max_batch_size=1, enable_async=True),
+                          parse_args(["--accelerator", "cpu"]), DrainState())
+    with wrap_litserve_start(server) as server, TestClient(server.app) as client:
+        assert client.post("/predict", json={"query": "What is an ISA?", "session_id": "s"}).status_code == 200
+        response = client.get("/metrics")
+        assert response.status_code == 200
+        for name in ("godiva_chat_stage_seconds", "godiva_chat_upstream_seconds",
+                     "godiva_chat_upstream_first_token_seconds", "godiva_chat_admission_wait_seconds"):
+            assert f"# TYPE {name} histogram" in response.text
+        # Counted by the admission middleware in this (the API server) process
+        assert 'godiva_chat_admission_decisions_total{result="admitted"}' in response.text
@@ -0,0 +1,132 @@
+import asyncio
+
+import pytest
+
+from coalesce import SingleFlight
+
+
+def test_concurrent_callers_share_one_call():
+    calls = []
+
+    async def fetch(value):
+        calls.append(value)
+        await asyncio.sleep(0.01)
+        return value * 2
+
+    async def main():
+        flights = SingleFlight()
+        results = await asyncio.gather(*(flights.do("k", fetch, 21) for _ in range(5)))
+        return flights, results
+
+    flights, results = asyncio.run(main())
+    assert results == [42] * 5
+    assert calls == [21]
+    assert flights.stats() == {"leaders": 1, "coalesced": 4, "in_flight": 0}
+
+
+def test_error_reaches_every_caller_and_the_next_call_starts_fresh():
+    attempts = []
+
+    async def flaky():
+        attempts.append(1)
+        await asyncio.sleep(0.01)
+        if len(attempts) == 1:
+            raise RuntimeError("upstream down")
+        return "ok"
+
+    async def main():
+        flights = SingleFlight()
+        results = await asyncio.gather(flights.do("k", flaky), flights.do("k", flaky), return_exceptions=True)
+        assert all(isinstance(result, RuntimeError) for result in results)
+        assert "k" not in flights
+        return await flights.do("k", flaky)
+
+    assert asyncio.run(main()) == "ok"
+    assert len(attempts) == 2
+
+
+def test_caller_timeout_does_not_cut_the_call_short_for_others():
+    async def slow():
+        await asyncio.sleep(0.05)
+        return "answer"
+
+    async def main():
+        flights = SingleFlight()
+        hurried = asyncio.ensure_future(flights.do("k", slow, timeout=0.01))
+        patient = asyncio.ensure_future(flights.do("k", slow))
+        with pytest.raises(asyncio.TimeoutError):
+            await hurried
+        return await patient
+
+    assert asyncio.run(main()) == "answer"
+
+
+def test_call_is_cancelled_once_nobody_waits():
+    async def main():
+        state = {"cancelled": False}
+
+        async def slow():
+            try:
+                await asyncio.sleep(1)
+            except asyncio.CancelledError:
+                state["cancelled"] = True
+                raise
+
+        flights = SingleFlight()
+        with pytest.raises(asyncio.TimeoutError):
+            await flights.do("k", slow, timeout=0.01)
+        # Let the cancellation and the flight's done callback run
+        await asyncio.sleep(0.01)
+        return state["cancelled"], "k" in flights
+
+    assert asyncio.run(main()) == (True, False)
+
+
+def test_stream_late_joiner_receives_every_chunk():
+    async def tokens():
+        for chunk in ("a", "b", "c"):
+            await asyncio.sleep(0.01)
+            yield chunk
+
+    async def collect(flights, delay=0.0):
+        await asyncio.sleep(delay)
+        return [chunk async for chunk in flights.stream("k", tokens)]
+
+    async def main():
+        flights = SingleFlight()
+        # The second caller joins after the first chunks were produced
+        return await asyncio.gather(collect(flights), collect(flights, delay=0.025)), flights
+
+    (first, late), flights = asyncio.run(main())
+    assert first == late == ["a", "b", "c"]
+    assert flights.counters == {"leaders": 1, "coalesced": 1}
+
+
+def test_stream_error_is_raised_after_the_chunks_before_it():
+    async def broken():
+        yield "partial"
+        raise RuntimeError("stream broke")
+
+    async def main():
+        flights = SingleFlight()
+        received = []
+        with pytest.raises(RuntimeError, match="stream broke"):
+            async for chunk in flights.stream("k", broken):
+                received.append(chunk)
+        return received
+
+    assert asyncio.run(main()) == ["partial"]
+
+
+def test_stream_first_chunk_timeout():
+    async def silent():
+        await asyncio.sleep(1)
+        yield "late"
+
+    async def main():
+        flights = SingleFlight()
+        with pytest.raises(asyncio.TimeoutError):
+            async for _ in flights.stream("k", silent, first_timeout=0.01):
+                pass
+
+    asyncio.run(main())
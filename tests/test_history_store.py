@@ -0,0 +1,134 @@
+import time
+
+import pytest
+
+from history_store import (ConversationHistory, MemoryTranscriptStore, SQLiteTranscriptStore, _pack,
+                           render_preview)
+
+
+def transcript(n, text="Hello"):
+    return [{"role": "user", "content": f"{text} {n}"}, {"role": "assistant", "content": f"Answer {n}"}]
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        return MemoryTranscriptStore()
+    return SQLiteTranscriptStore(str(tmp_path / "history.db"))
+
+
+def test_store_round_trip(store):
+    messages = transcript(1, text="Café <b>")
+    store.put("a", messages)
+    assert store.get("a") == messages
+    store.put("a", transcript(2))
+    assert store.get("a") == transcript(2)
+    store.delete("a")
+    assert store.get("a") == []
+    store.delete("missing")
+    assert store.get("missing") == []
+
+
+def test_memory_store_evicts_least_recently_used_beyond_cap():
+    store = MemoryTranscriptStore(max_transcripts=2)
+    store.put("a", transcript(1))
+    store.put("b", transcript(2))
+    assert store.get("a")  # "b" is now the least recently used
+    store.put("c", transcript(3))
+    assert len(store) == 2
+    assert store.get("b") == []
+    assert store.get("a") == transcript(1)
+    assert store.get("c") == transcript(3)
+
+
+def test_memory_store_expires_transcripts():
+    clock = FakeClock()
+    store = MemoryTranscriptStore(ttl=60, clock=clock)
+    store.put("old", transcript(1))
+    clock.now = 30
+    store.put("new", transcript(2))
+    clock.now = 60
+    assert store.get("old") == []
+    assert store.get("new") == transcript(2)
+    clock.now = 200
+    # Writes drop expired transcripts of ended sessions, which are never read again
+    store.put("newest", transcript(3))
+    assert len(store) == 1
+
+
+def test_sqlite_store_drops_old_rows(tmp_path):
+    path = str(tmp_path / "history.db")
+    store = SQLiteTranscriptStore(path, max_age_days=1, prune_interval=0)
+    with store._conn:
+        store._conn.execute("INSERT INTO transcripts (key, data, created) VALUES (?, ?, ?)",
+                            ("stale", _pack(transcript(1)), time.time() - 2 * 86400))
+    store.put("fresh", transcript(2))
+    assert store.get("stale") == []
+    assert store.get("fresh") == transcript(2)
+    # Reopening the file keeps fresh rows
+    assert SQLiteTranscriptStore(path).get("fresh") == transcript(2)
+
+
+def test_render_preview_escapes_and_shows_the_last_exchange():
+    preview = render_preview(transcript(1) + transcript(2, text="<script>"))
+    assert "Hello 1" not in preview
+    assert "&lt;script&gt; 2" in preview
+    assert "<strong>Assistant:</strong> Answer 2" in preview
+
+
+def test_conversation_history_archives_and_loads():
+    history = ConversationHistory(MemoryTranscriptStore())
+    assert not history
+    summary = history.archive(transcript(1))
+    assert len(history) == 1
+    assert summary.message_count == 2
+    assert "Answer 1" in summary.preview_html
+    assert history.load(summary.id) == transcript(1)
+
+
+def test_conversation_history_evicts_oldest_conversation():
+    store = MemoryTranscriptStore()
+    history = ConversationHistory(store, max_conversations=2)
+    first = history.archive(transcript(1))
+    history.archive(transcript(2))
+    history.archive(transcript(3))
+    assert [s.message_count for s in history.summaries] == [2, 2]
+    assert first.id not in [s.id for s in history.summaries]
+    # The evicted transcript is deleted from the shared store too
+    assert store.get(first.id) == []
+    assert len(store) == 2
+
+
+def test_conversation_history_delete():
+    store = MemoryTranscriptStore()
+    history = ConversationHistory(store)
+    summary = history.archive(transcript(1))
+    history.delete(summary.id)
+    assert not history
+    assert len(store) == 0
+
+
+def test_conversation_history_drops_expired_transcripts_on_load():
+    clock = FakeClock()
+    history = ConversationHistory(MemoryTranscriptStore(ttl=10, clock=clock))
+    summary = history.archive(transcript(1))
+    clock.now = 10
+    assert history.load(summary.id) == []
+    assert not history
+
+
+def test_sessions_share_one_store_without_mixing_transcripts():
+    store = MemoryTranscriptStore()
+    alice, bob = ConversationHistory(store), ConversationHistory(store)
+    a = alice.archive(transcript(1))
+    b = bob.archive(transcript(2))
+    assert [s.id for s in alice.summaries] == [a.id]
+    assert bob.load(b.id) == transcript(2)
@@ -0,0 +1,86 @@
+import asyncio
+
+from chat_memory import MACHINE, USER
+from history_window import ApproxTokenizer, ExtractiveSummarizer, HistoryWindow, insert_summary
+
+
+def conversation(turns):
+    messages = []
+    for n in range(turns):
+        messages.append({"sender": USER[0], "sender_name": USER[1], "text": f"Question {n} about pensions?"})
+        messages.append({"sender": MACHINE[0], "sender_name": MACHINE[1], "text": f"Answer {n}."})
+    return messages
+
+
+class CountingSummarizer(ExtractiveSummarizer):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.calls = []
+
+    async def summarize(self, previous, messages):
+        self.calls.append(list(messages))
+        return await super().summarize(previous, messages)
+
+
+def test_short_history_is_kept_whole():
+    window = HistoryWindow(ApproxTokenizer(), token_budget=1000, max_turns=6)
+    messages = conversation(2)
+    assert asyncio.run(window.compact("s", messages)) == (messages, "")
+    assert asyncio.run(window.compact("s", [])) == ([], "")
+
+
+def test_window_keeps_the_last_turns_and_summarizes_the_rest():
+    tokenizer = ApproxTokenizer()
+    window = HistoryWindow(tokenizer, token_budget=1000, max_turns=2,
+                           summarizer=ExtractiveSummarizer(tokenizer, max_tokens=100))
+    messages = conversation(5)
+    kept, summary = asyncio.run(window.compact("s", messages))
+    assert kept == messages[-4:]
+    assert summary == "The user asked: Question 0 about pensions? | Question 1 about pensions? | " \
+                      "Question 2 about pensions?"
+
+
+def test_token_budget_trims_and_window_starts_at_a_question():
+    tokenizer = ApproxTokenizer()
+    messages = conversation(4)
+    messages[-1]["text"] = "A long answer. " * 40
+    window = HistoryWindow(tokenizer, token_budget=200, max_turns=10)
+    kept, summary = asyncio.run(window.compact("s", messages))
+    assert kept and kept[0]["sender"] == USER[0]
+    assert window.count(kept) <= 200
+    assert kept[-1] is messages[-1]
+    assert summary == ""
+
+
+def test_summary_reserves_its_share_of_the_budget():
+    tokenizer = ApproxTokenizer()
+    summarizer = ExtractiveSummarizer(tokenizer, max_tokens=30)
+    window = HistoryWindow(tokenizer, token_budget=60, max_turns=10, summarizer=summarizer)
+    kept, summary = asyncio.run(window.compact("s", conversation(10)))
+    assert window.count(kept) <= 60 - 30
+    assert tokenizer.count(summary) <= 30
+
+
+def test_summary_is_extended_with_newly_dropped_messages_only():
+    tokenizer = ApproxTokenizer()
+    summarizer = CountingSummarizer(tokenizer, max_tokens=200)
+    window = HistoryWindow(tokenizer, token_budget=1000, max_turns=1, summarizer=summarizer)
+    messages = conversation(3)
+    _, first = asyncio.run(window.compact("s", messages))
+    messages += conversation(4)[-2:]
+    _, second = asyncio.run(window.compact("s", messages))
+
+    assert summarizer.calls[0] == messages[:4]
+    assert summarizer.calls[1] == messages[4:6]
+    assert second.startswith(first)
+    # Nothing new dropped: the cached summary is reused
+    asyncio.run(window.compact("s", messages))
+    assert len(summarizer.calls) == 2
+
+
+def test_insert_summary_goes_before_the_history_variable():
+    template = "Context: {context}\nHistory: {conversation_history}\nQuestion: {question}"
+    assert insert_summary(template, "") == template
+    assert insert_summary(template, "Asked about {ISAs}") == (
+        "Context: {context}\nHistory: (Summary of earlier conversation: Asked about (ISAs))\n"
+        "{conversation_history}\nQuestion: {question}")
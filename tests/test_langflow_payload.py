@@ -0,0 +1,77 @@
+import copy
+import json
+
+import pytest
+
+from langflow_payload import CompiledPayload
+
+TWEAKS = {
+    "ChatInput-8fGO2": {"input_value": "", "session_id": "", "should_store_message": True},
+    "TextInput-uI2CW": {"input_value": ""},
+    "Memory-3Qm7y": {"n_messages": 100, "session_id": "", "template": "{sender_name}: {text}"},
+    "OllamaModel-RdzdC": {"model_name": "llama3.2", "stream": False, "temperature": 0.1},
+}
+SLOTS = {
+    "session_id": [("TextInput-uI2CW", "input_value"), ("ChatInput-8fGO2", "session_id"),
+                   ("Memory-3Qm7y", "session_id")],
+    "query": [("ChatInput-8fGO2", "input_value")],
+}
+QUERY = 'What is "inheritance tax"? {not a slot} é\n'
+
+
+def legacy_payload(tweaks, query, session_id, stream=False):
+    # The per-request construction CompiledPayload replaces
+    updated_tweaks = copy.deepcopy(tweaks)
+    for component, field in SLOTS["session_id"]:
+        updated_tweaks[component][field] = session_id
+    updated_tweaks["ChatInput-8fGO2"]["input_value"] = query
+    updated_tweaks["OllamaModel-RdzdC"]["stream"] = stream
+    return {"output_type": "chat", "input_type": "chat", "tweaks": updated_tweaks}
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_render_matches_the_legacy_payload(stream):
+    compiled = CompiledPayload(TWEAKS, SLOTS, overrides={("OllamaModel-RdzdC", "stream"): stream})
+    rendered = compiled.render(query=QUERY, session_id="abc-123")
+    assert json.loads(rendered) == legacy_payload(TWEAKS, QUERY, "abc-123", stream)
+
+
+def test_render_does_not_share_state_between_requests():
+    compiled = CompiledPayload(TWEAKS, SLOTS)
+    compiled.render(query="first", session_id="one")
+    second = json.loads(compiled.render(query="second", session_id="two"))
+    assert second == legacy_payload(TWEAKS, "second", "two")
+    assert TWEAKS["ChatInput-8fGO2"]["input_value"] == ""
+
+
+def test_slot_values_are_json_encoded():
+    compiled = CompiledPayload(TWEAKS, {**SLOTS, "n_messages": [("Memory-3Qm7y", "n_messages")]})
+    payload = json.loads(compiled.render(query=QUERY, session_id="s", n_messages=4))
+    assert payload["tweaks"]["Memory-3Qm7y"]["n_messages"] == 4
+    assert payload["tweaks"]["ChatInput-8fGO2"]["input_value"] == QUERY
+
+
+def test_minimal_payload_sends_only_slots_and_overrides():
+    compiled = CompiledPayload(TWEAKS, SLOTS, overrides={("OllamaModel-RdzdC", "stream"): True}, minimal=True)
+    payload = json.loads(compiled.render(query="q", session_id="s"))
+    assert payload["tweaks"] == {
+        "ChatInput-8fGO2": {"input_value": "q", "session_id": "s"},
+        "TextInput-uI2CW": {"input_value": "s"},
+        "Memory-3Qm7y": {"session_id": "s"},
+        "OllamaModel-RdzdC": {"stream": True},
+    }
+
+
+def test_chat_server_payload_matches_the_legacy_payload():
+    pytest.importorskip("litserve")
+    from chat_server import LANGFLOW_MINIMAL_TWEAKS, PAYLOAD_SLOTS, TWEAKS as FLOW_TWEAKS, compile_payload
+
+    if LANGFLOW_MINIMAL_TWEAKS:
+        pytest.skip("LANGFLOW_MINIMAL_TWEAKS sends a reduced payload")
+    expected = copy.deepcopy(FLOW_TWEAKS)
+    for component, field in PAYLOAD_SLOTS["session_id"]:
+        expected[component][field] = "abc-123"
+    expected["ChatInput-8fGO2"]["input_value"] = QUERY
+    expected["OllamaModel-RdzdC"]["stream"] = False
+    rendered = compile_payload(stream=False).render(query=QUERY, session_id="abc-123")
+    assert json.loads(rendered) == {"output_type": "chat", "input_type": "chat", "tweaks": expected}
@@ -0,0 +1,81 @@
+import json
+
+import pytest
+
+from langflow_response import LangflowResponseError, extract_message_text, parse_run_response
+
+
+def run_response(output, padding=0):
+    return {
+        "session_id": "s",
+        "outputs": [{"inputs": {"input_value": "q"}, "outputs": [output]}],
+        # Large trailing data the partial decode should not need
+        "logs": ["x" * padding],
+    }
+
+
+@pytest.mark.parametrize("output, shape", [
+    ({"results": {"message": {"text": "answer"}}}, "results.message.text"),
+    ({"results": {"message": {"data": {"text": "answer"}}}}, "results.message.data.text"),
+    ({"outputs": {"message": {"message": "answer"}}}, "outputs.message.message"),
+    ({"artifacts": {"message": "answer"}}, "artifacts.message"),
+    ({"messages": [{"message": "earlier"}, {"message": "answer"}]}, "messages"),
+])
+def test_extract_message_text_shapes(output, shape):
+    assert extract_message_text(run_response(output)) == ("answer", shape)
+
+
+def test_extract_message_text_without_outputs_is_empty():
+    assert extract_message_text({"outputs": []}) == (None, "empty")
+
+
+def test_extract_message_text_rejects_unknown_shapes():
+    with pytest.raises(LangflowResponseError):
+        extract_message_text(run_response({"results": {"other": 1}}))
+    with pytest.raises(LangflowResponseError):
+        extract_message_text(["not", "an", "object"])
+
+
+def test_parse_run_response_decodes_only_the_results_object():
+    body = json.dumps(run_response({"results": {"message": {"text": "Hello \"world\" é"}}},
+                                   padding=100000)).encode("utf-8")
+    parsed = parse_run_response(body)
+    assert parsed.text == "Hello \"world\" é"
+    assert parsed.shape == "results.message.text"
+    assert parsed.method == "partial"
+    assert parsed.data is None
+
+
+def test_parse_run_response_partial_decode_grows_its_window():
+    long_answer = "word " * 20000
+    body = json.dumps(run_response({"results": {"message": {"text": long_answer}}})).encode("utf-8")
+    parsed = parse_run_response(body)
+    assert (parsed.text, parsed.method) == (long_answer, "partial")
+
+
+def test_parse_run_response_falls_back_without_results_key():
+    body = json.dumps(run_response({"artifacts": {"message": "answer"}})).encode("utf-8")
+    parsed = parse_run_response(body)
+    assert (parsed.text, parsed.shape) == ("answer", "artifacts.message")
+    assert parsed.method in ("orjson", "json")
+    assert parsed.data["session_id"] == "s"
+
+
+def test_parse_run_response_falls_back_when_results_has_no_answer():
+    output = {"results": {}, "outputs": {"message": {"message": "answer"}}}
+    parsed = parse_run_response(json.dumps(run_response(output)).encode("utf-8"))
+    assert (parsed.text, parsed.shape) == ("answer", "outputs.message.message")
+    assert parsed.method in ("orjson", "json")
+
+
+def test_parse_run_response_full_keeps_the_data():
+    body = json.dumps(run_response({"results": {"message": {"text": "answer"}}})).encode("utf-8")
+    parsed = parse_run_response(body, full=True)
+    assert parsed.text == "answer"
+    assert parsed.method in ("orjson", "json")
+    assert parsed.data["outputs"][0]["outputs"][0]["results"]["message"]["text"] == "answer"
+
+
+def test_parse_run_response_malformed_body_raises():
+    with pytest.raises(ValueError):
+        parse_run_response(b'{"outputs": [{"outputs": [{"results": {"message": ')
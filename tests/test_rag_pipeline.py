@@ -0,0 +1,134 @@
+import asyncio
+
+import pytest
+
+from chat_memory import MACHINE, USER, InMemoryChatMemory
+from embeddings import HashingEmbedder
+from history_window import ApproxTokenizer, ExtractiveSummarizer, HistoryWindow
+from rag_pipeline import RagPipeline
+from retrieval import InMemoryRetriever
+
+PROMPT = ("Context:\n{context}\n\nConversation so far:\n{conversation_history}\n\n"
+          "Question: {question}\nAnswer:")
+DOCUMENTS = [
+    {"title": "Pensions", "text": "Godiva advisers review your pension contributions and retirement income"},
+    {"title": "Trusts", "text": "Trust planning protects family assets from inheritance tax"},
+    {"title": "Opening hours", "text": "Our offices are open Monday to Friday from nine to five"},
+]
+
+
+class FakeGenerator:
+    """Records every prompt; answers with a fixed text (streamed word by word)."""
+
+    def __init__(self, answer="Book a pension review."):
+        self.answer = answer
+        self.prompts = []
+
+    async def generate(self, prompt):
+        self.prompts.append(prompt)
+        return self.answer
+
+    async def stream(self, prompt):
+        self.prompts.append(prompt)
+        for word in self.answer.split(" "):
+            yield word + " "
+
+
+def build_pipeline(window=None, number_of_results=1):
+    embedder = HashingEmbedder()
+    generator = FakeGenerator()
+    pipeline = RagPipeline(embedder, InMemoryRetriever(DOCUMENTS, embedder), generator, InMemoryChatMemory(),
+                           PROMPT, number_of_results=number_of_results, window=window)
+    return pipeline, generator
+
+
+def seed(pipeline, session_id, turns):
+    for n in range(turns):
+        asyncio.run(pipeline.remember(session_id, f"Earlier question {n}?", f"Earlier answer {n}."))
+
+
+def test_prompt_has_retrieved_context_history_and_question():
+    pipeline, generator = build_pipeline()
+    seed(pipeline, "s", 1)
+    asyncio.run(pipeline.answer("How do I protect family assets with a trust?", "s"))
+
+    prompt, = generator.prompts
+    assert "Context:\nTrust planning protects family assets from inheritance tax , Trusts\n" in prompt
+    assert "Pensions" not in prompt
+    assert "User: Earlier question 0?\nAI Assistant: Earlier answer 0." in prompt
+    assert prompt.endswith("Question: How do I protect family assets with a trust?\nAnswer:")
+
+
+def test_batched_retrieval_matches_per_query_retrieval():
+    pipeline, _ = build_pipeline(number_of_results=2)
+    queries = ["pension retirement income", "office opening hours"]
+    batched = asyncio.run(pipeline.retrieve(queries))
+    assert batched == [asyncio.run(pipeline.retrieve([query]))[0] for query in queries]
+    assert batched[1].startswith("Our offices are open")
+
+
+def test_window_trims_history_and_adds_summary():
+    tokenizer = ApproxTokenizer()
+    window = HistoryWindow(tokenizer, token_budget=1000, max_turns=2,
+                           summarizer=ExtractiveSummarizer(tokenizer, max_tokens=100))
+    pipeline, generator = build_pipeline(window=window)
+    seed(pipeline, "s", 4)
+    asyncio.run(pipeline.answer("And my pension?", "s"))
+
+    prompt = generator.prompts[0]
+    assert "(Summary of earlier conversation: The user asked: Earlier question 0? | Earlier question 1?)" in prompt
+    assert "User: Earlier question 0?" not in prompt
+    assert "User: Earlier question 2?\nAI Assistant: Earlier answer 2.\n" \
+           "User: Earlier question 3?\nAI Assistant: Earlier answer 3." in prompt
+    # The summary comes before the kept turns
+    assert prompt.index("Summary of earlier") < prompt.index("Earlier question 2?")
+
+
+def test_answer_writes_the_turn_to_memory():
+    pipeline, _ = build_pipeline()
+    assert asyncio.run(pipeline.answer("What is a trust?", "s")) == "Book a pension review."
+    messages = asyncio.run(pipeline.memory.get_messages("s", 10))
+    assert [(m["sender"], m["sender_name"], m["text"]) for m in messages] == [
+        (*USER, "What is a trust?"), (*MACHINE, "Book a pension review.")]
+    # Other sessions are untouched
+    assert asyncio.run(pipeline.memory.get_messages("other", 10)) == []
+
+
+def test_stream_answer_writes_the_joined_answer_to_memory():
+    pipeline, generator = build_pipeline()
+
+    async def collect():
+        return [chunk async for chunk in pipeline.stream_answer("What is a trust?", "s")]
+
+    chunks = asyncio.run(collect())
+    assert "".join(chunks) == "Book a pension review. "
+    messages = asyncio.run(pipeline.memory.get_messages("s", 10))
+    assert messages[-1] == {"sender": MACHINE[0], "sender_name": MACHINE[1], "text": "".join(chunks)}
+
+    # The next question sees this turn in its prompt
+    asyncio.run(pipeline.answer("Tell me more", "s"))
+    assert "User: What is a trust?\nAI Assistant: Book a pension review." in generator.prompts[-1]
+
+
+def test_direct_backend_answers_streams_and_records_turns():
+    pytest.importorskip("litserve")
+    from chat_server import DirectPipelineBackend
+
+    pipeline, generator = build_pipeline()
+    backend = DirectPipelineBackend.__new__(DirectPipelineBackend)
+    backend.pipeline = pipeline
+    backend.records_turns = True
+
+    async def run():
+        answer = await backend.answer("What is a trust?", "s")
+        chunks = [chunk async for chunk in backend.stream("And a pension?", "s")]
+        await backend.record_turn("s", "Cached question?", "Cached answer.")
+        return answer, chunks
+
+    answer, chunks = asyncio.run(run())
+    assert answer == "Book a pension review."
+    assert "".join(chunks) == "Book a pension review. "
+    assert "User: What is a trust?" in generator.prompts[1]
+    texts = [m["text"] for m in asyncio.run(pipeline.memory.get_messages("s", 10))]
+    assert texts == ["What is a trust?", "Book a pension review.", "And a pension?", "Book a pension review. ",
+                     "Cached question?", "Cached answer."]
@@ -0,0 +1,117 @@
+import asyncio
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from readiness import UpstreamProbe, add_health_routes, workers_ready
+
+
+class Upstream(BaseHTTPRequestHandler):
+    """/up answers 200, /down 500; every request is counted."""
+
+    hits = []
+
+    def do_GET(self):
+        self.hits.append(self.path)
+        self.send_response(200 if self.path == "/up" else 500)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def upstream():
+    Upstream.hits = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Upstream)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def unused_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Upstream)
+    port = server.server_address[1]
+    server.server_close()
+    return f"http://127.0.0.1:{port}/up"
+
+
+def test_probe_reports_each_upstream(upstream):
+    probe = UpstreamProbe({"langflow": f"{upstream}/up", "ollama": f"{upstream}/down", "redis": unused_url()})
+    ok, results, age = asyncio.run(probe.check())
+    assert not ok
+    assert results["langflow"]["ok"] and results["langflow"]["detail"] == "HTTP 200"
+    assert not results["ollama"]["ok"] and results["ollama"]["detail"] == "HTTP 500"
+    assert not results["redis"]["ok"] and results["redis"]["detail"] == "ConnectError"
+    assert age < 1
+
+
+def test_probe_results_are_reused_within_ttl(upstream):
+    async def check_twice(probe):
+        await probe.check()
+        return await probe.check()
+
+    assert asyncio.run(check_twice(UpstreamProbe({"langflow": f"{upstream}/up"}, ttl=60)))[0]
+    assert len(Upstream.hits) == 1
+    asyncio.run(check_twice(UpstreamProbe({"langflow": f"{upstream}/up"}, ttl=0)))
+    assert len(Upstream.hits) == 3
+
+
+def test_concurrent_checks_share_one_round_of_probes(upstream):
+    probe = UpstreamProbe({"langflow": f"{upstream}/up"}, ttl=60)
+
+    async def many():
+        return await asyncio.gather(*(probe.check() for _ in range(5)))
+
+    assert all(ok for ok, _, _ in asyncio.run(many()))
+    assert Upstream.hits == ["/up"]
+
+
+def health_client(upstream, path, statuses):
+    server = SimpleNamespace(app=FastAPI(), workers_setup_status=statuses)
+    add_health_routes(server, UpstreamProbe({"langflow": f"{upstream}{path}"}, ttl=0))
+    return TestClient(server.app)
+
+
+def test_ready_route(upstream):
+    client = health_client(upstream, "/up", {"predict_0": "ready"})
+    assert client.get("/live").json() == {"status": "alive"}
+    response = client.get("/ready")
+    assert response.status_code == 200
+    assert response.json()["status"] == "ready"
+    assert response.json()["upstreams"]["langflow"]["ok"]
+
+
+def test_ready_route_while_workers_start_or_upstream_is_down(upstream):
+    starting = health_client(upstream, "/up", {"predict_0": "ready", "predict_1": "starting"}).get("/ready")
+    assert (starting.status_code, starting.json()) == (503, {"status": "starting"})
+    assert Upstream.hits == []
+
+    degraded = health_client(upstream, "/down", {"predict_0": "ready"}).get("/ready")
+    assert degraded.status_code == 503
+    assert degraded.json()["status"] == "degraded"
+
+
+def test_workers_ready_without_status():
+    assert workers_ready(SimpleNamespace())
+    assert not workers_ready(SimpleNamespace(workers_setup_status={"predict_0": "starting"}))
+
+
+def test_mock_upstream_serves_the_probed_endpoints(monkeypatch):
+    pytest.importorskip("uvicorn")
+    monkeypatch.syspath_prepend(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+    import mock_langflow
+
+    client = TestClient(mock_langflow.app)
+    # /health for the Langflow backend, /api/version for Ollama (direct pipeline backend)
+    assert client.get("/health").status_code == 200
+    assert client.get("/api/version").status_code == 200
@@ -0,0 +1,50 @@
+import asyncio
+import json
+import os
+
+import pytest
+
+httpx = pytest.importorskip("httpx")
+
+
+@pytest.fixture
+def replay(monkeypatch):
+    monkeypatch.syspath_prepend(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+    import replay
+
+    return replay
+
+
+def ask(replay, status, lines):
+    """Replays one question against a /predict that answers ``lines`` (JSON objects) with ``status``."""
+    body = "".join(json.dumps(line) + "\n" for line in lines)
+    transport = httpx.MockTransport(lambda request: httpx.Response(status, text=body))
+    record = {"query": "Which chocolates are vegan?", "has_history": False}
+
+    async def run():
+        async with httpx.AsyncClient(transport=transport) as client:
+            return await replay.ask(client, "http://chat/predict", record, "s", timeout=5)
+
+    return asyncio.run(run())
+
+
+def test_answer_is_ok(replay):
+    answer = ask(replay, 200, [{"response": "Dark "}, {"response": "ones."}])
+    assert answer["ok"] and not answer["rate_limited"]
+    assert answer["response"] == "Dark ones."
+
+
+def test_marked_failure_is_not_ok(replay):
+    answer = ask(replay, 200, [{"response": "Service unavailable", "error": True}])
+    assert not answer["ok"]
+    assert answer["response"] == "Service unavailable"
+
+
+def test_empty_answer_is_not_ok(replay):
+    assert not ask(replay, 200, [{"response": ""}])["ok"]
+    assert not ask(replay, 200, [])["ok"]
+
+
+def test_rate_limited_answer(replay):
+    answer = ask(replay, 429, [{"response": "Too quickly", "retry_after": 2}])
+    assert not answer["ok"] and answer["rate_limited"]
@@ -0,0 +1,164 @@
+import asyncio
+
+import httpx
+import pytest
+
+from resilience import CircuitBreaker, DeadlineExceeded, counts_as_failure, hedge, is_retryable
+
+
+def status_error(status):
+    request = httpx.Request("POST", "http://langflow/api/v1/run/flow")
+    return httpx.HTTPStatusError(f"{status}", request=request, response=httpx.Response(status, request=request))
+
+
+def test_breaker_opens_after_threshold_and_half_opens_after_timeout(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr("resilience.time.monotonic", lambda: now[0])
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30)
+
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+
+    now[0] += 30
+    assert breaker.allow()  # The single trial call
+    assert breaker.state == "half_open"
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.allow()
+
+
+def test_failed_trial_reopens_and_released_trial_frees_the_slot(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr("resilience.time.monotonic", lambda: now[0])
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10)
+    breaker.record_failure()
+    now[0] = 10
+    assert breaker.allow()
+    breaker.release()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+
+
+def test_success_resets_consecutive_failures():
+    breaker = CircuitBreaker(failure_threshold=2)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == "closed"
+
+
+@pytest.mark.parametrize("error, retryable", [
+    (httpx.ConnectError("refused"), True),
+    (httpx.ConnectTimeout("connect"), True),
+    (httpx.PoolTimeout("pool"), True),
+    (httpx.ReadTimeout("read"), False),
+    (status_error(429), True),
+    (status_error(502), True),
+    (status_error(503), True),
+    (status_error(504), True),
+    (status_error(500), False),
+    (status_error(400), False),
+    (ValueError("bad body"), False),
+])
+def test_is_retryable(error, retryable):
+    assert is_retryable(error) is retryable
+
+
+@pytest.mark.parametrize("error, failure", [
+    (httpx.ReadTimeout("read"), True),
+    (DeadlineExceeded(), True),
+    (status_error(500), True),
+    (status_error(429), True),
+    (status_error(404), False),
+    (ValueError("bad body"), False),
+])
+def test_counts_as_failure(error, failure):
+    assert counts_as_failure(error) is failure
+
+
+def test_hedge_returns_fast_primary_without_starting_secondary():
+    started = []
+
+    async def primary():
+        return "primary"
+
+    async def secondary():
+        started.append(1)
+        return "secondary"
+
+    assert asyncio.run(hedge(primary, secondary, delay=0.05)) == ("primary", 0)
+    assert started == []
+
+
+def test_hedge_takes_secondary_when_primary_is_slow_and_cancels_primary():
+    state = {"cancelled": False}
+
+    async def primary():
+        try:
+            await asyncio.sleep(1)
+        except asyncio.CancelledError:
+            state["cancelled"] = True
+            raise
+
+    async def secondary():
+        return "secondary"
+
+    async def main():
+        result = await hedge(primary, secondary, delay=0.01)
+        await asyncio.sleep(0)
+        return result
+
+    assert asyncio.run(main()) == ("secondary", 1)
+    assert state["cancelled"]
+
+
+def test_hedge_starts_secondary_at_once_when_primary_fails():
+    async def primary():
+        raise httpx.ConnectError("refused")
+
+    async def secondary():
+        return "secondary"
+
+    assert asyncio.run(hedge(primary, secondary, delay=10)) == ("secondary", 1)
+
+
+def test_hedge_raises_the_last_error_when_both_fail():
+    async def primary():
+        raise httpx.ConnectError("primary")
+
+    async def secondary():
+        await asyncio.sleep(0.01)
+        raise httpx.ConnectError("secondary")
+
+    with pytest.raises(httpx.ConnectError, match="secondary"):
+        asyncio.run(hedge(primary, secondary, delay=0))
+
+
+def test_hedge_discards_the_losing_success():
+    discarded = []
+
+    async def main():
+        finished = asyncio.Event()
+
+        async def primary():
+            await finished.wait()
+            return "primary"
+
+        async def secondary():
+            # Lets the primary finish too, before hedge picks a winner
+            finished.set()
+            return "secondary"
+
+        async def discard(result):
+            discarded.append(result)
+
+        return await hedge(primary, secondary, delay=0.01, discard=discard)
+
+    result, index = asyncio.run(main())
+    assert discarded == [{"primary": "secondary", "secondary": "primary"}[result]]
@@ -0,0 +1,193 @@
+import asyncio
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import httpx
+import pytest
+
+from serving import DrainMiddleware, DrainState, install_graceful_shutdown, prepare_metrics_dir
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_prepare_metrics_dir_clears_stale_metric_files(tmp_path, monkeypatch):
+    path = tmp_path / "metrics"
+    path.mkdir()
+    (path / "histogram_123.db").write_bytes(b"stale")
+    (path / "notes.txt").write_text("kept")
+    monkeypatch.setenv("PROMETHEUS_MULTIPROC_DIR", str(path))
+
+    assert prepare_metrics_dir() == str(path)
+    assert sorted(os.listdir(path)) == ["notes.txt"]
+
+
+def test_prepare_metrics_dir_defaults_and_creates_the_directory(tmp_path, monkeypatch):
+    monkeypatch.delenv("PROMETHEUS_MULTIPROC_DIR", raising=False)
+    default = str(tmp_path / "godiva_chat_metrics")
+    assert prepare_metrics_dir(default) == default
+    assert os.path.isdir(default)
+    assert os.environ["PROMETHEUS_MULTIPROC_DIR"] == default
+
+
+def run_asgi(middleware, scope=None):
+    """Call ``middleware`` with one request; returns the messages it sent."""
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(middleware(scope or {"type": "http", "method": "POST", "path": "/predict"}, receive, send))
+    return sent
+
+
+def make_app(state, seen):
+    async def app(scope, receive, send):
+        seen.append(state.in_flight.value)
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+    return app
+
+
+def test_drain_middleware_counts_requests_in_flight():
+    state, seen = DrainState(), []
+    sent = run_asgi(DrainMiddleware(make_app(state, seen), state))
+    assert sent[0]["status"] == 200
+    assert seen == [1]
+    assert state.in_flight.value == 0
+
+
+def test_drain_middleware_rejects_new_requests_while_draining():
+    state, seen = DrainState(), []
+    state.draining.set()
+    sent = run_asgi(DrainMiddleware(make_app(state, seen), state, retry_after=7))
+    assert seen == []
+    assert sent[0]["status"] == 503
+    assert (b"retry-after", b"7") in sent[0]["headers"]
+    assert json.loads(sent[1]["body"]) == {"status": "draining"}
+
+
+def test_drain_middleware_passes_other_scopes_through():
+    state, seen = DrainState(), []
+    state.draining.set()
+    run_asgi(DrainMiddleware(make_app(state, seen), state), scope={"type": "lifespan"})
+    assert seen == [0]
+
+
+@pytest.fixture
+def sigterm_handler():
+    """(state, install): ``install(drain_timeout)`` installs the handler and returns it."""
+    previous = signal.getsignal(signal.SIGTERM)
+    state = DrainState()
+
+    def install(drain_timeout):
+        install_graceful_shutdown(state, drain_timeout)
+        return signal.getsignal(signal.SIGTERM)
+
+    try:
+        yield state, install
+    finally:
+        signal.signal(signal.SIGTERM, previous)
+
+
+def test_sigterm_waits_for_requests_in_flight(sigterm_handler):
+    state, install = sigterm_handler
+    handler = install(5)
+    state.in_flight.value = 1
+
+    def finish():
+        time.sleep(0.2)
+        state.in_flight.value = 0
+
+    threading.Thread(target=finish).start()
+    start = time.monotonic()
+    with pytest.raises(KeyboardInterrupt):
+        handler(signal.SIGTERM, None)
+    assert state.draining.is_set()
+    assert 0.15 < time.monotonic() - start < 2
+
+
+def test_sigterm_gives_up_after_the_drain_timeout(sigterm_handler):
+    state, install = sigterm_handler
+    handler = install(0.2)
+    state.in_flight.value = 1
+    start = time.monotonic()
+    with pytest.raises(KeyboardInterrupt):
+        handler(signal.SIGTERM, None)
+    assert time.monotonic() - start < 2
+    # A second SIGTERM while draining is ignored
+    handler(signal.SIGTERM, None)
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for(url, proc, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        assert proc.poll() is None, f"process exited with {proc.returncode}"
+        try:
+            if httpx.get(url, timeout=1).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise TimeoutError(url)
+
+
+def test_server_starts_and_drains_on_sigterm():
+    """chat_server.py against the mock: starts, finishes an in-flight answer after SIGTERM, then exits."""
+    pytest.importorskip("litserve")
+    pytest.importorskip("uvicorn")
+    mock_port, server_port = free_port(), free_port()
+    mock = subprocess.Popen([sys.executable, os.path.join(ROOT, "benchmarks", "mock_langflow.py"),
+                             "--port", str(mock_port), "--latency", "2", "--ttft", "1.5"],
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    env = dict(os.environ, LANGFLOW_URL=f"http://127.0.0.1:{mock_port}/", CHAT_PORT=str(server_port),
+               CHAT_DRAIN_TIMEOUT="20", PROMETHEUS_MULTIPROC_DIR=tempfile.mkdtemp())
+    server = subprocess.Popen([sys.executable, "chat_server.py"], cwd=ROOT, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True)
+    url = f"http://127.0.0.1:{server_port}"
+    try:
+        wait_for(f"http://127.0.0.1:{mock_port}/stats", mock)
+        wait_for(f"{url}/health", server)
+
+        answer = {}
+
+        def ask():
+            response = httpx.post(f"{url}/predict", json={"query": "What is a trust?", "session_id": "s"},
+                                  timeout=30)
+            answer["status"] = response.status_code
+            answer["text"] = "".join(json.loads(line)["response"] for line in response.text.splitlines() if line)
+
+        asker = threading.Thread(target=ask)
+        asker.start()
+        time.sleep(0.5)
+        server.send_signal(signal.SIGTERM)
+        time.sleep(0.3)
+        assert httpx.post(f"{url}/predict", json={"query": "late"}, timeout=5).status_code == 503
+        asker.join(30)
+        assert answer["status"] == 200 and answer["text"]
+        assert server.wait(30) == 0
+    finally:
+        # The server's API server and worker processes share its process group
+        for proc in (server, mock):
+            if proc.poll() is None:
+                proc.kill()
+        try:
+            os.killpg(server.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+        mock.wait()
@@ -0,0 +1,77 @@
+import json
+
+import pytest
+
+from traffic_capture import TrafficCapture, anonymize
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("Mail me at jane.doe+godiva@example.co.uk please", "Mail me at <email> please"),
+    ("My NI number is QQ 12 34 56 C", "My NI number is <ni-number>"),
+    ("Deliver to SW1A 1AA tomorrow", "Deliver to <postcode> tomorrow"),
+    ("Call +44 (0)20 7946 0958", "Call <number>"),
+    ("Order 12345678 has not arrived", "Order <number> has not arrived"),
+    ("I want 2 boxes of 24 truffles", "I want 2 boxes of 24 truffles"),
+    ("", ""),
+    (None, None),
+])
+def test_anonymize(text, expected):
+    assert anonymize(text) == expected
+
+
+def test_session_token_is_stable_and_salted(tmp_path):
+    capture = TrafficCapture(str(tmp_path / "a.jsonl"), salt="one")
+    other = TrafficCapture(str(tmp_path / "b.jsonl"), salt="two")
+    token = capture.session_token("browser-session")
+    assert token == capture.session_token("browser-session")
+    assert token != other.session_token("browser-session")
+    assert token != capture.session_token("another-session")
+    assert "browser-session" not in token
+
+
+def read(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+
+def test_record_writes_anonymized_lines(tmp_path):
+    path = str(tmp_path / "capture.jsonl")
+    capture = TrafficCapture(path, salt="s")
+    capture.record("sess", "Is 07700900123 my number?", "Write to a@b.com", 1.23456,
+                   has_history=True, mode="stream", ttft=0.5, cached=True)
+    capture.record("sess", "Follow-up", None, 2.0, ok=False)
+    capture.close()
+    first, second = read(path)
+    assert first["session"] == second["session"] == capture.session_token("sess")
+    assert first["query"] == "Is <number> my number?"
+    assert first["response"] == "Write to <email>"
+    assert (first["latency_s"], first["ttft_s"], first["mode"]) == (1.2346, 0.5, "stream")
+    assert first["has_history"] and first["cached"] and first["ok"]
+    assert second["response"] is None and not second["ok"]
+
+
+def test_whole_sessions_are_sampled(tmp_path):
+    path = str(tmp_path / "capture.jsonl")
+    capture = TrafficCapture(path, sample_rate=0.5)
+    sessions = [f"session-{i}" for i in range(200)]
+    for session in sessions:
+        for turn in range(3):
+            capture.record(session, f"Question {turn}", "Answer", 0.1)
+    capture.close()
+    records = read(path)
+    per_session = {}
+    for record in records:
+        per_session[record["session"]] = per_session.get(record["session"], 0) + 1
+    # Every kept session keeps all of its turns
+    assert set(per_session.values()) == {3}
+    assert 50 < len(per_session) < 150
+
+
+@pytest.mark.parametrize("rate, expected", [(0.0, 0), (1.0, 20)])
+def test_sample_rate_bounds(tmp_path, rate, expected):
+    path = str(tmp_path / "capture.jsonl")
+    capture = TrafficCapture(path, sample_rate=rate)
+    for i in range(20):
+        capture.record(f"session-{i}", "Question", "Answer", 0.1)
+    capture.close()
+    assert len(read(path)) == expected
@@ -0,0 +1,73 @@
+import hashlib
+import json
+import os
+import re
+import time
+
+# Personal details a user may type into a question (or get back in an answer)
+REDACTIONS = (
+    (re.compile(r"[\w.+-]+@[\w-]+(\.[\w-]+)+"), "<email>"),
+    (re.compile(r"\b[A-Z]{2}\s?\d{2}\s?\d{2}\s?\d{2}\s?[A-D]\b", re.IGNORECASE), "<ni-number>"),
+    (re.compile(r"\b[A-Z]{1,2}\d[A-Z\d]?\s*\d[A-Z]{2}\b", re.IGNORECASE), "<postcode>"),
+)
+# Phone, account and card numbers: 6+ digits, possibly grouped
+NUMBER = re.compile(r"\+?\d[\d \-()]*\d")
+
+
+def _redact_number(match):
+    digits = sum(c.isdigit() for c in match.group())
+    return "<number>" if digits >= 6 else match.group()
+
+
+def anonymize(text):
+    if not text:
+        return text
+    for pattern, placeholder in REDACTIONS:
+        text = pattern.sub(placeholder, text)
+    return NUMBER.sub(_redact_number, text)
+
+
+class TrafficCapture:
+    """Appends one anonymized JSON line per answered question to ``path``,
+    for replay with benchmarks/replay.py.
+
+    Session IDs are replaced by a salted hash, so turns of one conversation
+    stay together without being traceable to the browser session. Whole
+    sessions are sampled (``sample_rate``) so follow-ups keep their first
+    question. Every worker process appends to the same file; each record is
+    a single O_APPEND write, so lines do not interleave.
+    """
+
+    def __init__(self, path, salt="", sample_rate=1.0):
+        self.path = path
+        self.salt = salt.encode("utf-8")
+        self.sample_rate = sample_rate
+        self.fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+
+    def session_token(self, session_id):
+        return hashlib.sha256(self.salt + session_id.encode("utf-8")).hexdigest()[:16]
+
+    def sampled(self, token):
+        return int(token, 16) / 16 ** len(token) < self.sample_rate
+
+    def record(self, session_id, query, response, latency, has_history=False, mode="blocking",
+               ttft=None, ok=True, cached=False):
+        token = self.session_token(session_id)
+        if not self.sampled(token):
+            return
+        line = json.dumps({
+            "ts": round(time.time(), 3),
+            "session": token,
+            "query": anonymize(query),
+            "has_history": has_history,
+            "mode": mode,
+            "latency_s": round(latency, 4),
+            "ttft_s": round(ttft, 4) if ttft is not None else None,
+            "ok": ok,
+            "cached": cached,
+            "response": anonymize(response),
+        }, ensure_ascii=False)
+        os.write(self.fd, (line + "\n").encode("utf-8"))
+
+    def close(self):
+        os.close(self.fd)